@@ -0,0 +1,171 @@
+import warnings
+from typing import Any
+
+import datasets
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import torch
+
+# floating point types which are stored as float32
+_FLOAT_DTYPES = ("float16", "float64")
+
+
+def _is_list(data_type: pa.DataType) -> bool:
+    return bool(
+        pa.types.is_list(data_type)
+        or pa.types.is_large_list(data_type)
+        or pa.types.is_fixed_size_list(data_type),
+    )
+
+
+def _common_length(array: pa.Array) -> int:
+    # the length shared by all the lists in the array (or -1 if they differ)
+    lengths = pc.unique(pc.list_value_length(array).drop_null())
+    if len(lengths) == 1:
+        return int(lengths[0].as_py())
+    else:
+        return -1
+
+
+def _columnar_feature(feature: Any, array: pa.Array, nested: bool) -> Any:
+    if isinstance(feature, datasets.Value):
+        if feature.dtype in _FLOAT_DTYPES:
+            return datasets.Value("float32")
+        return feature
+
+    if isinstance(feature, datasets.Sequence):
+        inner_feature, length = feature.feature, feature.length
+    elif isinstance(feature, list) and (len(feature) == 1):
+        inner_feature, length = feature[0], -1
+    else:
+        return feature
+
+    if not _is_list(array.type) or isinstance(inner_feature, dict):
+        return feature
+
+    # nested lists of a constant length (e.g. coordinates) become fixed size lists
+    if nested and (length == -1) and (len(array) > 0):
+        length = _common_length(array)
+
+    return datasets.Sequence(
+        _columnar_feature(inner_feature, array.flatten(), nested=True),
+        length=length,
+    )
+
+
+def to_columnar_dataset(
+    dataset: datasets.Dataset,
+    columns: list[str] | None = None,
+    num_proc: int | None = None,
+) -> datasets.Dataset:
+    """Rewrites a (featurised) dataset into a columnar layout.
+
+    All the floating point values are stored as float32 (the dtype the datasets
+    produce anyway) and nested lists of a constant length (such as the coordinates,
+    bond indices or vector targets of each atom) as fixed size lists. The values of
+    each column are then a single flat arrow buffer plus the offsets of the rows,
+    which ``read_column`` exposes as zero-copy numpy arrays.
+
+    Args:
+        dataset: The dataset to convert.
+        columns: The columns to convert (defaults to all columns).
+        num_proc: The number of processes to use for the conversion.
+
+    Returns:
+        The converted dataset.
+    """
+
+    if columns is None:
+        columns = dataset.column_names
+
+    features = dataset.features.copy()
+    for col in columns:
+        features[col] = _columnar_feature(
+            features[col],
+            dataset.data.column(col).combine_chunks(),
+            nested=False,
+        )
+
+    if features == dataset.features:
+        return dataset
+
+    return dataset.cast(features, num_proc=num_proc)
+
+
+def read_column(
+    column: pa.ChunkedArray | pa.Array,
+) -> tuple[np.ndarray, np.ndarray | None]:
+    """Reads a column of an arrow table as flat values plus row offsets.
+
+    Returns the values of all the rows with shape ``[n_elements, ...]`` (where
+    nested lists are flattened into the second dimension) and the offsets of each
+    row into the values (``None`` for scalar columns). For datasets in the columnar
+    layout, the values are zero-copy views of the arrow buffers and are read-only.
+    """
+
+    if isinstance(column, pa.ChunkedArray):
+        array = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+    else:
+        array = column
+
+    if not _is_list(array.type):
+        return array.to_numpy(zero_copy_only=False), None
+
+    if pa.types.is_fixed_size_list(array.type):
+        offsets = np.arange(len(array) + 1, dtype=np.int64) * array.type.list_size
+    else:
+        offsets = array.offsets.to_numpy().astype(np.int64)
+        offsets = offsets - offsets[0]
+
+    values = array.flatten()
+    num_elements = len(values)
+    if not _is_list(values.type):
+        return values.to_numpy(zero_copy_only=False), offsets
+
+    while _is_list(values.type):
+        values = values.flatten()
+    flat_values = values.to_numpy(zero_copy_only=False)
+
+    if num_elements > 0:
+        return flat_values.reshape(num_elements, -1), offsets
+    else:
+        return flat_values.reshape(0, 0), offsets
+
+
+def to_tensor(array: np.ndarray) -> torch.Tensor:
+    """Zero-copy conversion of a (possibly read-only) numpy array to a tensor.
+
+    Tensors of read-only arrays must not be modified in place.
+    """
+
+    with warnings.catch_warnings():
+        warnings.filterwarnings(
+            "ignore",
+            message="The given NumPy array is not writable",
+        )
+        return torch.from_numpy(array)
+
+
+def read_column_as_tensor(
+    column: pa.ChunkedArray | pa.Array,
+) -> tuple[torch.Tensor, torch.Tensor | None]:
+    """Reads a column of an arrow table as a tensor of values plus row lengths.
+
+    Floating point values are returned in the default dtype and integers as int64
+    (matching what ``torch.tensor`` infers from python lists), which does not copy
+    the values of columnar datasets.
+    """
+
+    values, offsets = read_column(column)
+    tensor = to_tensor(values)
+
+    if tensor.is_floating_point():
+        tensor = tensor.to(torch.get_default_dtype())
+    elif tensor.dtype != torch.bool:
+        tensor = tensor.to(torch.int64)
+
+    if offsets is not None:
+        return tensor, torch.from_numpy(np.diff(offsets))
+    else:
+        return tensor, None
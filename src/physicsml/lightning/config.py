@@ -40,7 +40,18 @@ class PhysicsMLDataModuleConfig(DataModuleConfig):
     pbc: tuple[bool, bool, bool] | None = None
     cell: list[list[float]] | None = None
     self_interaction: bool = False
-    pre_batch: Literal["in_memory", "on_disk"] | None = None
+    neighbour_list_cache_dir: str | None = None
+    neighbour_list_backend: str = "auto"
+    collate_neighbour_list: bool = False
+    max_nodes_per_batch: int | None = None
+    max_edges_per_batch: int | None = None
+    pre_batch: Literal["in_memory", "on_disk", "sample_store"] | None = None
+    pre_batch_cache_dir: str | None = None
+    pre_batch_cache_max_gb: float | None = None
+    shuffle_buffer_size: int = 10_000
+    compact_dtypes: bool = True
+    one_hot_on_device: bool = False
+    collate_batch_dict: bool = False
     pre_batch_in_memory: bool = False  # TODO: Deprecate
     train_batch_size: int | None = None  # TODO: Deprecate
     validation_batch_size: int | None = None  # TODO: Deprecate
@@ -1,18 +1,28 @@
+import os
 from typing import Any
 
 import datasets
+import torch
 from molflux.modelzoo.models.lightning.datamodule import LightningDataModule
-from torch.utils.data import Dataset
-from torch_geometric.loader import DataLoader
+from torch.utils.data import DataLoader, Dataset, SequentialSampler
 
 from physicsml.lightning.config import PhysicsMLModelConfig
+from physicsml.lightning.graph_datasets.batch_dict import precision_dtype
+from physicsml.lightning.graph_datasets.graph_dataloader import GraphDataLoader
 from physicsml.lightning.graph_datasets.graph_dataset import GraphDataset
+from physicsml.lightning.graph_datasets.streaming_graph_dataset import (
+    StreamingGraphDataLoader,
+    StreamingGraphDataset,
+)
+from physicsml.lightning.pre_batch_cache import pre_batch_cache_kwargs
 from physicsml.lightning.pre_batching_in_memory import (
     construct_in_memory_pre_batched_dataloader,
 )
 from physicsml.lightning.pre_batching_on_disk import (
     construct_on_disk_pre_batched_dataloader,
 )
+from physicsml.lightning.pre_batching_sample_store import construct_sample_store
+from physicsml.lightning.samplers import DynamicBatchSampler
 
 
 class PhysicsMLDataModule(LightningDataModule):
@@ -36,76 +46,219 @@ class PhysicsMLDataModule(LightningDataModule):
             predict_data=predict_data,
         )
 
+    def _graph_dataset_kwargs(self, split: str) -> dict[str, Any]:
+        return {
+            "x_features": self.model_config.x_features,
+            "y_features": self.model_config.y_features,
+            "with_y_features": (split != "predict"),
+            "atomic_numbers_col": self.model_config.datamodule.atomic_numbers_col,
+            "node_attrs_col": self.model_config.datamodule.node_attrs_col,
+            "edge_attrs_col": self.model_config.datamodule.edge_attrs_col,
+            "node_idxs_col": self.model_config.datamodule.node_idxs_col,
+            "edge_idxs_col": self.model_config.datamodule.edge_idxs_col,
+            "coordinates_col": self.model_config.datamodule.coordinates_col,
+            "graph_attrs_cols": self.model_config.datamodule.graph_attrs_cols,
+            "total_atomic_energy_col": self.model_config.datamodule.total_atomic_energy_col,
+            "y_node_scalars": self.model_config.datamodule.y_node_scalars,
+            "y_node_vector": self.model_config.datamodule.y_node_vector,
+            "y_edge_scalars": self.model_config.datamodule.y_edge_scalars,
+            "y_edge_vector": self.model_config.datamodule.y_edge_vector,
+            "y_graph_scalars": self.model_config.datamodule.y_graph_scalars,
+            "y_graph_vector": self.model_config.datamodule.y_graph_vector,
+            "num_elements": self.model_config.datamodule.num_elements,
+            "self_interaction": self.model_config.datamodule.self_interaction,
+            "pbc": self.model_config.datamodule.pbc,
+            "cell": self.model_config.datamodule.cell,
+            "cut_off": self.model_config.datamodule.cut_off,
+            "neighbour_list_cache_dir": self.model_config.datamodule.neighbour_list_cache_dir,
+            "neighbour_list_backend": self.model_config.datamodule.neighbour_list_backend,
+            "collate_neighbour_list": self.model_config.datamodule.collate_neighbour_list,
+            "compact_dtypes": self._compact_dtypes(),
+            "one_hot_on_device": self.model_config.datamodule.one_hot_on_device,
+        }
+
+    def _compact_dtypes(self) -> bool:
+        # the compact float32 coordinates would lose precision in double precision
+        is_double_precision = str(self.model_config.trainer.precision).startswith("64")
+        return self.model_config.datamodule.compact_dtypes and not is_double_precision
+
+    def _batch_dtype(self) -> torch.dtype | None:
+        # the batches are collated into ``GraphBatchDict``s in the dtype of the model
+        if not self.model_config.datamodule.collate_batch_dict:
+            return None
+        return precision_dtype(self.model_config.trainer.precision)
+
     def prepare_dataset(
         self,
-        data: datasets.Dataset,
+        data: datasets.Dataset | datasets.IterableDataset,
         split: str,
         name: str | None = None,
         **kwargs: Any,
     ) -> Dataset:
-        return GraphDataset(
+        if isinstance(data, datasets.IterableDataset):
+            return self._prepare_streaming_dataset(data, split, name)
+
+        return GraphDataset(dataset=data, **self._graph_dataset_kwargs(split))
+
+    def _prepare_streaming_dataset(
+        self,
+        data: datasets.IterableDataset,
+        split: str,
+        name: str | None,
+    ) -> StreamingGraphDataset:
+        datamodule_config = self.model_config.datamodule
+        if datamodule_config.pre_batch is not None:
+            raise ValueError("Pre-batching is not supported for streaming datasets.")
+        if (datamodule_config.max_nodes_per_batch is not None) or (
+            datamodule_config.max_edges_per_batch is not None
+        ):
+            raise ValueError(
+                "Dynamic batching is not supported for streaming datasets.",
+            )
+
+        return StreamingGraphDataset(
             dataset=data,
-            x_features=self.model_config.x_features,
-            y_features=self.model_config.y_features,
-            with_y_features=(split != "predict"),
-            atomic_numbers_col=self.model_config.datamodule.atomic_numbers_col,
-            node_attrs_col=self.model_config.datamodule.node_attrs_col,
-            edge_attrs_col=self.model_config.datamodule.edge_attrs_col,
-            node_idxs_col=self.model_config.datamodule.node_idxs_col,
-            edge_idxs_col=self.model_config.datamodule.edge_idxs_col,
-            coordinates_col=self.model_config.datamodule.coordinates_col,
-            graph_attrs_cols=self.model_config.datamodule.graph_attrs_cols,
-            total_atomic_energy_col=self.model_config.datamodule.total_atomic_energy_col,
-            y_node_scalars=self.model_config.datamodule.y_node_scalars,
-            y_node_vector=self.model_config.datamodule.y_node_vector,
-            y_edge_scalars=self.model_config.datamodule.y_edge_scalars,
-            y_edge_vector=self.model_config.datamodule.y_edge_vector,
-            y_graph_scalars=self.model_config.datamodule.y_graph_scalars,
-            y_graph_vector=self.model_config.datamodule.y_graph_vector,
-            num_elements=self.model_config.datamodule.num_elements,
-            self_interaction=self.model_config.datamodule.self_interaction,
-            pbc=self.model_config.datamodule.pbc,
-            cell=self.model_config.datamodule.cell,
-            cut_off=self.model_config.datamodule.cut_off,
+            graph_dataset_kwargs=self._graph_dataset_kwargs(split),
+            batch_size=self._get_batch_size(split, name),  # type: ignore[arg-type]
+            shuffle=(split == "train"),
+            shuffle_buffer_size=datamodule_config.shuffle_buffer_size,
+            drop_last=(split == "train") and datamodule_config.train.drop_last,
         )
 
+    def _batching_kwargs(
+        self,
+        dataset: GraphDataset,
+        batch_size: int,
+        shuffle: bool,
+        drop_last: bool,
+    ) -> dict[str, Any]:
+        """The batching kwargs of a ``GraphDataLoader``.
+
+        Uses a ``DynamicBatchSampler`` if a node or edge budget is configured and a
+        fixed ``batch_size`` otherwise.
+        """
+
+        max_nodes = self.model_config.datamodule.max_nodes_per_batch
+        max_edges = self.model_config.datamodule.max_edges_per_batch
+        if (max_nodes is None) and (max_edges is None):
+            return {
+                "batch_size": batch_size,
+                "shuffle": shuffle,
+                "drop_last": drop_last,
+            }
+
+        batch_sampler = DynamicBatchSampler(
+            SequentialSampler(dataset),
+            num_nodes=dataset.num_nodes_per_graph(),
+            max_nodes=max_nodes,
+            num_edges=(
+                dataset.num_edges_per_graph() if max_edges is not None else None
+            ),
+            max_edges=max_edges,
+            shuffle=shuffle,
+            drop_last=drop_last,
+            seed=int(os.getenv("PL_GLOBAL_SEED", 0)),
+        )
+        return {"batch_sampler": batch_sampler}
+
     def _get_one_train_dataloader(
         self,
         dataset: datasets.Dataset,
         batch_size: int,
     ) -> DataLoader:
-        if self.model_config.datamodule.pre_batch == "in_memory":
-            dataloader = DataLoader(
+        if isinstance(dataset, StreamingGraphDataset):
+            return StreamingGraphDataLoader(
                 dataset,
-                batch_size=batch_size,
-                shuffle=True,
+                batch_dtype=self._batch_dtype(),
+                pin_memory=True,
                 num_workers=int(self.model_config.datamodule.num_workers or 0),
             )
+        elif self.model_config.datamodule.pre_batch == "in_memory":
+            dataloader = GraphDataLoader(
+                dataset,
+                num_workers=int(self.model_config.datamodule.num_workers or 0),
+                **self._batching_kwargs(
+                    dataset,
+                    batch_size,
+                    shuffle=True,
+                    drop_last=False,
+                ),
+            )
             return construct_in_memory_pre_batched_dataloader(
                 dataloader,
+                batch_dtype=self._batch_dtype(),
                 shuffle=True,
+                **pre_batch_cache_kwargs(
+                    self.model_config,
+                    dataset.dataset,
+                    batch_size=batch_size,
+                    shuffle=True,
+                    with_y_features=dataset.with_y_features,
+                ),
             )
         elif self.model_config.datamodule.pre_batch == "on_disk":
-            dataloader = DataLoader(
+            dataloader = GraphDataLoader(
                 dataset,
-                batch_size=batch_size,
-                shuffle=True,
                 num_workers=int(self.model_config.datamodule.num_workers or 0),
+                **self._batching_kwargs(
+                    dataset,
+                    batch_size,
+                    shuffle=True,
+                    drop_last=False,
+                ),
             )
             return construct_on_disk_pre_batched_dataloader(
                 dataloader,
+                batch_dtype=self._batch_dtype(),
                 shuffle=True,
                 name="train",
+                **pre_batch_cache_kwargs(
+                    self.model_config,
+                    dataset.dataset,
+                    batch_size=batch_size,
+                    shuffle=True,
+                    with_y_features=dataset.with_y_features,
+                ),
+            )
+        elif self.model_config.datamodule.pre_batch == "sample_store":
+            sample_store = construct_sample_store(
+                GraphDataLoader(
+                    dataset,
+                    batch_size=batch_size,
+                    shuffle=False,
+                    num_workers=int(self.model_config.datamodule.num_workers or 0),
+                ),
+                **pre_batch_cache_kwargs(
+                    self.model_config,
+                    dataset.dataset,
+                    batch_size=batch_size,
+                    with_y_features=dataset.with_y_features,
+                ),
+            )
+            return GraphDataLoader(
+                sample_store,
+                batch_dtype=self._batch_dtype(),
+                pin_memory=True,
+                **self._batching_kwargs(
+                    dataset,
+                    batch_size,
+                    shuffle=True,
+                    drop_last=True,
+                ),
             )
         else:
-            return DataLoader(
+            return GraphDataLoader(
                 dataset,
-                batch_size=batch_size,
-                shuffle=True,
+                batch_dtype=self._batch_dtype(),
                 pin_memory=True,
                 num_workers=int(self.model_config.datamodule.num_workers or 0),
                 persistent_workers=bool(self.model_config.datamodule.num_workers),
-                drop_last=True,
+                **self._batching_kwargs(
+                    dataset,
+                    batch_size,
+                    shuffle=True,
+                    drop_last=True,
+                ),
             )
 
     def _get_one_eval_dataloader(
@@ -113,35 +266,97 @@ class PhysicsMLDataModule(LightningDataModule):
         dataset: datasets.Dataset,
         batch_size: int,
     ) -> DataLoader:
-        if self.model_config.datamodule.pre_batch == "in_memory":
-            dataloader = DataLoader(
+        if isinstance(dataset, StreamingGraphDataset):
+            return StreamingGraphDataLoader(
                 dataset,
-                batch_size=batch_size,
-                shuffle=False,
+                batch_dtype=self._batch_dtype(),
+                pin_memory=True,
                 num_workers=int(self.model_config.datamodule.num_workers or 0),
             )
+        elif self.model_config.datamodule.pre_batch == "in_memory":
+            dataloader = GraphDataLoader(
+                dataset,
+                num_workers=int(self.model_config.datamodule.num_workers or 0),
+                **self._batching_kwargs(
+                    dataset,
+                    batch_size,
+                    shuffle=False,
+                    drop_last=False,
+                ),
+            )
             return construct_in_memory_pre_batched_dataloader(
                 dataloader,
+                batch_dtype=self._batch_dtype(),
                 shuffle=False,
+                **pre_batch_cache_kwargs(
+                    self.model_config,
+                    dataset.dataset,
+                    batch_size=batch_size,
+                    shuffle=False,
+                    with_y_features=dataset.with_y_features,
+                ),
             )
         elif self.model_config.datamodule.pre_batch == "on_disk":
-            dataloader = DataLoader(
+            dataloader = GraphDataLoader(
                 dataset,
-                batch_size=batch_size,
-                shuffle=False,
                 num_workers=int(self.model_config.datamodule.num_workers or 0),
+                **self._batching_kwargs(
+                    dataset,
+                    batch_size,
+                    shuffle=False,
+                    drop_last=False,
+                ),
             )
             return construct_on_disk_pre_batched_dataloader(
                 dataloader,
+                batch_dtype=self._batch_dtype(),
                 shuffle=False,
                 name="validation",
+                **pre_batch_cache_kwargs(
+                    self.model_config,
+                    dataset.dataset,
+                    batch_size=batch_size,
+                    shuffle=False,
+                    with_y_features=dataset.with_y_features,
+                ),
+            )
+        elif self.model_config.datamodule.pre_batch == "sample_store":
+            sample_store = construct_sample_store(
+                GraphDataLoader(
+                    dataset,
+                    batch_size=batch_size,
+                    shuffle=False,
+                    num_workers=int(self.model_config.datamodule.num_workers or 0),
+                ),
+                **pre_batch_cache_kwargs(
+                    self.model_config,
+                    dataset.dataset,
+                    batch_size=batch_size,
+                    with_y_features=dataset.with_y_features,
+                ),
+            )
+            return GraphDataLoader(
+                sample_store,
+                batch_dtype=self._batch_dtype(),
+                pin_memory=True,
+                **self._batching_kwargs(
+                    dataset,
+                    batch_size,
+                    shuffle=False,
+                    drop_last=False,
+                ),
             )
         else:
-            return DataLoader(
+            return GraphDataLoader(
                 dataset,
-                batch_size=batch_size,
-                shuffle=False,
+                batch_dtype=self._batch_dtype(),
                 pin_memory=True,
                 num_workers=int(self.model_config.datamodule.num_workers or 0),
                 persistent_workers=bool(self.model_config.datamodule.num_workers),
+                **self._batching_kwargs(
+                    dataset,
+                    batch_size,
+                    shuffle=False,
+                    drop_last=False,
+                ),
             )
@@ -0,0 +1,78 @@
+from collections.abc import Callable
+from typing import Any
+
+import torch
+from torch_geometric.data import Batch
+
+# the keys which are held as python ints (not as tensors)
+SCALAR_KEYS = ("num_graphs", "num_nodes")
+
+
+def precision_dtype(precision: Any) -> torch.dtype:
+    """The dtype of the parameters of a module trained with a Lightning ``precision``."""
+
+    precision = str(precision)
+    if precision.startswith("64"):
+        return torch.float64
+    elif precision == "16-true":
+        return torch.float16
+    elif precision == "bf16-true":
+        return torch.bfloat16
+    return torch.float32
+
+
+class GraphBatchDict(dict[str, Any]):
+    """A batch of graphs as the dict of tensors which is passed to the models.
+
+    Filled once in the collate function (see ``BatchDictCollater``): the floating point
+    tensors are already in the dtype of the model, the compact integers (see
+    ``compact_dtypes``) are kept as they are (and are widened on the device) and the
+    ``SCALAR_KEYS`` are python ints (so that they are never moved to the device). Being
+    a dict, it is pinned by the ``DataLoader`` (with ``pin_memory=True``).
+    """
+
+    @classmethod
+    def from_batch(cls, batch: Batch, dtype: torch.dtype | str) -> "GraphBatchDict":
+        batch_dict = cls()
+        for k, v in batch.to_dict().items():
+            if k in SCALAR_KEYS:
+                continue
+            if not isinstance(v, torch.Tensor):
+                v = torch.tensor(v)
+            if torch.is_floating_point(v):
+                v = v.type(dtype)
+            batch_dict[k] = v
+        batch_dict["num_graphs"] = int(batch.num_graphs)
+        batch_dict["num_nodes"] = int(batch.num_nodes)
+
+        return batch_dict
+
+    def _apply(self, fn: Callable[[torch.Tensor], torch.Tensor]) -> "GraphBatchDict":
+        return GraphBatchDict(
+            {k: fn(v) if isinstance(v, torch.Tensor) else v for k, v in self.items()},
+        )
+
+    def to(
+        self,
+        device: torch.device | str,
+        non_blocking: bool = False,
+    ) -> "GraphBatchDict":
+        return self._apply(lambda v: v.to(device, non_blocking=non_blocking))
+
+    def pin_memory(self) -> "GraphBatchDict":
+        return self._apply(lambda v: v.pin_memory())
+
+    def clone(self) -> "GraphBatchDict":
+        return self._apply(lambda v: v.clone())
+
+
+class BatchDictCollater:
+    """Wraps a collate function (which returns a ``Batch``) to return a ``GraphBatchDict``
+    in ``dtype``."""
+
+    def __init__(self, collate_fn: Callable[[Any], Batch], dtype: torch.dtype) -> None:
+        self.collate_fn = collate_fn
+        self.dtype = dtype
+
+    def __call__(self, data: Any) -> GraphBatchDict:
+        return GraphBatchDict.from_batch(self.collate_fn(data), self.dtype)
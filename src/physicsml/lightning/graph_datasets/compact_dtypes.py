@@ -0,0 +1,81 @@
+from typing import TypeVar
+
+import torch
+from torch_geometric.data import Data
+
+_DataT = TypeVar("_DataT", bound=Data)
+
+# the dtypes in which graphs are held on the host (in cached and pre-batched datasets
+# and in the batches which are transferred to the device)
+COMPACT_DTYPES = {
+    "edge_index": torch.int32,
+    "raw_atomic_numbers": torch.uint8,
+    "atomic_numbers": torch.uint8,
+    "coordinates": torch.float32,
+    "cell_shift_vector": torch.int8,
+}
+
+# the compact integer keys which are used as floats by the models
+FLOAT_KEYS = {"atomic_numbers", "cell_shift_vector"}
+
+COMPACT_INT_DTYPES = {torch.uint8, torch.int8, torch.int16, torch.int32}
+
+
+def _fits(tensor: torch.Tensor, dtype: torch.dtype) -> bool:
+    if dtype.is_floating_point or (tensor.numel() == 0):
+        return True
+    info = torch.iinfo(dtype)
+    return bool((tensor.min() >= info.min) and (tensor.max() <= info.max))
+
+
+def compact_tensor(
+    key: str,
+    tensor: torch.Tensor,
+    strict: bool = False,
+) -> torch.Tensor:
+    """Casts a tensor of a graph to its compact dtype (if it has one and fits in it).
+
+    If ``strict``, raises if the values do not fit (for stores of a fixed dtype).
+    """
+
+    dtype = COMPACT_DTYPES.get(key)
+    if (dtype is None) or (tensor.dtype == dtype):
+        return tensor
+    if not _fits(tensor, dtype):
+        if strict:
+            raise ValueError(f"The values of {key} do not fit in {dtype}.")
+        return tensor
+    return tensor.type(dtype)
+
+
+def compact_graph_batch(batch: _DataT) -> _DataT:
+    """Casts the tensors of a batch (or datum) to their ``COMPACT_DTYPES`` in place.
+
+    The integer casts are lossless (tensors whose values do not fit are left as they
+    are). The tensors are widened again on the device by ``widen_tensor``.
+    """
+
+    for key in COMPACT_DTYPES:
+        value = getattr(batch, key, None)
+        if isinstance(value, torch.Tensor):
+            batch[key] = compact_tensor(key, value)
+
+    return batch
+
+
+def widen_tensor(
+    key: str,
+    tensor: torch.Tensor,
+    dtype: torch.dtype | str,
+) -> torch.Tensor:
+    """Widens a (compact) tensor of a batch to the dtype used by the models.
+
+    Floating point tensors (and the ``FLOAT_KEYS``) are cast to ``dtype`` and
+    compact integers to int64.
+    """
+
+    if torch.is_floating_point(tensor) or (key in FLOAT_KEYS):
+        return tensor.type(dtype)
+    elif tensor.dtype in COMPACT_INT_DTYPES:
+        return tensor.type(torch.int64)
+    return tensor
@@ -0,0 +1,58 @@
+from typing import Any
+
+import torch
+from torch_geometric.data import Batch
+from torch_geometric.loader.dataloader import Collater
+
+from physicsml.lightning.graph_datasets.batch_dict import BatchDictCollater
+from physicsml.lightning.graph_datasets.graph_dataset import GraphDataset
+from physicsml.lightning.pre_batching_sample_store import SampleStore
+
+
+class GraphCollater(Collater):
+    """Collates a list of ``GraphDatum``.
+
+    Batches which were already collated by ``GraphDataset.__getitems__`` (with
+    ``batched_reads``) are passed through as they are.
+    """
+
+    def __call__(self, batch: list[Any]) -> Any:
+        if (len(batch) == 1) and isinstance(batch[0], Batch):
+            return batch[0]
+
+        return super().__call__(batch)
+
+
+class GraphDataLoader(torch.utils.data.DataLoader):
+    """A ``DataLoader`` of graphs.
+
+    Yields ``Batch``es, or ``GraphBatchDict``s in ``batch_dtype`` if specified.
+    """
+
+    def __init__(
+        self,
+        dataset: GraphDataset | SampleStore,
+        batch_size: int = 1,
+        shuffle: bool = False,
+        batch_dtype: torch.dtype | None = None,
+        **kwargs: Any,
+    ) -> None:
+        # Remove for PyTorch Lightning:
+        kwargs.pop("collate_fn", None)
+
+        if isinstance(dataset, GraphDataset):
+            # read (and collate) the batches with a single slice of the arrow table
+            dataset.batched_reads = True
+
+        collate_fn: Any = GraphCollater(dataset)
+        if batch_dtype is not None:
+            collate_fn = BatchDictCollater(collate_fn, batch_dtype)
+
+        super().__init__(
+            dataset,
+            batch_size,
+            shuffle,
+            collate_fn=collate_fn,
+            **kwargs,
+        )
+        self.batch_dtype = batch_dtype
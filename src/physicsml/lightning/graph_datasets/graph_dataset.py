@@ -1,10 +1,25 @@
+from typing import Any
+
 import datasets
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 import torch
 import torch.utils.data
-from torch_geometric.data import Data, Dataset
-
+from torch_geometric.data import Batch, Data, Dataset
+from tqdm.auto import tqdm
+
+from physicsml.lightning.columnar import read_column_as_tensor
+from physicsml.lightning.graph_datasets.compact_dtypes import compact_graph_batch
+from physicsml.lightning.graph_datasets.neighbourhood_list_cache import (
+    NeighbourListCache,
+    neighbour_list_cache_key,
+)
 from physicsml.lightning.graph_datasets.neighbourhood_list_torch import (
-    construct_edge_indices_and_attrs,
+    BUILTIN_NEIGHBOUR_LIST_BACKENDS,
+    compute_batch_neighbourhood,
+    get_neighbour_list_backend,
+    merge_initial_edges,
 )
 
 
@@ -141,6 +156,21 @@ def validate_features(
     return sub_feature
 
 
+def one_hot_atomic_numbers(
+    raw_atomic_numbers: torch.Tensor,
+    num_elements: int,
+) -> torch.Tensor:
+    """The (float) one-hot encoding of the atomic numbers."""
+    atomic_numbers: torch.Tensor = (
+        torch.nn.functional.one_hot(raw_atomic_numbers, num_classes=num_elements) * 1.0
+    )
+    return atomic_numbers
+
+
+def _ptr(sizes: torch.Tensor) -> torch.Tensor:
+    return torch.cat([torch.zeros(1, dtype=torch.int64), sizes.cumsum(0)])
+
+
 class GraphDataset(Dataset):
     def __init__(
         self,
@@ -167,6 +197,11 @@ class GraphDataset(Dataset):
         pbc: tuple[bool, bool, bool] | None,
         cell: list | None,
         cut_off: float,
+        neighbour_list_cache_dir: str | None = None,
+        neighbour_list_backend: str = "auto",
+        collate_neighbour_list: bool = False,
+        compact_dtypes: bool = False,
+        one_hot_on_device: bool = False,
     ) -> None:
         super().__init__()
 
@@ -199,8 +234,26 @@ class GraphDataset(Dataset):
         else:
             self.cell_ten = None
         self.self_interaction = self_interaction
+        self.neighbour_list_backend = neighbour_list_backend
+        # fail early for unknown backends
+        get_neighbour_list_backend(self.neighbour_list_backend)
+        self.collate_neighbour_list = collate_neighbour_list
+        # whether to return the graphs in ``COMPACT_DTYPES`` (which are widened on the
+        # device by the modules)
+        self.compact_dtypes = compact_dtypes
+        # whether to leave the one-hot atomic numbers out of the graphs (they are built
+        # from the raw atomic numbers on the device by the modules)
+        self.one_hot_on_device = one_hot_on_device
+        if self.collate_neighbour_list and (
+            self.neighbour_list_backend not in BUILTIN_NEIGHBOUR_LIST_BACKENDS
+        ):
+            raise ValueError(
+                "collate_neighbour_list is only supported by the builtin neighbour "
+                f"list backends {BUILTIN_NEIGHBOUR_LIST_BACKENDS}.",
+            )
 
-        graph_dataset_features = self.x_features
+        # (a new list, so that the features of the caller are not extended)
+        graph_dataset_features = [*self.x_features]
         if self.with_y_features and (self.y_features is not None):
             # assert that all cols exist in y_features and sort features
             self.y_node_scalars = validate_features(y_node_scalars, self.y_features)
@@ -213,12 +266,73 @@ class GraphDataset(Dataset):
 
             graph_dataset_features += self.y_features
 
-        dataset.set_format(columns=graph_dataset_features)
-        self.dataset = dataset
+        if neighbour_list_cache_dir is not None:
+            cache_key = neighbour_list_cache_key(
+                dataset=dataset,
+                columns=[
+                    self.coordinates_col,
+                    self.edge_idxs_col,
+                    self.edge_attrs_col,
+                ],
+                cut_off=self.cutoff,
+                pbc=self.pbc,
+                cell=cell,
+                self_interaction=self.self_interaction,
+                neighbour_list_backend=self.neighbour_list_backend,
+            )
+
+        self.dataset = dataset.with_format(columns=graph_dataset_features)
+        # arrow formatted view of the dataset for batched reads (created lazily)
+        self._arrow_dataset: datasets.Dataset | None = None
+        # whether ``__getitems__`` returns a single pre-collated batch (which only the
+        # ``GraphCollater`` expects, set by the ``GraphDataLoader``)
+        self.batched_reads = False
+
+        if neighbour_list_cache_dir is not None:
+            self.neighbour_list_cache: NeighbourListCache | None = NeighbourListCache(
+                cache_dir=neighbour_list_cache_dir,
+                key=cache_key,
+            )
+            if not self.neighbour_list_cache.is_complete:
+                self.neighbour_list_cache.build(
+                    num_datapoints=len(self.dataset),
+                    compute_edges=self._construct_edges_from_idx,
+                )
+        else:
+            self.neighbour_list_cache = None
 
     def len(self) -> int:
         return len(self.dataset)
 
+    def num_nodes_per_graph(self) -> np.ndarray:
+        """The number of nodes of each graph (read from the coordinates column)."""
+        table = self.dataset.with_format("arrow", columns=[self.coordinates_col])[:]
+        num_nodes: np.ndarray = pc.list_value_length(
+            table.column(self.coordinates_col),
+        ).to_numpy()
+        num_nodes = num_nodes[self.indices()].astype(np.int64)
+        return num_nodes
+
+    def num_edges_per_graph(self) -> np.ndarray:
+        """The number of edges of each graph.
+
+        Read from the neighbour list cache if there is one, otherwise the edges of
+        every graph are computed.
+        """
+        num_edges: np.ndarray
+        if self.neighbour_list_cache is not None:
+            num_edges = self.neighbour_list_cache.num_edges()
+        else:
+            num_edges = np.array(
+                [
+                    self._construct_edges_from_idx(idx)[0].shape[1]
+                    for idx in tqdm(range(len(self.dataset)), desc="Counting edges")
+                ],
+                dtype=np.int64,
+            )
+        num_edges = num_edges[self.indices()]
+        return num_edges
+
     def make_y_feature(
         self,
         features: list[str] | str | None,
@@ -244,14 +358,453 @@ class GraphDataset(Dataset):
         else:
             return None
 
-    def get(self, idx: int) -> GraphDatum:
+    def make_y_feature_batch(
+        self,
+        features: list[str] | str | None,
+        table: pa.Table,
+        graph_level: bool,
+    ) -> tuple[torch.Tensor, torch.Tensor] | None:
+        """Batched version of ``make_y_feature``.
+
+        Also returns the size of each datapoint along the concatenation dimension.
+        """
+
+        if features is not None:
+            num_graphs = table.num_rows
+            if isinstance(features, list):
+                columns = [read_column_as_tensor(table.column(col)) for col in features]
+                if graph_level:
+                    y = torch.stack(
+                        [
+                            values.reshape(num_graphs, -1, *values.shape[1:])
+                            if lengths is not None
+                            else values
+                            for values, lengths in columns
+                        ],
+                        dim=1,
+                    )
+                else:
+                    y = torch.stack([values for values, _ in columns], dim=1)
+                sizes = columns[0][1]
+            elif isinstance(features, str):
+                y, sizes = read_column_as_tensor(table.column(features))
+                if graph_level and (sizes is not None):
+                    y = y.reshape(num_graphs, -1, *y.shape[1:])
+            else:
+                raise RuntimeError(f"Unknown feature type {type(features)}.")
+
+            if graph_level or (sizes is None):
+                sizes = torch.ones(num_graphs, dtype=torch.int64)
+
+            return y, sizes
+        else:
+            return None
+
+    def _construct_edges_from_idx(
+        self,
+        idx: int,
+    ) -> tuple[torch.Tensor, torch.Tensor | None, torch.Tensor]:
         datapoint = self.dataset[idx]
+        return self.construct_edges(
+            torch.tensor(datapoint[self.coordinates_col]),
+            *self.initial_edges(datapoint),
+        )
+
+    def initial_edges(
+        self,
+        datapoint: dict,
+    ) -> tuple[torch.Tensor | None, torch.Tensor | None]:
+        initial_edge_attrs = datapoint.get(self.edge_attrs_col, None)
+        initial_edge_indices = datapoint.get(self.edge_idxs_col, None)
+
+        if initial_edge_attrs == []:
+            # dataset will return list when in torch format with empty edge_attrs
+            initial_edge_attrs = torch.empty(0).float()
+        elif initial_edge_attrs is not None:
+            initial_edge_attrs = torch.tensor(initial_edge_attrs).float()
+
+        if initial_edge_indices == []:
+            # if no edge indices, add empty tensor in the same shape
+            initial_edge_indices = torch.empty(0, 2).type(torch.int64)
+        elif initial_edge_indices is not None:
+            initial_edge_indices = torch.tensor(initial_edge_indices).type(torch.int64)
+
+        return initial_edge_indices, initial_edge_attrs
+
+    def construct_edges(
+        self,
+        coordinates: torch.Tensor,
+        initial_edge_indices: torch.Tensor | None,
+        initial_edge_attrs: torch.Tensor | None,
+    ) -> tuple[torch.Tensor, torch.Tensor | None, torch.Tensor]:
+        # Construct edge indices
+        nbhd_edge_indices, nbhd_cell_shift_vector = get_neighbour_list_backend(
+            self.neighbour_list_backend,
+        )(
+            coordinates,
+            self.cutoff,
+            self.pbc,
+            self.cell_ten,
+            self.self_interaction,
+        )
+        edge_indices, edge_attrs, cell_shift_vector = merge_initial_edges(
+            num_nodes=coordinates.shape[0],
+            nbhd_edge_indices=nbhd_edge_indices,
+            nbhd_cell_shift_vector=nbhd_cell_shift_vector,
+            initial_edge_indices=initial_edge_indices,
+            initial_edge_attrs=initial_edge_attrs,
+        )
+
+        if edge_attrs is not None:
+            edge_attrs = edge_attrs * 1.0
+
+        edge_indices = edge_indices.type(torch.int64)
+
+        return edge_indices, edge_attrs, cell_shift_vector
+
+    def construct_batch_edges(
+        self,
+        coordinates: torch.Tensor,
+        num_nodes: torch.Tensor,
+        initial_edge_indices: torch.Tensor | None,
+        initial_edge_attrs: torch.Tensor | None,
+    ) -> tuple[torch.Tensor, torch.Tensor | None, torch.Tensor, torch.Tensor]:
+        """Batched version of ``construct_edges``.
+
+        Runs a single neighbour search over the concatenated ``coordinates`` of a
+        batch of graphs (with ``num_nodes`` nodes each) and merges the initial edges
+        (whose indices are into the concatenated nodes). Also returns the number of
+        edges of each graph.
+        """
+
+        num_graphs = num_nodes.shape[0]
+        batch = torch.repeat_interleave(torch.arange(num_graphs), num_nodes)
+
+        nbhd_edge_indices, nbhd_cell_shift_vector = compute_batch_neighbourhood(
+            positions=coordinates,
+            batch=batch,
+            num_graphs=num_graphs,
+            cutoff=self.cutoff,
+            pbc=self.pbc,
+            cell=self.cell_ten,
+            self_interaction=self.self_interaction,
+            backend=self.neighbour_list_backend,
+        )
+        edge_indices, edge_attrs, cell_shift_vector = merge_initial_edges(
+            num_nodes=coordinates.shape[0],
+            nbhd_edge_indices=nbhd_edge_indices,
+            nbhd_cell_shift_vector=nbhd_cell_shift_vector,
+            initial_edge_indices=initial_edge_indices,
+            initial_edge_attrs=initial_edge_attrs,
+        )
+
+        if edge_attrs is not None:
+            edge_attrs = edge_attrs * 1.0
+
+        edge_indices = edge_indices.type(torch.int64)
+
+        # the edges are grouped by graph
+        num_edges = torch.bincount(batch[edge_indices[0]], minlength=num_graphs)
+
+        return edge_indices, edge_attrs, cell_shift_vector, num_edges
+
+    def __getitems__(self, indices: list[int]) -> list[Any]:
+        if not self.batched_reads:
+            # the same as the default fetcher of a ``DataLoader``
+            return [self[idx] for idx in indices]
+
+        # returns a single pre-collated batch, see ``GraphCollater``
+        return [self.get_batch(indices)]
+
+    def get_batch(self, indices: list[int]) -> Batch:
+        """Reads and collates a batch of datapoints.
+
+        Equivalent to collating ``[self[idx] for idx in indices]``, but reads all the
+        datapoints with a single slice of the arrow table, featurises the node and
+        graph level columns in one go and assembles the ``Batch`` directly. The edges
+        are computed per datapoint, or with a single neighbour search over the whole
+        batch if ``collate_neighbour_list`` is set.
+        """
+
+        indices = [int(self.indices()[idx]) for idx in indices]
+        if self._arrow_dataset is None:
+            self._arrow_dataset = self.dataset.with_format(
+                "arrow",
+                columns=self.dataset.format["columns"],
+            )
+
+        return self.batch_from_table(self._arrow_dataset[indices], indices)
+
+    def batch_from_table(self, table: pa.Table, indices: list[int]) -> Batch:
+        """Builds the ``Batch`` of the datapoints ``indices`` from their arrow ``table``.
+
+        For readers which slice the rows themselves (such as ``MultiGraphDataset``,
+        which reads the columns of all its graphs at once). The table can have more
+        columns than the ones of this dataset.
+        """
+
+        num_graphs = table.num_rows
+
+        data: dict[str, torch.Tensor | None] = {}
+        sizes: dict[str, torch.Tensor] = {}
+
+        # nodes
+        coordinates, num_nodes = read_column_as_tensor(
+            table.column(self.coordinates_col),
+        )
+        assert num_nodes is not None
+        ptr = _ptr(num_nodes)
+
+        if self.atomic_numbers_col in table.column_names:
+            raw_atomic_numbers, _ = read_column_as_tensor(
+                table.column(self.atomic_numbers_col),
+            )
+        else:
+            raw_atomic_numbers = None
+
+        if (raw_atomic_numbers is not None) and not self.one_hot_on_device:
+            atomic_numbers: torch.Tensor | None = one_hot_atomic_numbers(
+                raw_atomic_numbers,
+                self.num_elements,
+            )
+        else:
+            atomic_numbers = None
+
+        if (self.node_attrs_col in table.column_names) and (
+            raw_atomic_numbers is not None
+        ):
+            node_attrs, _ = read_column_as_tensor(table.column(self.node_attrs_col))
+            if atomic_numbers is not None:
+                node_attrs = torch.cat([atomic_numbers, node_attrs], dim=1)
+            node_attrs = node_attrs * 1.0
+        elif atomic_numbers is not None:
+            node_attrs = atomic_numbers * 1.0
+        else:
+            node_attrs = None
+
+        data["raw_atomic_numbers"] = raw_atomic_numbers
+        data["atomic_numbers"] = atomic_numbers
+        data["node_attrs"] = node_attrs
+        data["coordinates"] = coordinates
+        for key in data:
+            sizes[key] = num_nodes
+
+        # graphs
+        if self.graph_attrs_cols is not None:
+            graph_attrs_list = []
+            for graph_attrs_col in self.graph_attrs_cols:
+                feat, _ = read_column_as_tensor(table.column(graph_attrs_col))
+                graph_attrs_list.append(feat.reshape(num_graphs, -1))
+            data["graph_attrs"] = torch.cat(graph_attrs_list, dim=1) * 1.0
+
+        if self.total_atomic_energy_col in table.column_names:
+            data["total_atomic_energy"], _ = read_column_as_tensor(
+                table.column(self.total_atomic_energy_col),
+            )
+
+        for key in ["graph_attrs", "total_atomic_energy"]:
+            sizes[key] = torch.ones(num_graphs, dtype=torch.int64)
+
+        if self.cell_ten is not None:
+            data["cell"] = self.cell_ten.repeat(num_graphs, 1)
+            sizes["cell"] = torch.full((num_graphs,), 3, dtype=torch.int64)
+
+        # edges
+        if (self.neighbour_list_cache is None) and self.collate_neighbour_list:
+            (
+                data["edge_index"],
+                data["edge_attrs"],
+                data["cell_shift_vector"],
+                num_edges,
+            ) = self.construct_batch_edges(
+                coordinates,
+                num_nodes,
+                *self._batched_initial_edges(table, ptr),
+            )
+        else:
+            if self.neighbour_list_cache is not None:
+                edges = [self.neighbour_list_cache[idx] for idx in indices]
+            else:
+                edges = []
+                for graph_coordinates, (
+                    initial_edge_indices,
+                    initial_edge_attrs,
+                ) in zip(
+                    torch.split(coordinates, num_nodes.tolist()),
+                    self._initial_edges_batch(table),
+                    strict=True,
+                ):
+                    edges.append(
+                        self.construct_edges(
+                            graph_coordinates,
+                            initial_edge_indices,
+                            initial_edge_attrs,
+                        ),
+                    )
+
+            num_edges = torch.tensor(
+                [edge_index.shape[1] for edge_index, _, _ in edges],
+                dtype=torch.int64,
+            )
+            data["edge_index"] = torch.cat(
+                [edge_index + ptr[idx] for idx, (edge_index, _, _) in enumerate(edges)],
+                dim=1,
+            )
+            data["cell_shift_vector"] = torch.cat(
+                [cell_shift_vector for _, _, cell_shift_vector in edges],
+            )
+            if edges[0][1] is not None:
+                data["edge_attrs"] = torch.cat(
+                    [
+                        edge_attrs
+                        for _, edge_attrs, _ in edges
+                        if edge_attrs is not None
+                    ],
+                )
+        for key in ["edge_index", "cell_shift_vector", "edge_attrs"]:
+            sizes[key] = num_edges
+
+        # targets
+        if self.with_y_features:
+            for key, features, graph_level in [
+                ("y_node_scalars", self.y_node_scalars, False),
+                ("y_edge_scalars", self.y_edge_scalars, False),
+                ("y_graph_scalars", self.y_graph_scalars, True),
+                ("y_node_vector", self.y_node_vector, False),
+                ("y_edge_vector", self.y_edge_vector, False),
+                ("y_graph_vector", self.y_graph_vector, True),
+            ]:
+                y_feature = self.make_y_feature_batch(features, table, graph_level)
+                if y_feature is not None:
+                    data[key], sizes[key] = y_feature
+
+        # assemble the batch in the same way as ``Batch.from_data_list``
+        batch = Batch(_base_cls=GraphDatum)
+        slice_dict = {}
+        inc_dict = {}
+        for key, value in data.items():
+            if value is None:
+                continue
+            batch[key] = value
+            slice_dict[key] = _ptr(sizes[key])
+            if key == "edge_index":
+                inc_dict[key] = ptr[:-1]
+            else:
+                inc_dict[key] = torch.zeros(num_graphs, dtype=torch.int64)
+
+        batch.num_nodes = int(ptr[-1])
+        batch.batch = torch.repeat_interleave(torch.arange(num_graphs), num_nodes)
+        batch.ptr = ptr
+        batch._store._num_nodes = num_nodes.tolist()
+        batch._num_graphs = num_graphs
+        batch._slice_dict = slice_dict
+        batch._inc_dict = inc_dict
+
+        if self.compact_dtypes:
+            batch = compact_graph_batch(batch)
+
+        return batch
+
+    def _initial_edges_batch(
+        self,
+        table: pa.Table,
+    ) -> list[tuple[torch.Tensor | None, torch.Tensor | None]]:
+        """Batched version of ``initial_edges``, split per datapoint."""
+
+        initial_edges: dict[str, list[torch.Tensor | None]] = {}
+        for col, dtype, empty in [
+            (self.edge_idxs_col, torch.int64, torch.empty(0, 2)),
+            (self.edge_attrs_col, torch.float32, torch.empty(0)),
+        ]:
+            if col not in table.column_names:
+                initial_edges[col] = [None] * table.num_rows
+                continue
+
+            values, lengths = read_column_as_tensor(table.column(col))
+            assert lengths is not None
+            initial_edges[col] = [
+                # same empty tensors as for an empty list
+                value.type(dtype) if value.shape[0] > 0 else empty.type(dtype)
+                for value in torch.split(values, lengths.tolist())
+            ]
+
+        return list(
+            zip(
+                initial_edges[self.edge_idxs_col],
+                initial_edges[self.edge_attrs_col],
+                strict=True,
+            ),
+        )
+
+    def _batched_initial_edges(
+        self,
+        table: pa.Table,
+        ptr: torch.Tensor,
+    ) -> tuple[torch.Tensor | None, torch.Tensor | None]:
+        """Batched version of ``initial_edges``, indexing the concatenated nodes."""
+
+        if self.edge_idxs_col in table.column_names:
+            values, lengths = read_column_as_tensor(table.column(self.edge_idxs_col))
+            assert lengths is not None
+            if values.shape[0] > 0:
+                initial_edge_indices: torch.Tensor | None = (
+                    values + torch.repeat_interleave(ptr[:-1], lengths).unsqueeze(1)
+                ).type(torch.int64)
+            else:
+                initial_edge_indices = torch.empty(0, 2).type(torch.int64)
+        else:
+            initial_edge_indices = None
+
+        if self.edge_attrs_col in table.column_names:
+            values, _ = read_column_as_tensor(table.column(self.edge_attrs_col))
+            if values.shape[0] > 0:
+                initial_edge_attrs: torch.Tensor | None = values.float()
+            else:
+                initial_edge_attrs = torch.empty(0).float()
+        else:
+            initial_edge_attrs = None
+
+        return initial_edge_indices, initial_edge_attrs
+
+    def __getstate__(self) -> dict[str, Any]:
+        # the arrow view is re-created lazily in each data loader worker
+        state = self.__dict__.copy()
+        state["_arrow_dataset"] = None
+        return state
+
+    def get(self, idx: int) -> GraphDatum:
+        return self.datum_from_row(self.dataset[idx], idx)
+
+    def y_features_from_row(self, datapoint: dict) -> dict[str, torch.Tensor | None]:
+        """The targets of a datapoint (all ``None`` if not ``with_y_features``)."""
+
+        y_features: dict[str, torch.Tensor | None] = {}
+        for key in [
+            "y_node_scalars",
+            "y_edge_scalars",
+            "y_graph_scalars",
+            "y_node_vector",
+            "y_edge_vector",
+            "y_graph_vector",
+        ]:
+            if self.with_y_features:
+                y_features[key] = self.make_y_feature(
+                    getattr(self, key),
+                    datapoint,
+                    graph_level=key.startswith("y_graph"),
+                )
+            else:
+                y_features[key] = None
+
+        return y_features
+
+    def datum_from_row(self, datapoint: dict, idx: int) -> GraphDatum:
+        """Builds the ``GraphDatum`` of the datapoint ``idx`` from its (already read)
+        row."""
 
         # Extract data from datapoint
         raw_atomic_numbers = datapoint.get(self.atomic_numbers_col, None)
         node_attrs = datapoint.get(self.node_attrs_col, None)
-        initial_edge_attrs = datapoint.get(self.edge_attrs_col, None)
-        initial_edge_indices = datapoint.get(self.edge_idxs_col, None)
         coordinates = datapoint[self.coordinates_col]
         total_atomic_energy = datapoint.get(self.total_atomic_energy_col, None)
 
@@ -273,12 +826,11 @@ class GraphDataset(Dataset):
 
         if raw_atomic_numbers is not None:
             raw_atomic_numbers = torch.tensor(raw_atomic_numbers)
-            atomic_numbers: torch.Tensor | None = (
-                torch.nn.functional.one_hot(
-                    raw_atomic_numbers,
-                    num_classes=self.num_elements,
-                )
-                * 1.0
+
+        if (raw_atomic_numbers is not None) and not self.one_hot_on_device:
+            atomic_numbers: torch.Tensor | None = one_hot_atomic_numbers(
+                raw_atomic_numbers,
+                self.num_elements,
             )
         else:
             atomic_numbers = None
@@ -289,84 +841,27 @@ class GraphDataset(Dataset):
         if coordinates is not None:
             coordinates = torch.tensor(coordinates)
 
-        if (node_attrs is not None) and (atomic_numbers is not None):
-            node_attrs = (
-                torch.cat([atomic_numbers, torch.tensor(node_attrs)], dim=1) * 1.0
-            )
+        if (node_attrs is not None) and (raw_atomic_numbers is not None):
+            node_attrs = torch.tensor(node_attrs)
+            if atomic_numbers is not None:
+                node_attrs = torch.cat([atomic_numbers, node_attrs], dim=1)
+            node_attrs = node_attrs * 1.0
         elif atomic_numbers is not None:
             node_attrs = atomic_numbers * 1.0
         else:
             node_attrs = None
 
-        if initial_edge_attrs == []:
-            # dataset will return list when in torch format with empty edge_attrs
-            initial_edge_attrs = torch.empty(0).float()
-        elif initial_edge_attrs is not None:
-            initial_edge_attrs = torch.tensor(initial_edge_attrs).float()
-
-        if initial_edge_indices == []:
-            # if no edge indices, add empty tensor in the same shape
-            initial_edge_indices = torch.empty(0, 2).type(torch.int64)
-        elif initial_edge_indices is not None:
-            initial_edge_indices = torch.tensor(initial_edge_indices).type(torch.int64)
-
-        # Construct edge indices
-        edge_indices, edge_attrs, cell_shift_vector = construct_edge_indices_and_attrs(
-            positions=coordinates,
-            initial_edge_indices=initial_edge_indices,
-            initial_edge_attrs=initial_edge_attrs,
-            pbc=self.pbc,
-            cell=self.cell_ten,
-            cutoff=self.cutoff,
-            self_interaction=self.self_interaction,
-        )
-
-        if edge_attrs is not None:
-            edge_attrs = edge_attrs * 1.0
+        if self.neighbour_list_cache is not None:
+            edge_indices, edge_attrs, cell_shift_vector = self.neighbour_list_cache[idx]
+        else:
+            edge_indices, edge_attrs, cell_shift_vector = self.construct_edges(
+                coordinates,
+                *self.initial_edges(datapoint),
+            )
 
-        if edge_indices is not None:
-            edge_indices = edge_indices.type(torch.int64)
+        y_features = self.y_features_from_row(datapoint)
 
-        if self.with_y_features:
-            y_node_scalars = self.make_y_feature(
-                self.y_node_scalars,
-                datapoint,
-                graph_level=False,
-            )
-            y_edge_scalars = self.make_y_feature(
-                self.y_edge_scalars,
-                datapoint,
-                graph_level=False,
-            )
-            y_graph_scalars = self.make_y_feature(
-                self.y_graph_scalars,
-                datapoint,
-                graph_level=True,
-            )
-            y_node_vector = self.make_y_feature(
-                self.y_node_vector,
-                datapoint,
-                graph_level=False,
-            )
-            y_edge_vector = self.make_y_feature(
-                self.y_edge_vector,
-                datapoint,
-                graph_level=False,
-            )
-            y_graph_vector = self.make_y_feature(
-                self.y_graph_vector,
-                datapoint,
-                graph_level=True,
-            )
-        else:
-            y_node_scalars = None
-            y_edge_scalars = None
-            y_graph_scalars = None
-            y_node_vector = None
-            y_edge_vector = None
-            y_graph_vector = None
-
-        return GraphDatum(
+        datum = GraphDatum(
             raw_atomic_numbers=raw_atomic_numbers,
             atomic_numbers=atomic_numbers,
             total_atomic_energy=total_atomic_energy,
@@ -376,11 +871,11 @@ class GraphDataset(Dataset):
             node_attrs=node_attrs,
             edge_attrs=edge_attrs,
             graph_attrs=graph_attrs,
-            y_node_scalars=y_node_scalars,
-            y_node_vector=y_node_vector,
-            y_edge_scalars=y_edge_scalars,
-            y_edge_vector=y_edge_vector,
-            y_graph_scalars=y_graph_scalars,
-            y_graph_vector=y_graph_vector,
             cell=self.cell_ten,
+            **y_features,
         )
+
+        if self.compact_dtypes:
+            datum = compact_graph_batch(datum)
+
+        return datum
@@ -0,0 +1,255 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import datasets
+import numpy as np
+import torch
+from filelock import FileLock
+from tqdm.auto import tqdm
+
+from physicsml.lightning.graph_datasets.compact_dtypes import compact_tensor
+
+# bump when the on-disk layout changes so that old caches are not picked up
+CACHE_FORMAT_VERSION = 1
+
+EdgesT = tuple[torch.Tensor, torch.Tensor | None, torch.Tensor]
+
+
+def neighbour_list_cache_key(
+    dataset: datasets.Dataset,
+    columns: list[str | None],
+    cut_off: float,
+    pbc: tuple[bool, bool, bool] | None,
+    cell: list | None,
+    self_interaction: bool,
+    neighbour_list_backend: str = "auto",
+) -> str:
+    """Computes the content-address of a neighbour list cache.
+
+    The key is derived from the dataset fingerprint (which changes with every
+    transform applied to the dataset) and all the parameters that affect the
+    edges of the graphs.
+    """
+
+    key_dict = {
+        "version": CACHE_FORMAT_VERSION,
+        "fingerprint": dataset._fingerprint,
+        "num_rows": len(dataset),
+        "columns": columns,
+        "cut_off": float(cut_off),
+        "pbc": list(pbc) if pbc is not None else None,
+        "cell": cell,
+        "self_interaction": self_interaction,
+        "neighbour_list_backend": neighbour_list_backend,
+    }
+
+    return hashlib.sha256(
+        json.dumps(key_dict, sort_keys=True).encode("utf-8"),
+    ).hexdigest()
+
+
+class _RaggedArrayWriter:
+    """Streams a list of arrays with a common trailing shape to a raw binary file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.file = open(path, "wb")
+        self.ptr = [0]
+        self.ndims: list[int] = []
+        self.dtype: str | None = None
+        self.trailing_shape: list[int] | None = None
+
+    def append(self, array: np.ndarray) -> None:
+        self.ndims.append(array.ndim)
+        if array.shape[0] > 0:
+            if self.dtype is None:
+                self.dtype = array.dtype.str
+                self.trailing_shape = list(array.shape[1:])
+            assert array.dtype.str == self.dtype
+            assert list(array.shape[1:]) == self.trailing_shape
+
+            self.file.write(np.ascontiguousarray(array).tobytes())
+        self.ptr.append(self.ptr[-1] + array.shape[0])
+
+    def close(self) -> dict[str, Any]:
+        self.file.close()
+        np.save(self.path.with_suffix(".ptr.npy"), np.array(self.ptr, dtype=np.int64))
+        np.save(
+            self.path.with_suffix(".ndim.npy"),
+            np.array(self.ndims, dtype=np.int8),
+        )
+
+        return {
+            "dtype": self.dtype,
+            "trailing_shape": self.trailing_shape,
+            "length": self.ptr[-1],
+        }
+
+
+class _RaggedArrayReader:
+    """Memory-maps an array written by ``_RaggedArrayWriter``."""
+
+    def __init__(self, path: Path, meta: dict[str, Any]) -> None:
+        self.ptr = np.load(path.with_suffix(".ptr.npy"))
+        self.ndims = np.load(path.with_suffix(".ndim.npy"))
+        self.dtype = np.dtype(meta["dtype"] or np.float32)
+        self.trailing_shape = tuple(meta["trailing_shape"] or ())
+
+        if meta["length"] > 0:
+            self.data: np.ndarray | None = np.memmap(
+                path,
+                dtype=np.dtype(meta["dtype"]),
+                mode="r",
+                shape=(meta["length"], *meta["trailing_shape"]),
+            )
+        else:
+            self.data = None
+
+    def __getitem__(self, idx: int) -> np.ndarray:
+        start, end = int(self.ptr[idx]), int(self.ptr[idx + 1])
+        if (self.data is None) or (start == end):
+            # empty arrays keep the shape of the original array
+            ndim = int(self.ndims[idx])
+            if ndim == len(self.trailing_shape) + 1:
+                return np.empty((0, *self.trailing_shape), dtype=self.dtype)
+            return np.empty((0,) * ndim, dtype=self.dtype)
+
+        # copy out of the memory map (torch does not support read-only arrays)
+        return np.array(self.data[start:end])
+
+
+class NeighbourListCache:
+    """An on-disk, memory-mapped cache of the edges of a graph dataset.
+
+    Stores the ``edge_index``, ``cell_shift_vector`` and merged ``edge_attrs`` of
+    every datapoint in a directory named after the content-address of the
+    dataset and the neighbourhood parameters. The cache is built once (guarded by
+    a file lock so that concurrent processes do not duplicate the work) and is
+    then shared by all data loader workers and later runs.
+    """
+
+    _arrays = ("edge_index", "cell_shift_vector", "edge_attrs")
+
+    def __init__(self, cache_dir: str, key: str) -> None:
+        self.root = Path(cache_dir)
+        self.path = self.root / key
+        self._readers: dict[str, _RaggedArrayReader] | None = None
+        self._meta: dict[str, Any] | None = None
+
+    @property
+    def is_complete(self) -> bool:
+        return (self.path / "meta.json").exists()
+
+    def build(
+        self,
+        num_datapoints: int,
+        compute_edges: Callable[[int], EdgesT],
+    ) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        with FileLock(str(self.path) + ".lock"):
+            if self.is_complete:
+                return
+
+            tmp_path = self.root / f"{self.path.name}.tmp-{uuid.uuid4().hex}"
+            tmp_path.mkdir()
+            try:
+                writers = {
+                    name: _RaggedArrayWriter(tmp_path / f"{name}.bin")
+                    for name in self._arrays
+                }
+                has_edge_attrs = True
+
+                for idx in tqdm(
+                    range(num_datapoints),
+                    desc="Building neighbour list cache",
+                ):
+                    edge_index, edge_attrs, cell_shift_vector = compute_edges(idx)
+
+                    # store as [n_edges, 2] so that each datapoint is contiguous (and
+                    # in the compact dtypes)
+                    writers["edge_index"].append(
+                        compact_tensor("edge_index", edge_index, strict=True)
+                        .transpose(0, 1)
+                        .numpy(),
+                    )
+                    writers["cell_shift_vector"].append(
+                        compact_tensor(
+                            "cell_shift_vector",
+                            cell_shift_vector,
+                            strict=True,
+                        ).numpy(),
+                    )
+                    if edge_attrs is None:
+                        has_edge_attrs = False
+                        writers["edge_attrs"].append(np.empty((0, 0)))
+                    else:
+                        writers["edge_attrs"].append(edge_attrs.numpy())
+
+                meta: dict[str, Any] = {
+                    name: writer.close() for name, writer in writers.items()
+                }
+                meta["has_edge_attrs"] = has_edge_attrs
+                meta["num_datapoints"] = num_datapoints
+
+                # meta.json is written last and marks the cache as complete
+                with open(tmp_path / "meta.json", "w") as f:
+                    json.dump(meta, f)
+
+                if self.path.exists():
+                    shutil.rmtree(self.path)
+                os.replace(tmp_path, self.path)
+            finally:
+                if tmp_path.exists():
+                    shutil.rmtree(tmp_path)
+
+    def _open(self) -> tuple[dict[str, _RaggedArrayReader], dict[str, Any]]:
+        if (self._readers is None) or (self._meta is None):
+            with open(self.path / "meta.json") as f:
+                self._meta = json.load(f)
+            self._readers = {
+                name: _RaggedArrayReader(self.path / f"{name}.bin", self._meta[name])
+                for name in self._arrays
+            }
+
+        return self._readers, self._meta
+
+    def __len__(self) -> int:
+        _, meta = self._open()
+        return int(meta["num_datapoints"])
+
+    def num_edges(self) -> np.ndarray:
+        """The number of edges of each datapoint."""
+        readers, _ = self._open()
+        return np.diff(readers["edge_index"].ptr)
+
+    def __getitem__(self, idx: int) -> EdgesT:
+        readers, meta = self._open()
+
+        # widened to the dtypes of the computed neighbour lists
+        edge_index = torch.from_numpy(readers["edge_index"][idx]).type(torch.int64)
+        edge_index = edge_index.reshape(-1, 2).transpose(0, 1)
+        cell_shift_vector = torch.from_numpy(readers["cell_shift_vector"][idx])
+        cell_shift_vector = cell_shift_vector.reshape(-1, 3).type(torch.float32)
+
+        if meta["has_edge_attrs"]:
+            edge_attrs: torch.Tensor | None = torch.from_numpy(
+                readers["edge_attrs"][idx],
+            )
+        else:
+            edge_attrs = None
+
+        return edge_index, edge_attrs, cell_shift_vector
+
+    def __getstate__(self) -> dict[str, Any]:
+        # memory maps are re-opened lazily in each data loader worker
+        state = self.__dict__.copy()
+        state["_readers"] = None
+        state["_meta"] = None
+        return state
@@ -1,3 +1,5 @@
+from collections.abc import Callable
+
 import torch
 from torch_geometric.utils import (
     coalesce,
@@ -50,23 +52,218 @@ def compute_neighborlist_n2_no_cell(
     )
 
 
+def compute_neighborlist_n2_batch_no_cell(
+    cutoff: float,
+    pos: torch.Tensor,
+    self_interaction: bool,
+    batch: torch.Tensor,
+    num_graphs: int,
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Batched version of ``compute_neighborlist_n2_no_cell``.
+
+    Only computes the distances between the atoms of the same structure by padding
+    the structures to the size of the largest one. The atoms of each structure must
+    be contiguous.
+    """
+
+    device = pos.device
+    num_nodes = torch.bincount(batch, minlength=num_graphs)
+    ptr = torch.cumsum(num_nodes, dim=0) - num_nodes
+    max_num_nodes = int(num_nodes.max())
+
+    # padding atoms at infinity are never within the cutoff
+    padded_pos = torch.full(
+        (num_graphs, max_num_nodes, 3),
+        float("inf"),
+        dtype=pos.dtype,
+        device=device,
+    )
+    padded_pos[batch, torch.arange(pos.shape[0], device=device) - ptr[batch]] = pos
+
+    r_ij = ((padded_pos.unsqueeze(1) - padded_pos.unsqueeze(2)) ** 2).sum(-1)
+    mask = r_ij <= cutoff**2
+    if not self_interaction:
+        mask = mask & ~torch.eye(max_num_nodes, dtype=torch.bool, device=device)
+
+    graph_idx, senders, receivers = mask.nonzero().unbind(1)
+    edge_indices = torch.stack(
+        [ptr[graph_idx] + senders, ptr[graph_idx] + receivers],
+        dim=0,
+    )
+
+    return edge_indices, torch.zeros(
+        (edge_indices.shape[1], 3),
+        dtype=pos.dtype,
+        device=pos.device,
+    )
+
+
+def compute_neighborlist_binned_no_cell(
+    cutoff: float,
+    pos: torch.Tensor,
+    self_interaction: bool,
+    batch: torch.Tensor | None = None,
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Cell list neighbour search for open boundaries.
+
+    Bins the atoms into cubes of side ``cutoff`` and only computes the distances to
+    the atoms in the 27 neighbouring bins, which scales linearly with the number of
+    atoms. Returns the same edges (in the same order) as
+    ``compute_neighborlist_n2_no_cell``.
+
+    If a ``batch`` vector is given, the bins are also keyed by the structure of each
+    atom so that the neighbourhoods of a whole batch of (contiguous) structures are
+    computed at once.
+    """
+
+    num_atoms = pos.shape[0]
+    device = pos.device
+    if num_atoms == 0:
+        return torch.zeros((2, 0), dtype=torch.long, device=device), torch.zeros(
+            (0, 3),
+            dtype=pos.dtype,
+            device=device,
+        )
+
+    bins_3d = torch.floor((pos - pos.min(dim=0).values) / cutoff).to(torch.long)
+    num_bins_3d = bins_3d.max(dim=0).values + 1
+    strides = torch.stack(
+        [
+            num_bins_3d[1] * num_bins_3d[2],
+            num_bins_3d[2],
+            torch.ones_like(num_bins_3d[2]),
+        ],
+    )
+    num_bins = num_bins_3d.prod()
+    bins = (bins_3d * strides).sum(-1)
+    if batch is not None:
+        bins = bins + batch * num_bins
+
+    # atoms sorted by bin and the range of each occupied bin
+    bins_sorted, order = torch.sort(bins)
+    occupied_bins, counts = torch.unique_consecutive(bins_sorted, return_counts=True)
+    starts = torch.cumsum(counts, dim=0) - counts
+
+    # the 27 neighbouring bins of each atom (including its own)
+    offsets = torch.tensor([-1, 0, 1], dtype=torch.long, device=device)
+    offsets = torch.cartesian_prod(offsets, offsets, offsets)
+    neighbour_bins_3d = bins_3d.unsqueeze(1) + offsets.unsqueeze(0)
+    valid = ((neighbour_bins_3d >= 0) & (neighbour_bins_3d < num_bins_3d)).all(-1)
+    neighbour_bins = (neighbour_bins_3d * strides).sum(-1)
+    if batch is not None:
+        neighbour_bins = neighbour_bins + batch.unsqueeze(1) * num_bins
+
+    bin_idx = torch.searchsorted(occupied_bins, neighbour_bins).clamp(
+        max=occupied_bins.shape[0] - 1,
+    )
+    valid = valid & (occupied_bins[bin_idx] == neighbour_bins)
+
+    # candidate pairs: every atom with every atom of its occupied neighbouring bins
+    senders = torch.arange(num_atoms, device=device).unsqueeze(1).expand_as(bin_idx)
+    senders = senders[valid]
+    bin_idx = bin_idx[valid]
+    num_candidates = counts[bin_idx]
+    candidate_ptr = torch.cumsum(num_candidates, dim=0) - num_candidates
+
+    senders = torch.repeat_interleave(senders, num_candidates)
+    candidate_idx = torch.arange(senders.shape[0], device=device)
+    candidate_idx = (
+        candidate_idx
+        - torch.repeat_interleave(candidate_ptr, num_candidates)
+        + torch.repeat_interleave(starts[bin_idx], num_candidates)
+    )
+    receivers = order[candidate_idx]
+
+    # apply the cutoff
+    r_ij = ((pos[senders] - pos[receivers]) ** 2).sum(-1)
+    mask = r_ij <= cutoff**2
+    if not self_interaction:
+        mask = mask & (senders != receivers)
+    senders = senders[mask]
+    receivers = receivers[mask]
+
+    # same (row major) order as the dense algorithm
+    _, perm = torch.sort(senders * num_atoms + receivers)
+    edge_indices = torch.stack([senders[perm], receivers[perm]], dim=0)
+
+    return edge_indices, torch.zeros(
+        (edge_indices.shape[1], 3),
+        dtype=pos.dtype,
+        device=pos.device,
+    )
+
+
+# backends which can be used in torchscript (e.g. in the openmm plugin)
+BUILTIN_NEIGHBOUR_LIST_BACKENDS = ("auto", "dense", "linked_cell", "binned")
+
+
 @torch.jit.script
-def construct_edge_indices_and_attrs(
+def select_neighbour_list_backend(
+    num_atoms: int,
+    periodic: bool,
+    device_type: str,
+    max_dense_num_atoms_cpu: int = 500,
+    max_dense_num_atoms_cuda: int = 4096,
+) -> str:
+    # the dense N^2 algorithm is the fastest for small systems (especially on gpus)
+    # but its memory grows quadratically with the number of atoms
+    if periodic:
+        return "linked_cell"
+
+    if device_type == "cuda":
+        use_dense = num_atoms <= max_dense_num_atoms_cuda
+    else:
+        use_dense = num_atoms <= max_dense_num_atoms_cpu
+
+    if use_dense:
+        return "dense"
+    else:
+        return "binned"
+
+
+@torch.jit.script
+def compute_neighbourhood(
     positions: torch.Tensor,
     cutoff: float,
-    initial_edge_indices: torch.Tensor | None,
-    initial_edge_attrs: torch.Tensor | None,
     pbc: tuple[bool, bool, bool] | None,
     cell: torch.Tensor | None,
     self_interaction: bool,
-) -> tuple[torch.Tensor, torch.Tensor | None, torch.Tensor]:
-    # Use neighborlist if >500 atoms, otherwise use naive N^2 algorithm.
-    #if pbc is None or cell is None and positions.shape[0] > 500:
-    #    pbc = (False, False, False)
-    #    pos_max = positions.abs().max()
-    #    cell = 10 * pos_max * torch.eye(3, dtype=positions.dtype, device=positions.device)
-    if (pbc is not None) and (cell is not None):
-        cell = cell.type(positions.dtype).to(positions.device)
+    backend: str = "auto",
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Computes the neighbourhood edge indices [2, n_edges] and cell shift vectors.
+
+    The ``backend`` is one of
+
+    * ``"dense"``: all pairwise distances (N^2 memory, non-periodic only).
+    * ``"binned"``: cell list on a grid of side ``cutoff`` (non-periodic only).
+    * ``"linked_cell"``: the linked cell algorithm (periodic and non-periodic).
+    * ``"auto"``: ``"linked_cell"`` for periodic systems, ``"dense"`` for small and
+      ``"binned"`` for large non-periodic systems (depending on the device).
+    """
+
+    if positions.shape[0] == 0:
+        return (
+            torch.zeros(2, 0, dtype=torch.long, device=positions.device),
+            torch.zeros(0, 3, dtype=positions.dtype, device=positions.device),
+        )
+
+    periodic = (pbc is not None) and (cell is not None)
+    if backend == "auto":
+        backend = select_neighbour_list_backend(
+            positions.shape[0],
+            periodic,
+            positions.device.type,
+        )
+
+    if backend == "linked_cell":
+        if (pbc is not None) and (cell is not None):
+            cell = cell.type(positions.dtype).to(positions.device)
+            pbc_ten = torch.tensor(pbc).to(positions.device)
+        else:
+            # open boundaries: a non-periodic box around the positions
+            positions = positions - positions.min(dim=0).values
+            cell = torch.diag(positions.max(dim=0).values + 1.0)
+            pbc_ten = torch.tensor([False, False, False], device=positions.device)
 
         # solve pos = coefs^T @ cell
         # pos = pos - torch.floor(coefs) @ cell
@@ -78,7 +275,7 @@ def construct_edge_indices_and_attrs(
             cutoff=cutoff,
             pos=wrapped_positions,
             cell=cell,
-            pbc=torch.tensor(pbc).to(positions.device),
+            pbc=pbc_ten,
             batch=torch.zeros(
                 positions.shape[0],
                 dtype=torch.long,
@@ -91,13 +288,304 @@ def construct_edge_indices_and_attrs(
             nbhd_cell_shift_vector = nbhd_cell_shift_vector + (
                 coefs[nbhd_edge_indices[0]] - coefs[nbhd_edge_indices[1]]
             )
-    else:
+    elif periodic:
+        raise RuntimeError(
+            f"Neighbour list backend '{backend}' does not support periodic systems.",
+        )
+    elif backend == "dense":
         nbhd_edge_indices, nbhd_cell_shift_vector = compute_neighborlist_n2_no_cell(
             cutoff=cutoff,
             pos=positions,
             self_interaction=self_interaction,
         )
+    elif backend == "binned":
+        nbhd_edge_indices, nbhd_cell_shift_vector = compute_neighborlist_binned_no_cell(
+            cutoff=cutoff,
+            pos=positions,
+            self_interaction=self_interaction,
+        )
+    else:
+        raise RuntimeError(f"Unknown neighbour list backend '{backend}'.")
+
+    return nbhd_edge_indices, nbhd_cell_shift_vector
+
+
+@torch.jit.script
+def compute_batch_neighbourhood(
+    positions: torch.Tensor,
+    batch: torch.Tensor,
+    num_graphs: int,
+    cutoff: float,
+    pbc: tuple[bool, bool, bool] | None,
+    cell: torch.Tensor | None,
+    self_interaction: bool,
+    backend: str = "auto",
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Computes the neighbourhoods of a batch of structures with a single search.
+
+    The atoms of each structure must be contiguous (as in a ``Batch``). Returns the
+    edge indices [2, n_edges] into the batched positions, grouped by structure, and
+    the cell shift vectors [n_edges, 3]. ``"auto"`` picks the backend from the size
+    of the largest structure (see ``select_neighbour_list_backend``).
+    """
+
+    if positions.shape[0] == 0:
+        return (
+            torch.zeros(2, 0, dtype=torch.long, device=positions.device),
+            torch.zeros(0, 3, dtype=positions.dtype, device=positions.device),
+        )
+
+    periodic = (pbc is not None) and (cell is not None)
+    if backend == "auto":
+        backend = select_neighbour_list_backend(
+            int(torch.bincount(batch, minlength=num_graphs).max()),
+            periodic,
+            positions.device.type,
+        )
+
+    if backend == "linked_cell":
+        if (pbc is not None) and (cell is not None):
+            cell = cell.type(positions.dtype).to(positions.device)
+            pbc_ten = torch.tensor(pbc).to(positions.device)
+        else:
+            # open boundaries: a non-periodic box around all the positions
+            positions = positions - positions.min(dim=0).values
+            cell = torch.diag(positions.max(dim=0).values + 1.0)
+            pbc_ten = torch.tensor([False, False, False], device=positions.device)
+
+        coefs = torch.floor(torch.matmul(positions, torch.inverse(cell)))
+        wrapped_positions = positions - torch.matmul(coefs, cell)
+
+        nbhd_edge_indices, _, nbhd_cell_shift_vector = compute_neighborlist(
+            cutoff=cutoff,
+            pos=wrapped_positions,
+            cell=cell.repeat(num_graphs, 1),
+            pbc=pbc_ten.repeat(num_graphs, 1),
+            batch=batch,
+            self_interaction=self_interaction,
+        )
+
+        if nbhd_cell_shift_vector.numel() > 0:
+            nbhd_cell_shift_vector = nbhd_cell_shift_vector + (
+                coefs[nbhd_edge_indices[0]] - coefs[nbhd_edge_indices[1]]
+            )
+    elif periodic:
+        raise RuntimeError(
+            f"Neighbour list backend '{backend}' does not support periodic systems.",
+        )
+    elif backend == "dense":
+        nbhd_edge_indices, nbhd_cell_shift_vector = (
+            compute_neighborlist_n2_batch_no_cell(
+                cutoff=cutoff,
+                pos=positions,
+                self_interaction=self_interaction,
+                batch=batch,
+                num_graphs=num_graphs,
+            )
+        )
+    elif backend == "binned":
+        nbhd_edge_indices, nbhd_cell_shift_vector = compute_neighborlist_binned_no_cell(
+            cutoff=cutoff,
+            pos=positions,
+            self_interaction=self_interaction,
+            batch=batch,
+        )
+    else:
+        raise RuntimeError(f"Unknown neighbour list backend '{backend}'.")
+
+    return nbhd_edge_indices, nbhd_cell_shift_vector
+
+
+@torch.jit.script
+def mask_edges_to_cutoff(
+    positions: torch.Tensor,
+    edge_indices: torch.Tensor,
+    cell_shift_vector: torch.Tensor,
+    cell: torch.Tensor | None,
+    cutoff: float,
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Keeps the edges [2, n_edges] (and their cell shifts) within the cutoff."""
+
+    r_ji = positions[edge_indices[1]] - positions[edge_indices[0]]
+    if cell is not None:
+        r_ji = r_ji + torch.matmul(cell_shift_vector.type(cell.dtype), cell)
+    mask = (r_ji**2).sum(-1) <= cutoff**2
+
+    return edge_indices[:, mask], cell_shift_vector[mask]
+
+
+class VerletNeighbourList(torch.nn.Module):
+    """A Verlet (skin) neighbour list for molecular dynamics.
+
+    The neighbour list is built with a cutoff of ``cutoff + skin`` and reused until an
+    atom has moved by more than ``skin / 2`` since it was built (or the cell has
+    changed). On every call, the edges are masked down to the true ``cutoff``. The
+    state is kept in non-persistent buffers so that the module can be scripted.
+    """
+
+    def __init__(
+        self,
+        cutoff: float,
+        skin: float,
+        self_interaction: bool,
+        backend: str = "auto",
+    ) -> None:
+        super().__init__()
+
+        if skin < 0.0:
+            raise ValueError(f"Neighbour list skin must be non-negative, got {skin}.")
+
+        self.cutoff = cutoff
+        self.skin = skin
+        self.self_interaction = self_interaction
+        self.backend = backend
+        self.num_builds = 0
+
+        self.register_buffer("reference_positions", torch.empty(0, 3), persistent=False)
+        self.register_buffer("reference_cell", torch.empty(0, 3), persistent=False)
+        self.register_buffer(
+            "edge_indices",
+            torch.empty(2, 0, dtype=torch.int64),
+            persistent=False,
+        )
+        self.register_buffer("cell_shift_vector", torch.empty(0, 3), persistent=False)
+
+    def needs_rebuild(self, positions: torch.Tensor, cell: torch.Tensor | None) -> bool:
+        if (self.num_builds == 0) or (
+            positions.shape != self.reference_positions.shape
+        ):
+            return True
+
+        if cell is None:
+            if self.reference_cell.numel() > 0:
+                return True
+        elif (cell.shape != self.reference_cell.shape) or (
+            not torch.equal(cell, self.reference_cell)
+        ):
+            return True
+
+        if positions.shape[0] == 0:
+            return False
+
+        max_displacement_squared = (
+            ((positions - self.reference_positions) ** 2).sum(-1).max()
+        )
+        return bool(max_displacement_squared > (0.5 * self.skin) ** 2)
+
+    def forward(
+        self,
+        positions: torch.Tensor,
+        pbc: tuple[bool, bool, bool] | None,
+        cell: torch.Tensor | None,
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        positions = positions.detach()
+        if cell is not None:
+            cell = cell.detach()
+
+        if self.needs_rebuild(positions, cell):
+            edge_indices, cell_shift_vector = compute_neighbourhood(
+                positions=positions,
+                cutoff=self.cutoff + self.skin,
+                pbc=pbc,
+                cell=cell,
+                self_interaction=self.self_interaction,
+                backend=self.backend,
+            )
+            self.edge_indices = edge_indices
+            self.cell_shift_vector = cell_shift_vector
+            self.reference_positions = positions.clone()
+            if cell is not None:
+                self.reference_cell = cell.clone()
+            else:
+                self.reference_cell = torch.empty(
+                    0,
+                    3,
+                    dtype=positions.dtype,
+                    device=positions.device,
+                )
+            self.num_builds += 1
 
+        edge_indices, cell_shift_vector = mask_edges_to_cutoff(
+            positions=positions,
+            edge_indices=self.edge_indices,
+            cell_shift_vector=self.cell_shift_vector,
+            cell=cell,
+            cutoff=self.cutoff,
+        )
+
+        return edge_indices, cell_shift_vector
+
+
+NeighbourListBackendT = Callable[
+    [torch.Tensor, float, tuple[bool, bool, bool] | None, torch.Tensor | None, bool],
+    tuple[torch.Tensor, torch.Tensor],
+]
+
+NEIGHBOUR_LIST_BACKENDS: dict[str, NeighbourListBackendT] = {}
+
+
+def register_neighbour_list_backend(
+    name: str,
+) -> Callable[[NeighbourListBackendT], NeighbourListBackendT]:
+    """Registers a neighbour list backend.
+
+    A backend takes the ``positions``, ``cutoff``, ``pbc``, ``cell`` and
+    ``self_interaction`` and returns the edge indices [2, n_edges] and the cell shift
+    vectors [n_edges, 3]. Registered backends can be selected with the
+    ``neighbour_list_backend`` of the datamodule config.
+    """
+
+    def decorator(backend: NeighbourListBackendT) -> NeighbourListBackendT:
+        if name in NEIGHBOUR_LIST_BACKENDS:
+            raise KeyError(f"Neighbour list backend '{name}' is already registered.")
+        NEIGHBOUR_LIST_BACKENDS[name] = backend
+        return backend
+
+    return decorator
+
+
+def get_neighbour_list_backend(name: str) -> NeighbourListBackendT:
+    if name not in NEIGHBOUR_LIST_BACKENDS:
+        raise KeyError(
+            f"Unknown neighbour list backend '{name}'. "
+            f"Available backends: {list(NEIGHBOUR_LIST_BACKENDS)}.",
+        )
+    return NEIGHBOUR_LIST_BACKENDS[name]
+
+
+def _register_builtin_backend(name: str) -> None:
+    def backend(
+        positions: torch.Tensor,
+        cutoff: float,
+        pbc: tuple[bool, bool, bool] | None,
+        cell: torch.Tensor | None,
+        self_interaction: bool,
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        edge_index, cell_shift_vector = compute_neighbourhood(
+            positions=positions,
+            cutoff=cutoff,
+            pbc=pbc,
+            cell=cell,
+            self_interaction=self_interaction,
+            backend=name,
+        )
+        return edge_index, cell_shift_vector
+
+    register_neighbour_list_backend(name)(backend)
+
+
+for _name in BUILTIN_NEIGHBOUR_LIST_BACKENDS:
+    _register_builtin_backend(_name)
+
+
+@torch.jit.script
+def merge_initial_edges(
+    num_nodes: int,
+    nbhd_edge_indices: torch.Tensor,
+    nbhd_cell_shift_vector: torch.Tensor,
+    initial_edge_indices: torch.Tensor | None,
+    initial_edge_attrs: torch.Tensor | None,
+) -> tuple[torch.Tensor, torch.Tensor | None, torch.Tensor]:
     nbhd_edge_indices = nbhd_edge_indices.transpose(0, 1)
 
     if (
@@ -112,7 +600,7 @@ def construct_edge_indices_and_attrs(
         initial_edge_indices, initial_edge_attrs = to_undirected_ts(
             initial_edge_indices,
             initial_edge_attrs,
-            torch.tensor(positions.shape[0]),
+            torch.tensor(num_nodes),
         )
         assert initial_edge_indices is not None
         assert initial_edge_attrs is not None
@@ -152,7 +640,7 @@ def construct_edge_indices_and_attrs(
         edge_indices, edge_attrs_cell_shift_vector = coalesce_ts(
             all_edge_indices,
             [all_edge_attrs, all_cell_shit_vector],
-            torch.tensor(positions.shape[0]),
+            torch.tensor(num_nodes),
         )
         edge_attrs = edge_attrs_cell_shift_vector[0]
         cell_shift_vector = edge_attrs_cell_shift_vector[1]
@@ -173,3 +661,34 @@ def construct_edge_indices_and_attrs(
         cell_shift_vector = nbhd_cell_shift_vector
 
     return edge_indices, edge_attrs, cell_shift_vector
+
+
+@torch.jit.script
+def construct_edge_indices_and_attrs(
+    positions: torch.Tensor,
+    cutoff: float,
+    initial_edge_indices: torch.Tensor | None,
+    initial_edge_attrs: torch.Tensor | None,
+    pbc: tuple[bool, bool, bool] | None,
+    cell: torch.Tensor | None,
+    self_interaction: bool,
+    neighbour_list_backend: str = "auto",
+) -> tuple[torch.Tensor, torch.Tensor | None, torch.Tensor]:
+    nbhd_edge_indices, nbhd_cell_shift_vector = compute_neighbourhood(
+        positions=positions,
+        cutoff=cutoff,
+        pbc=pbc,
+        cell=cell,
+        self_interaction=self_interaction,
+        backend=neighbour_list_backend,
+    )
+
+    edge_indices, edge_attrs, cell_shift_vector = merge_initial_edges(
+        num_nodes=positions.shape[0],
+        nbhd_edge_indices=nbhd_edge_indices,
+        nbhd_cell_shift_vector=nbhd_cell_shift_vector,
+        initial_edge_indices=initial_edge_indices,
+        initial_edge_attrs=initial_edge_attrs,
+    )
+
+    return edge_indices, edge_attrs, cell_shift_vector
@@ -0,0 +1,169 @@
+import os
+from collections.abc import Iterator
+from typing import Any
+
+import datasets
+import pyarrow as pa
+import torch
+import torch.utils.data
+from datasets.distributed import split_dataset_by_node
+from datasets.table import InMemoryTable
+from torch_geometric.data import Batch
+
+from physicsml.lightning.graph_datasets.batch_dict import BatchDictCollater
+from physicsml.lightning.graph_datasets.graph_dataset import GraphDataset
+from physicsml.lightning.pre_batching_shards import rank_and_world_size
+
+
+class StreamingGraphDataset(torch.utils.data.IterableDataset):
+    """Streams batches of graphs from an iterable (for example a streamed Parquet) dataset.
+
+    For datasets which do not fit on the local disk or in memory. The datapoints are
+    read in arrow chunks of ``batch_size`` rows, each of which is turned into a
+    ``Batch`` by a ``GraphDataset`` (with the same ``graph_dataset_kwargs`` as for
+    map-style datasets), so the graphs are identical to the ones of a ``GraphDataset``.
+
+    The shards of the dataset are split between the ranks and the data loader workers
+    (every worker of every rank reads its own shards if the number of shards is a
+    multiple of the number of workers, and every ``n``-th datapoint otherwise). When
+    shuffling, the order of the shards and the datapoints in a buffer of
+    ``shuffle_buffer_size`` datapoints are shuffled (with a new seed on every epoch,
+    see ``set_epoch``).
+
+    Args:
+        dataset: The iterable dataset (e.g. ``datasets.load_dataset(..., streaming=True)``).
+        graph_dataset_kwargs: The kwargs of the ``GraphDataset`` (except the dataset).
+        batch_size: The number of graphs in a batch.
+        shuffle: Whether to shuffle the datapoints.
+        shuffle_buffer_size: The number of datapoints in the shuffle buffer.
+        drop_last: Whether to drop the last (partial) batch of each worker.
+        seed: The seed of the shuffle (``PL_GLOBAL_SEED`` if not specified).
+    """
+
+    def __init__(
+        self,
+        dataset: datasets.IterableDataset,
+        graph_dataset_kwargs: dict[str, Any],
+        batch_size: int,
+        shuffle: bool = False,
+        shuffle_buffer_size: int = 10_000,
+        drop_last: bool = False,
+        seed: int | None = None,
+    ) -> None:
+        super().__init__()
+
+        if graph_dataset_kwargs.get("neighbour_list_cache_dir") is not None:
+            raise ValueError(
+                "The neighbour list cache is not supported for streaming datasets.",
+            )
+
+        self.dataset = dataset
+        self.graph_dataset_kwargs = graph_dataset_kwargs
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.shuffle_buffer_size = shuffle_buffer_size
+        self.drop_last = drop_last
+        self.seed = seed
+
+        self.epoch = 0
+        self.rank = 0
+        self.world_size = 1
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
+
+    def set_rank(self, rank: int, world_size: int) -> None:
+        self.rank = rank
+        self.world_size = world_size
+
+    def _worker_dataset(self) -> datasets.IterableDataset:
+        dataset = self.dataset.with_format("arrow")
+        if self.shuffle:
+            # the shuffle of the shards is the same on all the ranks and workers
+            seed = self.seed
+            if seed is None:
+                seed = int(os.getenv("PL_GLOBAL_SEED", 0))
+            dataset = dataset.shuffle(seed=seed, buffer_size=self.shuffle_buffer_size)
+
+        worker_info = torch.utils.data.get_worker_info()
+        num_workers = worker_info.num_workers if worker_info is not None else 1
+        worker_id = worker_info.id if worker_info is not None else 0
+
+        world_size = self.world_size * num_workers
+        if world_size > 1:
+            dataset = split_dataset_by_node(
+                dataset,
+                rank=self.rank * num_workers + worker_id,
+                world_size=world_size,
+            )
+
+        # (the epoch is not carried over by the transforms above)
+        dataset.set_epoch(self.epoch)
+
+        return dataset
+
+    def graph_dataset(self, table: pa.Table) -> GraphDataset:
+        """The ``GraphDataset`` which builds the batches of a worker.
+
+        It is built once (from the first arrow table of the worker), since
+        ``GraphDataset.batch_from_table`` only reads the table it is given.
+        """
+
+        chunk = datasets.Dataset(InMemoryTable(table), fingerprint="streaming_chunk")
+        return GraphDataset(dataset=chunk, **self.graph_dataset_kwargs)
+
+    def __iter__(self) -> Iterator[Batch]:
+        dataset = self._worker_dataset()
+        graph_dataset: GraphDataset | None = None
+        for table in dataset.iter(
+            batch_size=self.batch_size,
+            drop_last_batch=self.drop_last,
+        ):
+            if graph_dataset is None:
+                graph_dataset = self.graph_dataset(table)
+            yield graph_dataset.batch_from_table(table, list(range(table.num_rows)))
+
+
+def collate_fn(batch: Batch) -> Batch:
+    return batch
+
+
+class StreamingGraphDataLoader(torch.utils.data.DataLoader):
+    """A ``DataLoader`` of a ``StreamingGraphDataset``.
+
+    Sets the rank and the epoch of the dataset in the main process before every pass
+    (the workers only see a copy of the dataset, so they cannot be persistent). Yields
+    ``Batch``es, or ``GraphBatchDict``s in ``batch_dtype`` if specified.
+    """
+
+    def __init__(
+        self,
+        dataset: StreamingGraphDataset,
+        batch_dtype: torch.dtype | None = None,
+        **kwargs: Any,
+    ) -> None:
+        # Remove for PyTorch Lightning:
+        kwargs.pop("collate_fn", None)
+        kwargs.pop("batch_size", None)
+        kwargs.pop("persistent_workers", None)
+
+        super().__init__(
+            dataset,
+            batch_size=None,
+            collate_fn=(
+                BatchDictCollater(collate_fn, batch_dtype)
+                if batch_dtype is not None
+                else collate_fn
+            ),
+            **kwargs,
+        )
+        self.batch_dtype = batch_dtype
+        self._epoch = 0
+
+    def __iter__(self) -> Any:
+        assert isinstance(self.dataset, StreamingGraphDataset)
+        self.dataset.set_rank(*rank_and_world_size())
+        self.dataset.set_epoch(self._epoch)
+        self._epoch += 1
+
+        return super().__iter__()
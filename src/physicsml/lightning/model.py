@@ -8,8 +8,8 @@ from typing import (
 
 import molflux.datasets
 import molflux.splits
-import torch
-from datasets import Dataset
+import numpy as np
+from datasets import Dataset, IterableDataset
 from molflux.modelzoo.models.lightning.config import (
     CompileConfig,
     DataModuleConfig,
@@ -22,14 +22,22 @@ from molflux.modelzoo.models.lightning.model import LightningModelBase
 from molflux.modelzoo.typing import PredictionResult
 
 import lightning.pytorch as pl
+from physicsml.lightning.columnar import read_column
 from physicsml.lightning.datamodule import PhysicsMLDataModule
 from physicsml.lightning.module import PhysicsMLModuleBase
+from physicsml.lightning.prediction_writer import (
+    ColumnarPredictionWriter,
+    PredictionColumn,
+    column_to_list,
+)
 from physicsml.utils import OptionalDependencyImportError
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
 
 if TYPE_CHECKING:
+    import torch
+
     from physicsml.lightning.config import PhysicsMLModelConfig
 
 _PhysicsMLModelConfigT = TypeVar(
@@ -38,6 +46,18 @@ _PhysicsMLModelConfigT = TypeVar(
 )
 
 
+def _is_streamed(data: Any) -> bool:
+    if isinstance(data, dict):
+        return any(isinstance(v, IterableDataset) for v in data.values())
+    return isinstance(data, IterableDataset)
+
+
+def _as_dict(data: Any) -> Any:
+    if (data is None) or isinstance(data, dict):
+        return data
+    return {None: data}
+
+
 class PhysicsMLModelBase(
     LightningModelBase[_PhysicsMLModelConfigT],
 ):
@@ -57,6 +77,23 @@ class PhysicsMLModelBase(
     @abstractmethod
     def _instantiate_module(self) -> PhysicsMLModuleBase: ...
 
+    def train(
+        self,
+        train_data: Any,
+        validation_data: Any = None,
+        **kwargs: Any,
+    ) -> Any:
+        if not (_is_streamed(train_data) or _is_streamed(validation_data)):
+            return super().train(train_data, validation_data=validation_data, **kwargs)
+
+        # molflux converts the data to (map-style) ``Dataset``s, so streamed datasets
+        # are passed to the datamodule as they are
+        return self._train_multi_data(
+            train_data=_as_dict(train_data),
+            validation_data=_as_dict(validation_data),
+            **kwargs,
+        )
+
     def _train_multi_data(
         self,
         train_data: dict[str | None, Dataset],
@@ -170,6 +207,125 @@ class PhysicsMLModelBase(
 
         return batch_preds
 
+    def _prediction_columns(self) -> list[PredictionColumn]:
+        """The columns of the predictions of the y features (named by their display
+        names), with the ``::std`` of each column for models with uncertainty."""
+
+        datamodule_config = self.model_config.datamodule
+
+        outputs: dict[str, tuple[str, int | None, str]] = {}
+        for key, cols, level in [
+            ("y_node_scalars", datamodule_config.y_node_scalars, "node"),
+            ("y_edge_scalars", datamodule_config.y_edge_scalars, "edge"),
+            ("y_graph_scalars", datamodule_config.y_graph_scalars, "graph"),
+        ]:
+            for idx, col in enumerate(cols or []):
+                outputs[col] = (key, idx, level)
+
+        for key, vec_col, level in [
+            ("y_node_vector", datamodule_config.y_node_vector, "node"),
+            ("y_edge_vector", datamodule_config.y_edge_vector, "edge"),
+            ("y_graph_vector", datamodule_config.y_graph_vector, "graph"),
+        ]:
+            if vec_col is not None:
+                outputs[vec_col] = (key, None, level)
+
+        columns = []
+        for display_name, y_feature in zip(
+            self._predict_display_names,
+            self.y_features,
+            strict=False,
+        ):
+            key, index, level = outputs[y_feature]
+            columns.append(
+                PredictionColumn(display_name, key, index, level),  # type: ignore[arg-type]
+            )
+            columns.append(
+                PredictionColumn(
+                    f"{display_name}::std",
+                    f"{key}::std",
+                    index,
+                    level,  # type: ignore[arg-type]
+                    optional=True,
+                ),
+            )
+
+        return columns
+
+    def _predict_columnar(
+        self,
+        data: Dataset,
+        path: str | None = None,
+        datamodule_config: DataModuleConfig | dict[str, Any] | None = None,
+        trainer_config: TrainerConfig | dict[str, Any] | None = None,
+    ) -> ColumnarPredictionWriter:
+        writer = ColumnarPredictionWriter(self._prediction_columns(), path=path)
+
+        if len(data):
+            with self.override_config(
+                datamodule=datamodule_config,
+                trainer=trainer_config,
+            ):
+                datamodule = self._instantiate_datamodule(predict_data=data)
+                trainer_config_tmp = self.model_config.trainer.pass_to_trainer()
+                trainer = pl.Trainer(
+                    accelerator=trainer_config_tmp["accelerator"],
+                    devices=trainer_config_tmp["devices"],
+                    strategy=trainer_config_tmp["strategy"],
+                    logger=False,
+                    callbacks=[writer],
+                )
+                # the outputs are consumed by the writer batch by batch
+                trainer.predict(self.module, datamodule, return_predictions=False)
+        writer.close()
+
+        return writer
+
+    def predict_to_parquet(
+        self,
+        data: Dataset,
+        path: str,
+        datamodule_config: DataModuleConfig | dict[str, Any] | None = None,
+        trainer_config: TrainerConfig | dict[str, Any] | None = None,
+    ) -> None:
+        """Streams the predictions to a parquet file, with a row per datapoint.
+
+        The outputs of every batch are written as they are produced, so the memory
+        used does not grow with the size of the data. The columns are named by the
+        display names of the ``predict`` outputs (plus their ``::std`` for models with
+        uncertainty), and the node and edge outputs (such as forces) are lists per
+        datapoint.
+        """
+
+        self._predict_columnar(
+            data=data,
+            path=path,
+            datamodule_config=datamodule_config,
+            trainer_config=trainer_config,
+        )
+
+    def predict_columnar(
+        self,
+        data: Dataset,
+        datamodule_config: DataModuleConfig | dict[str, Any] | None = None,
+        trainer_config: TrainerConfig | dict[str, Any] | None = None,
+    ) -> dict[str, tuple[np.ndarray, np.ndarray | None]]:
+        """Returns the predictions as numpy arrays instead of lists.
+
+        Every column (see ``predict_to_parquet``) is returned as its flat values and
+        the offsets of each datapoint into them (see ``read_column``). The offsets are
+        ``None`` for graph outputs (with a value per datapoint), while the node and
+        edge outputs are concatenated over the datapoints.
+        """
+
+        table = self._predict_columnar(
+            data=data,
+            datamodule_config=datamodule_config,
+            trainer_config=trainer_config,
+        ).to_table()
+
+        return {name: read_column(table.column(name)) for name in table.column_names}
+
     def _predict(
         self,
         data: Dataset,
@@ -185,47 +341,26 @@ class PhysicsMLModelBase(
         if not len(data):
             return {display_name: [] for display_name in display_names}
 
-        batch_preds = self._predict_batched(
+        table = self._predict_columnar(
             data=data,
             datamodule_config=datamodule_config,
             trainer_config=trainer_config,
-        )
-        batched_preds_dict = {
-            k: [dic[k] for dic in batch_preds] for k in batch_preds[0]
-        }
-
-        output = {}
-        for key, cols in [
-            ("y_node_scalars", self.model_config.datamodule.y_node_scalars),
-            ("y_edge_scalars", self.model_config.datamodule.y_edge_scalars),
-            ("y_graph_scalars", self.model_config.datamodule.y_graph_scalars),
-        ]:
-            if cols is not None:
-                catted_value = torch.cat(batched_preds_dict[key], dim=0)
-                for idx, col in enumerate(cols):
-                    output[col] = catted_value[:, idx].tolist()
-
-        for key, vec_col in [
-            ("y_node_vector", self.model_config.datamodule.y_node_vector),
-            ("y_edge_vector", self.model_config.datamodule.y_edge_vector),
-            ("y_graph_vector", self.model_config.datamodule.y_graph_vector),
-        ]:
-            if vec_col is not None:
-                output[vec_col] = torch.cat(batched_preds_dict[key], dim=0).tolist()
+        ).to_table()
 
         return {
-            display_name: output[y_feature]
-            for display_name, y_feature in zip(
-                display_names,
-                self.y_features,
-                strict=False,
-            )
+            display_name: column_to_list(table.column(display_name))
+            for display_name in display_names
         }
 
     def to_openmm(self, **kwargs: Any) -> Any:
         from physicsml.plugins.openmm.openmm_graph import OpenMMGraph
 
-        return OpenMMGraph(self, **kwargs)
+        return OpenMMGraph(**kwargs)
+
+    def to_openmm_replicas(self, **kwargs: Any) -> Any:
+        from physicsml.plugins.openmm.openmm_replicas import OpenMMGraphReplicas
+
+        return OpenMMGraphReplicas(**kwargs)
 
     def to_ase(self, **kwargs: Any) -> Any:
         try:
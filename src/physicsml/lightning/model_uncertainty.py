@@ -7,7 +7,6 @@ from typing import (
 
 import numpy as np
 import scipy.stats as st
-import torch
 from datasets import Dataset
 from molflux.modelzoo.model import (
     PredictionIntervalMixin,
@@ -17,6 +16,7 @@ from molflux.modelzoo.models.lightning.config import DataModuleConfig, TrainerCo
 from molflux.modelzoo.typing import PredictionResult
 
 from physicsml.lightning.model import PhysicsMLModelBase
+from physicsml.lightning.prediction_writer import column_to_list
 
 if TYPE_CHECKING:
     from physicsml.lightning.config import PhysicsMLModelConfig
@@ -58,69 +58,29 @@ class PhysicsMLUncertaintyModelBase(
             }
             return empty_out, empty_out_std
 
-        batch_preds = self._predict_batched(
+        table = self._predict_columnar(
             data=data,
             datamodule_config=datamodule_config,
             trainer_config=trainer_config,
-        )
-
-        batched_preds_dict = {
-            k: [dic[k] for dic in batch_preds] for k in batch_preds[0]
-        }
+        ).to_table()
 
-        output = {}
-        for key, cols in [
-            ("y_node_scalars", self.model_config.datamodule.y_node_scalars),
-            ("y_edge_scalars", self.model_config.datamodule.y_edge_scalars),
-            ("y_graph_scalars", self.model_config.datamodule.y_graph_scalars),
-        ]:
-            if cols is not None:
-                catted_value = torch.cat(batched_preds_dict[key], dim=0)
-                for idx, col in enumerate(cols):
-                    output[col] = catted_value[:, idx].tolist()
-
-        for key, vec_col in [
-            ("y_node_vector", self.model_config.datamodule.y_node_vector),
-            ("y_edge_vector", self.model_config.datamodule.y_edge_vector),
-            ("y_graph_vector", self.model_config.datamodule.y_graph_vector),
-        ]:
-            if vec_col is not None:
-                output[vec_col] = torch.cat(batched_preds_dict[key], dim=0).tolist()
-
-        # Only support uncertainty for graph scalars
-        output_std = {}
-        for key, cols in [
-            ("y_graph_scalars::std", self.model_config.datamodule.y_graph_scalars),
-        ]:
-            if cols is not None:
-                catted_value = torch.cat(batched_preds_dict[key], dim=0)
-                for idx, col in enumerate(cols):
-                    output_std[f"{col}::std"] = catted_value[:, idx].tolist()
-
-        # fill in none lists for outputs with no std
-        for key, value in output.items():
-            if f"{key}::std" not in output_std:
-                output_std[f"{key}::std"] = [None] * len(value)
-
-        ordered_output = {
-            display_name: output[y_feature]
-            for display_name, y_feature in zip(
-                display_names,
-                self.y_features,
-                strict=False,
-            )
+        output = {
+            display_name: column_to_list(table.column(display_name))
+            for display_name in display_names
         }
 
-        ordered_output_std = {
-            f"{display_name}::std": output_std[f"{y_feature}::std"]
-            for display_name, y_feature in zip(
-                display_names,
-                self.y_features,
-                strict=False,
+        # Only support uncertainty for graph scalars (fill in none lists for outputs
+        # with no std)
+        output_std = {
+            f"{display_name}::std": (
+                column_to_list(table.column(f"{display_name}::std"))
+                if f"{display_name}::std" in table.column_names
+                else [None] * len(value)
             )
+            for display_name, value in output.items()
         }
 
-        return ordered_output, ordered_output_std
+        return output, output_std
 
     def _predict_with_prediction_interval(
         self,
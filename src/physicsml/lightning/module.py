@@ -12,6 +12,9 @@ from molflux.modelzoo.models.lightning.module import (
 from torch_geometric.data.batch import Batch
 
 from physicsml.lightning.config import PhysicsMLModelConfig
+from physicsml.lightning.graph_datasets.batch_dict import GraphBatchDict
+from physicsml.lightning.graph_datasets.compact_dtypes import widen_tensor
+from physicsml.lightning.graph_datasets.graph_dataset import one_hot_atomic_numbers
 
 
 class PhysicsMLModuleBase(
@@ -47,18 +50,48 @@ class PhysicsMLModuleBase(
 
         return forces
 
-    def graph_batch_to_batch_dict(self, graph_batch: Batch) -> dict[str, torch.Tensor]:
-        batch_dict: dict[str, Any] = graph_batch.to_dict()
-        batch_dict["num_graphs"] = torch.tensor(graph_batch.num_graphs)
-        batch_dict["num_nodes"] = torch.tensor(batch_dict["num_nodes"])
-
-        for k, v in batch_dict.items():
-            if not isinstance(v, torch.Tensor):
-                batch_dict[k] = torch.tensor(v)
-
-            tensor = batch_dict[k]
-            if torch.is_floating_point(tensor):
-                batch_dict[k] = tensor.type(self.dtype)
+    def transfer_batch_to_device(
+        self,
+        batch: Any,
+        device: torch.device,
+        dataloader_idx: int,
+    ) -> Any:
+        if isinstance(batch, GraphBatchDict):
+            # the batches are pinned by the dataloaders, so the copies are asynchronous
+            return batch.to(device, non_blocking=True)
+        return super().transfer_batch_to_device(batch, device, dataloader_idx)
+
+    def graph_batch_to_batch_dict(
+        self,
+        graph_batch: Batch | GraphBatchDict,
+    ) -> dict[str, Any]:
+        if not isinstance(graph_batch, GraphBatchDict):
+            graph_batch = GraphBatchDict.from_batch(graph_batch, self.dtype)
+
+        # the batches can be held in compact dtypes on the host, which are only
+        # widened here (after the transfer to the device)
+        batch_dict: dict[str, Any] = {
+            k: widen_tensor(k, v, self.dtype) if isinstance(v, torch.Tensor) else v
+            for k, v in graph_batch.items()
+        }
+
+        if ("raw_atomic_numbers" in batch_dict) and (
+            "atomic_numbers" not in batch_dict
+        ):
+            # the one-hot atomic numbers are looked up on the device (see the
+            # ``one_hot_on_device`` option of the datamodule)
+            atomic_numbers = one_hot_atomic_numbers(
+                batch_dict["raw_atomic_numbers"],
+                self.model_config.datamodule.num_elements,  # type: ignore[attr-defined]
+            ).type(self.dtype)
+            batch_dict["atomic_numbers"] = atomic_numbers
+            if "node_attrs" in batch_dict:
+                batch_dict["node_attrs"] = torch.cat(
+                    [atomic_numbers, batch_dict["node_attrs"]],
+                    dim=1,
+                )
+            else:
+                batch_dict["node_attrs"] = atomic_numbers
 
         return batch_dict
 
@@ -92,7 +125,7 @@ class PhysicsMLModuleBase(
 
         loss_dict = self.compute_loss(output, batch_dict)
 
-        return loss_dict["loss"], loss_dict, single_source_batch.ptr.shape[0] - 1
+        return loss_dict["loss"], loss_dict, batch_dict["num_graphs"]
 
     def _validation_step_on_single_source_batch(
         self,
@@ -125,7 +158,7 @@ class PhysicsMLModuleBase(
 
         loss_dict = self.compute_loss(output, batch_dict)
 
-        return loss_dict["loss"], loss_dict, single_source_batch.ptr.shape[0] - 1
+        return loss_dict["loss"], loss_dict, batch_dict["num_graphs"]
 
     def predict_step(self, batch: Any, batch_idx: int, dataloader_idx: int = 0) -> Any:
         """method for doing a predict step"""
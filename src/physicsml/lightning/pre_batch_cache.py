@@ -0,0 +1,205 @@
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import datasets
+import torch
+
+from physicsml.lightning.pre_batching_shards import rank_and_world_size
+
+logger = logging.getLogger(__name__)
+
+# bump when the layout of the pre-batched datasets changes so that old caches are not
+# picked up
+CACHE_FORMAT_VERSION = 3
+
+# the datamodule fields which do not affect the pre-batched tensors (the batch size is
+# part of the key separately)
+_EXCLUDED_FIELDS = {
+    "train",
+    "validation",
+    "test",
+    "predict",
+    "num_workers",
+    "neighbour_list_cache_dir",
+    "pre_batch_cache_dir",
+    "pre_batch_cache_max_gb",
+    "shuffle_buffer_size",
+    "collate_batch_dict",
+}
+
+
+def pre_batch_cache_key(
+    dataset: datasets.Dataset,
+    model_config: Any,
+    **params: Any,
+) -> str:
+    """Computes the content-address of a pre-batched dataset.
+
+    The key is derived from the dataset fingerprint, the features, every field of the
+    datamodule config which affects the graphs (or batches) and the ``params`` of the
+    dataloader (such as the batch size). Since the shuffle of the batches and their
+    split between the ranks are part of the pre-batched dataset, the seed and the
+    world size are part of the key too (as is the precision, which decides the dtypes
+    of the batches).
+    """
+
+    datamodule_config = {
+        k: v
+        for k, v in dataclasses.asdict(model_config.datamodule).items()
+        if k not in _EXCLUDED_FIELDS
+    }
+    _, world_size = rank_and_world_size()
+
+    key_dict = {
+        "version": CACHE_FORMAT_VERSION,
+        "fingerprint": dataset._fingerprint,
+        "num_rows": len(dataset),
+        "x_features": model_config.x_features,
+        "y_features": model_config.y_features,
+        "datamodule": datamodule_config,
+        "seed": os.getenv("PL_GLOBAL_SEED"),
+        # the dtypes of the batches depend on the precision
+        "precision": str(model_config.trainer.precision),
+        "world_size": world_size,
+        **params,
+    }
+
+    return hashlib.sha256(
+        json.dumps(key_dict, sort_keys=True, default=str).encode("utf-8"),
+    ).hexdigest()
+
+
+def _broadcast(obj: Any) -> Any:
+    if rank_and_world_size()[1] > 1:
+        objs = [obj]
+        torch.distributed.broadcast_object_list(objs, src=0)
+        obj = objs[0]
+    return obj
+
+
+def _barrier() -> None:
+    if rank_and_world_size()[1] > 1:
+        torch.distributed.barrier()
+
+
+def _size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+class PreBatchCache:
+    """An on-disk LRU cache of pre-batched datasets.
+
+    Every pre-batched dataset is a directory in ``cache_dir`` named after its
+    content-address (see ``pre_batch_cache_key``). Datasets are built into a temporary
+    directory which is moved into place when complete, so that concurrent runs (such
+    as the trials of a hyperparameter sweep) never read partial datasets. The least
+    recently used datasets are evicted once the cache exceeds ``max_gb``.
+
+    For distributed training, ``cache_dir`` must be shared by all the ranks.
+    """
+
+    def __init__(self, cache_dir: str, max_gb: float | None = None) -> None:
+        self.root = Path(cache_dir)
+        self.max_bytes = int(max_gb * 2**30) if max_gb is not None else None
+
+    def get_or_build(self, key: str, build: Callable[[str], Any]) -> str:
+        """Returns the path of the pre-batched dataset ``key``, building it if needed.
+
+        ``build`` writes the dataset into the directory it is given and is called by
+        all the ranks (on a cache miss).
+        """
+
+        rank, _ = rank_and_world_size()
+        path = self.root / key
+
+        if rank == 0:
+            self.root.mkdir(parents=True, exist_ok=True)
+        is_cached = _broadcast(path.exists())
+
+        if is_cached:
+            logger.info(f"Using the cached pre-batched dataset {path}.")
+        else:
+            tmp_name = _broadcast(f".{key}.tmp-{uuid.uuid4().hex}")
+            tmp_path = self.root / tmp_name
+            if rank == 0:
+                tmp_path.mkdir()
+            _barrier()
+
+            try:
+                build(str(tmp_path))
+                _barrier()
+                if rank == 0:
+                    try:
+                        os.replace(tmp_path, path)
+                    except OSError:
+                        # built concurrently by another run
+                        pass
+            finally:
+                _barrier()
+                if (rank == 0) and tmp_path.exists():
+                    shutil.rmtree(tmp_path)
+
+        if rank == 0:
+            # the modification time of the directories orders them by last use
+            os.utime(path)
+            self.evict(keep=key)
+        _barrier()
+
+        return str(path)
+
+    def evict(self, keep: str | None = None) -> None:
+        """Removes the least recently used datasets until the cache fits in ``max_gb``."""
+
+        if self.max_bytes is None:
+            return
+
+        entries = sorted(
+            (
+                entry
+                for entry in self.root.iterdir()
+                if entry.is_dir() and not entry.name.startswith(".")
+            ),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        sizes = {entry: _size(entry) for entry in entries}
+        total_size = sum(sizes.values())
+
+        for entry in entries:
+            if total_size <= self.max_bytes:
+                break
+            if entry.name == keep:
+                continue
+            logger.info(f"Evicting the cached pre-batched dataset {entry}.")
+            shutil.rmtree(entry, ignore_errors=True)
+            total_size -= sizes[entry]
+
+
+def pre_batch_cache_kwargs(
+    model_config: Any,
+    dataset: datasets.Dataset,
+    **params: Any,
+) -> dict[str, Any]:
+    """The cache kwargs of the ``construct_*`` pre-batching functions.
+
+    Empty if no ``pre_batch_cache_dir`` is configured.
+    """
+
+    cache_dir = model_config.datamodule.pre_batch_cache_dir
+    if cache_dir is None:
+        return {}
+
+    return {
+        "cache": PreBatchCache(
+            cache_dir,
+            max_gb=model_config.datamodule.pre_batch_cache_max_gb,
+        ),
+        "cache_key": pre_batch_cache_key(dataset, model_config, **params),
+    }
@@ -1,25 +1,47 @@
-import os
-import pickle
+import uuid
+from pathlib import Path
 from typing import Any
 
 import torch
+from lightning.pytorch.utilities.rank_zero import rank_zero_only
 from torch.utils.data.dataloader import DataLoader
 from torch.utils.data.dataset import Dataset
-from tqdm.auto import tqdm
-
-from lightning.pytorch.utilities.rank_zero import rank_zero_only
-
 
-class InMemoryBatchedPickledDataset(Dataset):
-    def __init__(self, batched_dataset: list[Any]) -> None:
+from physicsml.lightning.graph_datasets.batch_dict import BatchDictCollater
+from physicsml.lightning.pre_batch_cache import PreBatchCache
+from physicsml.lightning.pre_batching_on_disk import (
+    OnDiskBatchedDataset,
+    pre_batch_on_disk,
+)
+from physicsml.lightning.pre_batching_shards import (
+    rank_and_world_size,
+    rank_local_sampler_kwargs,
+    write_rank_shards,
+)
+from physicsml.lightning.tensor_arena import (
+    ShardedTensorArena,
+    TensorArena,
+    remove_arena,
+)
+
+
+class InMemoryBatchedDataset(Dataset):
+    """A dataset of pre-batched batches held in a memory-mapped ``TensorArena``.
+
+    Each item is assembled from zero-copy views into the arena (no unpickling). The
+    arena can be a ``ShardedTensorArena`` (of the shards written by the workers of a
+    rank).
+    """
+
+    def __init__(self, arena: TensorArena | ShardedTensorArena) -> None:
         super().__init__()
-        self.batched_dataset = batched_dataset
+        self.arena = arena
 
     def __len__(self) -> int:
-        return len(self.batched_dataset)
+        return len(self.arena)
 
     def __getitem__(self, idx: int) -> Any:
-        return pickle.loads(self.batched_dataset[idx])  # noqa: S301
+        return self.arena[idx]
 
 
 def collate_fn(list_of_data: list[Any]) -> Any:
@@ -27,40 +49,74 @@ def collate_fn(list_of_data: list[Any]) -> Any:
     return list_of_data[0]
 
 
-@rank_zero_only
-def pre_batch_in_memory(dataloader: DataLoader) -> None:
-    batches = []
-    for b in tqdm(dataloader, desc="Pre-batching data in memory"):
-        batches.append(pickle.dumps(b))
+def pre_batch_in_memory(dataloader: DataLoader, prefix: str) -> list[str]:
+    """Pre-batches the share of the batches of the current rank into arenas.
+
+    Returns the paths of the arenas (see ``write_rank_shards``).
+    """
+
+    rank, _ = rank_and_world_size()
+    shards = write_rank_shards(dataloader, f"{prefix}_{rank}", shard_size=None)
 
-    torch.save(InMemoryBatchedPickledDataset(batches), "dataset.torch")
+    return [file for file, _ in shards]
 
 
 @rank_zero_only
-def clean_up() -> None:
-    os.remove("dataset.torch")
+def clean_up(path: str) -> None:
+    remove_arena(path)
+
+
+def unique_arena_prefix() -> str:
+    # a unique name (shared by all the ranks) so that concurrent runs do not collide
+    paths = [str(Path(f"pre_batched_{uuid.uuid4().hex}").absolute())]
+    if torch.distributed.is_available() and torch.distributed.is_initialized():
+        torch.distributed.broadcast_object_list(paths, src=0)
+
+    return paths[0]
 
 
 def construct_in_memory_pre_batched_dataloader(
     dataloader: DataLoader,
     shuffle: bool,
+    cache: PreBatchCache | None = None,
+    cache_key: str | None = None,
+    batch_dtype: torch.dtype | None = None,
 ) -> DataLoader:
-    pre_batch_in_memory(dataloader)
+    """Pre-batches a dataloader in memory and returns a dataloader over the batches.
 
-    if torch.distributed.is_available() and torch.distributed.is_initialized():
-        torch.distributed.barrier()
+    If a ``cache`` is specified, the batches are stored in it under ``cache_key`` (in
+    the on disk layout, see ``pre_batch_on_disk``) and are reused by later runs. If a
+    ``batch_dtype`` is specified, the dataloader yields ``GraphBatchDict``s in it.
+    """
 
-    batched_dataset = torch.load("dataset.torch")
+    rank, world_size = rank_and_world_size()
 
-    if torch.distributed.is_available() and torch.distributed.is_initialized():
-        torch.distributed.barrier()
+    if cache is not None:
+        assert cache_key is not None
+        path = cache.get_or_build(
+            cache_key,
+            lambda build_path: pre_batch_on_disk(dataloader, build_path),
+        )
+        arena = OnDiskBatchedDataset(path, rank=rank if world_size > 1 else None).arena
+    else:
+        # every rank pre-batches (and holds) only the batches it trains on
+        paths = pre_batch_in_memory(dataloader, unique_arena_prefix())
+
+        # the memory maps stay valid after the files are removed
+        arena = ShardedTensorArena([TensorArena(path) for path in paths])
+        for path in paths:
+            remove_arena(path)
 
-    clean_up()
+    batched_dataset = InMemoryBatchedDataset(arena)
 
     return DataLoader(
         batched_dataset,
         batch_size=1,
-        shuffle=shuffle,
         num_workers=0,
-        collate_fn=collate_fn,
+        collate_fn=(
+            BatchDictCollater(collate_fn, batch_dtype)
+            if batch_dtype is not None
+            else collate_fn
+        ),
+        **rank_local_sampler_kwargs(batched_dataset, shuffle),
     )
@@ -1,29 +1,106 @@
+import json
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
 import torch
 from torch.utils.data.dataloader import DataLoader
 from torch.utils.data.dataset import Dataset
-from tqdm.auto import tqdm
 
-from lightning.pytorch.utilities.rank_zero import rank_zero_only
+from physicsml.lightning.graph_datasets.batch_dict import BatchDictCollater
+from physicsml.lightning.pre_batch_cache import PreBatchCache
+from physicsml.lightning.pre_batching_shards import (
+    DEFAULT_SHARD_SIZE,
+    WriteShardsT,
+    is_distributed,
+    rank_and_world_size,
+    rank_local_sampler_kwargs,
+    write_rank_shards,
+)
+from physicsml.lightning.tensor_arena import ShardedTensorArena, TensorArena
 
 
 class OnDiskBatchedDataset(Dataset):
-    def __init__(self, path: str) -> None:
+    """A dataset of pre-batched batches stored in a few memory-mapped shards.
+
+    The directory at ``path`` holds a ``manifest.json`` and a ``TensorArena`` per
+    shard (see ``pre_batch_on_disk``). If ``rank`` is specified, only the shards
+    pre-batched for that rank are read.
+    """
+
+    def __init__(self, path: str, rank: int | None = None) -> None:
         super().__init__()
         self.path = Path(path)
-        self.length = len(
-            [None for p in self.path.iterdir() if str(p).endswith(".torch")],
+
+        with open(self.path / "manifest.json") as f:
+            manifest = json.load(f)
+
+        self.num_ranks: int = manifest["num_ranks"]
+        self.arena = ShardedTensorArena(
+            [
+                TensorArena(self.path / shard["file"])
+                for shard in manifest["shards"]
+                if (rank is None) or (shard["rank"] == rank)
+            ],
         )
 
+    @property
+    def shards(self) -> list[TensorArena]:
+        return self.arena.shards
+
     def __len__(self) -> int:
-        return self.length
+        return len(self.arena)
 
     def __getitem__(self, idx: int) -> Any:
-        batch = torch.load(self.path / f"batch_{idx}.torch")
-
-        return batch
+        return self.arena[idx]
+
+    def load(self, idx: int) -> Any:
+        """Reads a batch into memory (see ``TensorArena.load``)."""
+        return self.arena.load(idx)
+
+
+class PrefetchDataLoader(DataLoader):
+    """A ``DataLoader`` which reads batches in a pool of background threads.
+
+    Up to ``max_prefetch`` batches (in the order of the sampler) are read ahead by
+    ``num_prefetch_threads`` threads, so that the I/O overlaps with the training step.
+    Datasets with a ``load`` method (such as ``OnDiskBatchedDataset``) are read with
+    it, and with ``__getitem__`` otherwise.
+    """
+
+    def __init__(
+        self,
+        dataset: Dataset,
+        batch_size: int = 1,
+        shuffle: bool = False,
+        num_prefetch_threads: int = 4,
+        max_prefetch: int = 8,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(dataset, batch_size, shuffle, **kwargs)
+        self.num_prefetch_threads = num_prefetch_threads
+        self.max_prefetch = max_prefetch
+
+    def _load_batch(self, indices: list[int]) -> Any:
+        load = getattr(self.dataset, "load", self.dataset.__getitem__)
+        return self.collate_fn([load(idx) for idx in indices])
+
+    def __iter__(self) -> Iterator[Any]:  # type: ignore
+        if self.num_workers > 0:
+            yield from super().__iter__()
+            return
+
+        with ThreadPoolExecutor(max_workers=self.num_prefetch_threads) as executor:
+            # a bounded queue of the batches being read
+            queue: deque[Future] = deque()
+            for indices in self.batch_sampler:  # type: ignore
+                queue.append(executor.submit(self._load_batch, indices))
+                if len(queue) >= self.max_prefetch:
+                    yield queue.popleft().result()
+            while len(queue) > 0:
+                yield queue.popleft().result()
 
 
 def collate_fn(list_of_data: list[Any]) -> Any:
@@ -31,39 +108,106 @@ def collate_fn(list_of_data: list[Any]) -> Any:
     return list_of_data[0]
 
 
-@rank_zero_only
-def pre_batch_on_disk(dataloader: DataLoader, path: str) -> int:
+def pre_batch_on_disk(
+    dataloader: DataLoader,
+    path: str,
+    shard_size: int | None = DEFAULT_SHARD_SIZE,
+    write_shards: WriteShardsT | None = None,
+) -> int:
+    """Writes the batches of a dataloader into shards of at most about ``shard_size``
+    bytes (a ``TensorArena`` each) plus a ``manifest.json``.
+
+    Every rank pre-batches its own share of the batches (see ``write_rank_shards``,
+    with ``write_shards`` if specified) and the manifest of the shards of all the
+    ranks is written (last) by rank zero. Returns the total number of batches.
+    """
+
+    rank, world_size = rank_and_world_size()
+
     posix_path = Path(path)
-    posix_path.mkdir()
+    if rank == 0:
+        posix_path.mkdir(parents=True, exist_ok=True)
+    if world_size > 1:
+        torch.distributed.barrier()
 
-    for idx, b in tqdm(
-        enumerate(dataloader),
-        desc="Pre-batching data on disk",
-        total=len(dataloader),
-    ):
-        torch.save(b, posix_path / f"batch_{idx}.torch")
+    rank_shards = write_rank_shards(
+        dataloader,
+        str(posix_path / f"shard_{rank}"),
+        shard_size=shard_size,
+        write_shards=write_shards,
+    )
 
-    return idx + 1  # type: ignore
+    all_shards = [rank_shards]
+    if world_size > 1:
+        all_shards = [[] for _ in range(world_size)]
+        torch.distributed.all_gather_object(all_shards, rank_shards)
+
+    shards: list[dict[str, Any]] = [
+        {"file": Path(file).name, "rank": shard_rank, "num_batches": num_batches}
+        for shard_rank, shard_rank_shards in enumerate(all_shards)
+        for file, num_batches in shard_rank_shards
+    ]
+    num_batches = sum(int(shard["num_batches"]) for shard in shards)
+
+    # the manifest is written last
+    if rank == 0:
+        with open(posix_path / "manifest.json", "w") as f:
+            json.dump(
+                {
+                    "num_ranks": world_size,
+                    "num_batches": num_batches,
+                    "shards": shards,
+                },
+                f,
+            )
+
+    return num_batches
 
 
 def construct_on_disk_pre_batched_dataloader(
     dataloader: DataLoader,
     shuffle: bool,
     name: str,
+    cache: PreBatchCache | None = None,
+    cache_key: str | None = None,
+    batch_dtype: torch.dtype | None = None,
 ) -> DataLoader:
-    pre_batch_on_disk(dataloader, f"pre_batched_{name}_dataset")
+    """Pre-batches a dataloader on disk and returns a dataloader over the batches.
+
+    The batches are written to ``pre_batched_{name}_dataset`` (which is removed at the
+    end of the fit), or to the ``cache`` under ``cache_key`` (where they are reused by
+    later runs) if specified. If a ``batch_dtype`` is specified, the dataloader yields
+    ``GraphBatchDict``s in it.
+    """
+
+    if cache is not None:
+        assert cache_key is not None
+        path = cache.get_or_build(
+            cache_key,
+            lambda build_path: pre_batch_on_disk(dataloader, build_path),
+        )
+    else:
+        path = f"pre_batched_{name}_dataset"
+        pre_batch_on_disk(dataloader, path)
 
-    if torch.distributed.is_available() and torch.distributed.is_initialized():
-        torch.distributed.barrier()
+        if is_distributed():
+            torch.distributed.barrier()
 
+    # every rank reads only the shards it pre-batched
+    rank, world_size = rank_and_world_size()
     batched_dataset = OnDiskBatchedDataset(
-        path=f"pre_batched_{name}_dataset",
+        path=path,
+        rank=rank if world_size > 1 else None,
     )
 
-    return DataLoader(
+    return PrefetchDataLoader(
         batched_dataset,
         batch_size=1,
-        shuffle=shuffle,
         num_workers=0,
-        collate_fn=collate_fn,
+        collate_fn=(
+            BatchDictCollater(collate_fn, batch_dtype)
+            if batch_dtype is not None
+            else collate_fn
+        ),
+        **rank_local_sampler_kwargs(batched_dataset, shuffle),
     )
@@ -0,0 +1,295 @@
+import shutil
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import Any
+
+import torch
+from torch.utils.data.dataloader import DataLoader
+from torch.utils.data.dataset import Dataset
+from torch_geometric.data import Batch
+
+from physicsml.lightning.pre_batch_cache import PreBatchCache
+from physicsml.lightning.pre_batching_in_memory import unique_arena_prefix
+from physicsml.lightning.pre_batching_on_disk import (
+    OnDiskBatchedDataset,
+    pre_batch_on_disk,
+)
+from physicsml.lightning.pre_batching_shards import (
+    fetch_worker_batches,
+    is_distributed,
+    rank_and_world_size,
+)
+from physicsml.lightning.tensor_arena import TensorArenaWriter
+
+
+def _ptr(sizes: torch.Tensor) -> torch.Tensor:
+    return torch.cat([torch.zeros(1, dtype=torch.int64), sizes.cumsum(0)])
+
+
+def _is_incremented(key: str) -> bool:
+    # the keys which are incremented by the number of nodes when collating (the same
+    # rule as ``torch_geometric.data.Data.__inc__``)
+    return ("index" in key) or (key == "face")
+
+
+def _segments(starts: torch.Tensor, sizes: torch.Tensor) -> torch.Tensor:
+    # the indices of the concatenated segments [start, start + size)
+    offsets = torch.repeat_interleave(starts - _ptr(sizes)[:-1], sizes)
+    return offsets + torch.arange(int(sizes.sum()))
+
+
+def build_sample_store(
+    batches: Iterable[Batch],
+    indices: list[int] | None = None,
+) -> dict[str, Any]:
+    """Splits batches (such as those of a sequential dataloader) into per graph CSR
+    arrays.
+
+    For every key of the batches, the values of all the graphs are concatenated
+    (along the dimension they are collated along, which is moved first) and the
+    offsets of each graph into them are stored in ``ptr``. Node indices (such as the
+    ``edge_index``) are stored relative to the first node of their graph. The
+    ``indices`` of the graphs in the dataset are stored too (``0, 1, ...`` if not
+    specified).
+    """
+
+    values: dict[str, list[torch.Tensor]] = defaultdict(list)
+    sizes: dict[str, list[torch.Tensor]] = defaultdict(list)
+    num_nodes = []
+    cat_dims: dict[str, int] = {}
+    base_cls = None
+
+    for batch in batches:
+        base_cls = type(batch).__bases__[-1]
+        num_nodes.append(batch.ptr.diff())
+
+        for key, slices in batch._slice_dict.items():
+            value = batch[key]
+            cat_dim = batch.__cat_dim__(key, value) % max(value.dim(), 1)
+            cat_dims[key] = cat_dim
+
+            key_sizes = slices.diff()
+            value = value.movedim(cat_dim, 0)
+            if _is_incremented(key):
+                inc = torch.repeat_interleave(batch._inc_dict[key], key_sizes)
+                # (in the dtype of the values, which can be compact)
+                inc = inc.type(value.dtype)
+                value = value - inc.reshape(-1, *([1] * (value.dim() - 1)))
+
+            values[key].append(value.contiguous())
+            sizes[key].append(key_sizes)
+
+    all_num_nodes = torch.cat(num_nodes) if num_nodes else torch.empty(0).long()
+    if indices is None:
+        indices = list(range(all_num_nodes.shape[0]))
+    assert len(indices) == all_num_nodes.shape[0]
+
+    return {
+        "base_cls": base_cls,
+        "indices": torch.as_tensor(indices, dtype=torch.int64),
+        "num_nodes": all_num_nodes,
+        "cat_dims": cat_dims,
+        "values": {key: torch.cat(value) for key, value in values.items()},
+        "ptr": {key: _ptr(torch.cat(value)) for key, value in sizes.items()},
+    }
+
+
+class SampleStore(Dataset):
+    """A dataset of pre-collated graphs which are re-collated into new batches.
+
+    Holds the tensors of every graph in CSR arrays (see ``build_sample_store``), from
+    which ``__getitems__`` assembles a ``Batch`` of any graphs with a few vectorised
+    gathers (instead of featurising and collating the graphs again). Unlike fixed
+    pre-batches, this allows for new batches (and shuffles) on every epoch with the
+    speed of pre-batching. Used with a ``GraphDataLoader`` (and any sampler).
+
+    The store can be split into several shards (built in parallel, see
+    ``pre_collate_samples``), in which case every graph is read from the shard which
+    holds its index.
+    """
+
+    def __init__(self, store: dict[str, Any] | list[dict[str, Any]]) -> None:
+        super().__init__()
+        stores = [store] if isinstance(store, dict) else store
+        self.stores = [store for store in stores if store["base_cls"] is not None]
+        assert len(self.stores) > 0, "The sample store is empty."
+
+        self.base_cls = self.stores[0]["base_cls"]
+        self.cat_dims: dict[str, int] = self.stores[0]["cat_dims"]
+
+        # the shard and position in the shard of every graph (a graph can be in
+        # several shards, if some batches are repeated between the ranks)
+        indices = torch.cat([store["indices"] for store in self.stores])
+        num_graphs = int(indices.max()) + 1
+        self._shard = torch.empty(num_graphs, dtype=torch.int64)
+        self._local_idx = torch.empty(num_graphs, dtype=torch.int64)
+        self.num_nodes = torch.empty(
+            num_graphs,
+            dtype=self.stores[0]["num_nodes"].dtype,
+        )
+        for shard, store in enumerate(self.stores):
+            self._shard[store["indices"]] = shard
+            self._local_idx[store["indices"]] = torch.arange(len(store["indices"]))
+            self.num_nodes[store["indices"]] = store["num_nodes"]
+
+    def __len__(self) -> int:
+        return int(self.num_nodes.shape[0])
+
+    def num_nodes_per_graph(self) -> torch.Tensor:
+        return self.num_nodes
+
+    def __getitem__(self, idx: int) -> Batch:
+        return self.collate([idx])
+
+    def __getitems__(self, indices: list[int]) -> list[Batch]:
+        # returns a single pre-collated batch, see ``GraphCollater``
+        return [self.collate(indices)]
+
+    def _gather(
+        self,
+        key: str,
+        shards: torch.Tensor,
+        local_idx: torch.Tensor,
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        # the concatenated values of the graphs for a key, and their sizes
+        if len(self.stores) == 1:
+            key_ptr = self.stores[0]["ptr"][key]
+            starts = key_ptr[local_idx]
+            sizes = key_ptr[local_idx + 1] - starts
+            return self.stores[0]["values"][key][_segments(starts, sizes)], sizes
+
+        masks = [shards == shard for shard in range(len(self.stores))]
+        starts = torch.empty_like(local_idx)
+        sizes = torch.empty_like(local_idx)
+        for mask, store in zip(masks, self.stores, strict=True):
+            key_ptr = store["ptr"][key]
+            starts[mask] = key_ptr[local_idx[mask]]
+            sizes[mask] = key_ptr[local_idx[mask] + 1] - starts[mask]
+
+        # scatter the segments of every shard into their place in the batch
+        out_starts = _ptr(sizes)[:-1]
+        first_values = self.stores[0]["values"][key]
+        value = first_values.new_empty((int(sizes.sum()), *first_values.shape[1:]))
+        for mask, store in zip(masks, self.stores, strict=True):
+            if mask.any():
+                value[_segments(out_starts[mask], sizes[mask])] = store["values"][key][
+                    _segments(starts[mask], sizes[mask])
+                ]
+
+        return value, sizes
+
+    def collate(self, indices: list[int]) -> Batch:
+        idx = torch.as_tensor(indices, dtype=torch.int64)
+        shards = self._shard[idx]
+        local_idx = self._local_idx[idx]
+        num_graphs = idx.shape[0]
+        num_nodes = self.num_nodes[idx]
+        ptr = _ptr(num_nodes)
+
+        # assemble the batch in the same way as ``GraphDataset.get_batch``
+        batch = Batch(_base_cls=self.base_cls)
+        slice_dict = {}
+        inc_dict = {}
+        for key, cat_dim in self.cat_dims.items():
+            value, sizes = self._gather(key, shards, local_idx)
+            if _is_incremented(key):
+                inc = torch.repeat_interleave(ptr[:-1], sizes).type(value.dtype)
+                value = value + inc.reshape(-1, *([1] * (value.dim() - 1)))
+                inc_dict[key] = ptr[:-1]
+            else:
+                inc_dict[key] = torch.zeros(num_graphs, dtype=torch.int64)
+
+            batch[key] = value.movedim(0, cat_dim).contiguous()
+            slice_dict[key] = _ptr(sizes)
+
+        batch.num_nodes = int(ptr[-1])
+        batch.batch = torch.repeat_interleave(torch.arange(num_graphs), num_nodes)
+        batch.ptr = ptr
+        batch._store._num_nodes = num_nodes.tolist()
+        batch._num_graphs = num_graphs
+        batch._slice_dict = slice_dict
+        batch._inc_dict = inc_dict
+
+        return batch
+
+
+def _write_sample_store_shards(
+    batches: list[list[int]],
+    prefix: str,
+    shard_size: int | None,
+    progress: bool,
+) -> list[tuple[str, int]]:
+    # the store of the batches of a worker, in a single shard
+    if len(batches) == 0:
+        return []
+
+    writer = TensorArenaWriter(f"{prefix}_0.arena")
+    writer.append(
+        build_sample_store(
+            fetch_worker_batches(batches, progress),
+            indices=[idx for indices in batches for idx in indices],
+        ),
+    )
+    return [(str(writer.path), writer.close())]
+
+
+def pre_collate_samples(dataloader: DataLoader, path: str) -> None:
+    """Writes the sample store of a sequential dataloader to the directory ``path``.
+
+    As for on disk pre-batching (see ``pre_batch_on_disk``), every rank and every
+    worker of the dataloader pre-collate their own share of the batches into a shard
+    of the store, which are listed in a ``manifest.json``.
+    """
+
+    pre_batch_on_disk(
+        dataloader,
+        path,
+        shard_size=None,
+        write_shards=_write_sample_store_shards,
+    )
+
+
+def load_sample_store(path: str) -> SampleStore:
+    """Loads (memory-maps) the shards of the sample store in the directory ``path``."""
+
+    arena = OnDiskBatchedDataset(path).arena
+    return SampleStore([arena[idx] for idx in range(len(arena))])
+
+
+def construct_sample_store(
+    dataloader: DataLoader,
+    cache: PreBatchCache | None = None,
+    cache_key: str | None = None,
+) -> SampleStore:
+    """Builds a ``SampleStore`` from the batches of a sequential dataloader.
+
+    As for in memory pre-batching, the store is held in memory-mapped ``TensorArena``
+    shards which are shared by all the ranks on a node. If a ``cache`` is specified,
+    the store is kept in it under ``cache_key`` and reused by later runs.
+    """
+
+    if cache is not None:
+        assert cache_key is not None
+        path = cache.get_or_build(
+            cache_key,
+            lambda build_path: pre_collate_samples(dataloader, build_path),
+        )
+        return load_sample_store(path)
+
+    path = unique_arena_prefix()
+    pre_collate_samples(dataloader, path)
+
+    if is_distributed():
+        torch.distributed.barrier()
+
+    # the memory maps stay valid after the files are removed
+    sample_store = load_sample_store(path)
+
+    if is_distributed():
+        torch.distributed.barrier()
+
+    rank, _ = rank_and_world_size()
+    if rank == 0:
+        shutil.rmtree(path, ignore_errors=True)
+
+    return sample_store
@@ -0,0 +1,189 @@
+import multiprocessing
+import os
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+import numpy as np
+import torch
+from torch.utils.data import DistributedSampler
+from torch.utils.data.dataloader import DataLoader
+from torch.utils.data.dataset import Dataset
+from tqdm.auto import tqdm
+
+from physicsml.lightning.tensor_arena import TensorArenaWriter
+
+# the size (in bytes) after which a new shard of a pre-batched dataset is started
+DEFAULT_SHARD_SIZE = 2**30
+
+
+def is_distributed() -> bool:
+    return torch.distributed.is_available() and torch.distributed.is_initialized()
+
+
+def rank_and_world_size() -> tuple[int, int]:
+    if is_distributed():
+        return torch.distributed.get_rank(), torch.distributed.get_world_size()
+    return 0, 1
+
+
+def rank_batches(dataloader: DataLoader) -> list[list[int]]:
+    """The indices of the batches of a dataloader which the current rank pre-batches.
+
+    The batches are drawn once (on rank zero, so that shuffles agree) and are then
+    split between the ranks, which all get the same number of batches (the first
+    batches are repeated if needed).
+    """
+
+    rank, world_size = rank_and_world_size()
+
+    batches: list[list[int]] = []
+    if rank == 0:
+        batches = [[int(idx) for idx in batch] for batch in dataloader.batch_sampler]  # type: ignore
+    if world_size > 1:
+        batches_list = [batches]
+        torch.distributed.broadcast_object_list(batches_list, src=0)
+        batches = batches_list[0]
+
+        if len(batches) % world_size != 0:
+            padding = world_size - len(batches) % world_size
+            batches = batches + (batches * padding)[:padding]
+
+    return batches[rank::world_size]
+
+
+def _fetch(dataset: Dataset, collate_fn: Any, indices: list[int]) -> Any:
+    # the same as the fetcher of a map-style ``DataLoader``
+    if hasattr(dataset, "__getitems__"):
+        data = dataset.__getitems__(indices)
+    else:
+        data = [dataset[idx] for idx in indices]
+    return collate_fn(data)
+
+
+# the dataset and collate_fn of the dataloader being pre-batched, which are inherited by
+# the forked worker processes (instead of being pickled)
+_WORKER_STATE: tuple[Dataset, Any] | None = None
+
+
+def fetch_worker_batches(batches: list[list[int]], progress: bool) -> Iterator[Any]:
+    """Collates the ``batches`` of the dataloader being pre-batched (in a worker of
+    ``write_rank_shards``)."""
+
+    assert _WORKER_STATE is not None
+    dataset, collate_fn = _WORKER_STATE
+
+    for indices in tqdm(batches, desc="Pre-batching data", disable=not progress):
+        yield _fetch(dataset, collate_fn, indices)
+
+
+# writes the batches (their indices) of a worker into shards with the given prefix and
+# shard size, and returns the paths of the shards and their number of entries
+WriteShardsT = Callable[[list[list[int]], str, int | None, bool], list[tuple[str, int]]]
+
+
+def _write_shards(
+    batches: list[list[int]],
+    prefix: str,
+    shard_size: int | None,
+    progress: bool,
+) -> list[tuple[str, int]]:
+    shards: list[tuple[str, int]] = []
+    writer: TensorArenaWriter | None = None
+    for batch in fetch_worker_batches(batches, progress):
+        if (writer is None) or (
+            (shard_size is not None) and (writer.offset >= shard_size)
+        ):
+            if writer is not None:
+                shards.append((str(writer.path), writer.close()))
+            writer = TensorArenaWriter(f"{prefix}_{len(shards)}.arena")
+
+        writer.append(batch)
+
+    if writer is not None:
+        shards.append((str(writer.path), writer.close()))
+
+    return shards
+
+
+def write_rank_shards(
+    dataloader: DataLoader,
+    prefix: str,
+    shard_size: int | None = DEFAULT_SHARD_SIZE,
+    write_shards: WriteShardsT | None = None,
+) -> list[tuple[str, int]]:
+    """Pre-batches the ``rank_batches`` of the current rank into ``TensorArena`` shards.
+
+    The batches are split into contiguous chunks between ``dataloader.num_workers``
+    forked processes (or pre-batched in this process if there are none), each of
+    which writes its own shards ``{prefix}_{worker}_{shard}.arena`` of up to about
+    ``shard_size`` bytes (with ``write_shards``, which writes a batch per entry by
+    default).
+
+    Returns:
+        The paths of the shards and their number of batches, in the order of the
+        batches.
+    """
+
+    global _WORKER_STATE
+
+    if write_shards is None:
+        write_shards = _write_shards
+
+    batches = rank_batches(dataloader)
+    num_workers = dataloader.num_workers
+    if "fork" not in multiprocessing.get_all_start_methods():
+        num_workers = 0
+
+    _WORKER_STATE = (dataloader.dataset, dataloader.collate_fn)
+    try:
+        if num_workers == 0:
+            return write_shards(batches, f"{prefix}_0", shard_size, True)
+
+        chunks = np.array_split(np.arange(len(batches)), num_workers)
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=multiprocessing.get_context("fork"),
+            # as for the workers of a ``DataLoader`` (which avoids deadlocks in the
+            # intra-op thread pool inherited from the parent)
+            initializer=torch.set_num_threads,
+            initargs=(1,),
+        ) as executor:
+            futures = [
+                executor.submit(
+                    write_shards,
+                    [batches[idx] for idx in chunk],
+                    f"{prefix}_{worker}",
+                    shard_size,
+                    False,
+                )
+                for worker, chunk in enumerate(chunks)
+                if len(chunk) > 0
+            ]
+            shards = []
+            for future in tqdm(futures, desc="Pre-batching data"):
+                shards.extend(future.result())
+    finally:
+        _WORKER_STATE = None
+
+    return shards
+
+
+def rank_local_sampler_kwargs(dataset: Dataset, shuffle: bool) -> dict[str, Any]:
+    """The sampler kwargs of a dataloader over the batches pre-batched by this rank.
+
+    For distributed training, the sampler is a ``DistributedSampler`` over the local
+    batches only (which stops Lightning from injecting a sampler over all of them).
+    """
+
+    if is_distributed():
+        return {
+            "sampler": DistributedSampler(
+                dataset,
+                num_replicas=1,
+                rank=0,
+                shuffle=shuffle,
+                seed=int(os.getenv("PL_GLOBAL_SEED", 0)),
+            ),
+        }
+    return {"shuffle": shuffle}
@@ -0,0 +1,194 @@
+from dataclasses import dataclass
+from typing import Any, Literal
+
+import lightning.pytorch as pl
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import torch
+from lightning.pytorch.callbacks import BasePredictionWriter
+
+
+@dataclass(frozen=True)
+class PredictionColumn:
+    """A column of the prediction output.
+
+    Args:
+        name: The name of the column.
+        key: The key of the output of the module (e.g. ``y_graph_scalars``).
+        index: The index of the column in the output (for scalars), or ``None`` to take
+            the whole output (for vectors).
+        level: Whether the output is per ``graph``, ``node`` or ``edge``. The node and
+            edge outputs are stored as a list per graph.
+        optional: Whether to skip the column if the module does not output its key
+            (such as the ``::std`` of models without uncertainty).
+    """
+
+    name: str
+    key: str
+    index: int | None
+    level: Literal["graph", "node", "edge"]
+    optional: bool = False
+
+
+def _num_nodes(batch: Any) -> torch.Tensor:
+    # the number of nodes of each graph of the batch (of graphs or of padded molecules)
+    num_nodes: torch.Tensor
+    if "species" in batch:
+        num_nodes = (batch["species"] >= 0).sum(dim=1)
+    else:
+        num_nodes = batch["ptr"][1:] - batch["ptr"][:-1]
+    return num_nodes
+
+
+def _num_edges(batch: Any) -> torch.Tensor:
+    # the number of edges of each graph of the batch
+    num_graphs = len(batch["ptr"]) - 1
+    return torch.bincount(
+        batch["batch"][batch["edge_index"][0]].long(),
+        minlength=num_graphs,
+    )
+
+
+def _to_arrow(values: np.ndarray) -> pa.Array:
+    # [n] values as an array and [n, k] values as an array of fixed size lists
+    if values.ndim == 1:
+        return pa.array(values)
+    return pa.FixedSizeListArray.from_arrays(
+        _to_arrow(values.reshape(-1, *values.shape[2:])),
+        values.shape[1],
+    )
+
+
+def prediction_to_record_batch(
+    prediction: dict[str, torch.Tensor],
+    batch: Any,
+    columns: list[PredictionColumn],
+) -> pa.RecordBatch:
+    """Converts the output of a predict step into an arrow record batch with a row per
+    graph (without going through python lists).
+
+    The node and edge outputs (which are concatenated over the graphs of the batch)
+    are split into a list per graph with the number of nodes (or edges) of each graph
+    of the batch.
+    """
+
+    arrays: dict[str, pa.Array] = {}
+    lengths: dict[str, torch.Tensor] = {}
+    for column in columns:
+        if column.key not in prediction:
+            if column.optional:
+                continue
+            raise KeyError(f"The module did not output '{column.key}'.")
+
+        value = prediction[column.key].detach()
+        if column.index is not None:
+            value = value[:, column.index]
+        array = _to_arrow(value.cpu().numpy())
+
+        if column.level != "graph":
+            if column.level not in lengths:
+                lengths[column.level] = (
+                    _num_nodes(batch) if column.level == "node" else _num_edges(batch)
+                )
+            offsets = torch.zeros(len(lengths[column.level]) + 1, dtype=torch.int64)
+            torch.cumsum(lengths[column.level].cpu(), dim=0, out=offsets[1:])
+            array = pa.ListArray.from_arrays(
+                pa.array(offsets.numpy().astype(np.int32)),
+                array,
+            )
+
+        arrays[column.name] = array
+
+    return pa.RecordBatch.from_pydict(arrays)
+
+
+class ColumnarPredictionWriter(BasePredictionWriter):
+    """Converts the output of every predict batch into an arrow record batch as soon as
+    it is produced, instead of keeping the outputs of all the batches as tensors.
+
+    If a ``path`` is given, the record batches are streamed to a parquet file (so the
+    memory used does not grow with the number of predictions), otherwise they are kept
+    in memory (as compact arrow buffers) and are returned by ``to_table``.
+    """
+
+    def __init__(
+        self,
+        columns: list[PredictionColumn],
+        path: str | None = None,
+        compression: str = "snappy",
+    ) -> None:
+        super().__init__(write_interval="batch")
+
+        self.columns = columns
+        self.path = path
+        self.compression = compression
+
+        self.record_batches: list[pa.RecordBatch] = []
+        self.num_batches = 0
+        self._parquet_writer: pq.ParquetWriter | None = None
+
+    def write_on_batch_end(
+        self,
+        trainer: pl.Trainer,
+        pl_module: pl.LightningModule,
+        prediction: Any,
+        batch_indices: Any,
+        batch: Any,
+        batch_idx: int,
+        dataloader_idx: int,
+    ) -> None:
+        record_batch = prediction_to_record_batch(prediction, batch, self.columns)
+        self.num_batches += 1
+
+        if self.path is None:
+            self.record_batches.append(record_batch)
+            return
+
+        if self._parquet_writer is None:
+            self._parquet_writer = pq.ParquetWriter(
+                self.path,
+                record_batch.schema,
+                compression=self.compression,
+            )
+        self._parquet_writer.write_batch(record_batch)
+
+    def on_predict_end(
+        self,
+        trainer: pl.Trainer,
+        pl_module: pl.LightningModule,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        elif (self.path is not None) and (self.num_batches == 0):
+            # there were no predictions
+            pq.write_table(self.to_table(), self.path, compression=self.compression)
+
+    def to_table(self) -> pa.Table:
+        """The predictions kept in memory (if no ``path`` is given)."""
+
+        if not self.record_batches:
+            return pa.table(
+                {
+                    column.name: pa.array([], type=pa.float32())
+                    for column in self.columns
+                    if not column.optional
+                },
+            )
+        return pa.Table.from_batches(self.record_batches)
+
+
+def column_to_list(column: pa.ChunkedArray) -> list:
+    """Converts a column of the predictions into a list, where the node and edge
+    outputs (lists per graph) are concatenated over the graphs (as returned by
+    ``predict``)."""
+
+    if pa.types.is_list(column.type):
+        column = pc.list_flatten(column)
+    values: list = column.to_pylist()
+    return values
@@ -0,0 +1,338 @@
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator, Sequence
+
+import numpy as np
+import torch
+from torch.utils.data import BatchSampler, DistributedSampler, Sampler
+
+
+def pack_batches(
+    indices: Sequence[int] | np.ndarray,
+    num_nodes: np.ndarray,
+    max_nodes: int | None,
+    num_edges: np.ndarray | None = None,
+    max_edges: int | None = None,
+) -> list[list[int]]:
+    """Greedily packs consecutive ``indices`` into batches within a node/edge budget.
+
+    A graph is added to the current batch as long as the total number of nodes
+    (and edges) does not exceed ``max_nodes`` (and ``max_edges``), otherwise a new
+    batch is started. Graphs which exceed the budget on their own form a batch of
+    a single graph.
+    """
+
+    batches: list[list[int]] = []
+    batch: list[int] = []
+    batch_nodes = 0
+    batch_edges = 0
+    for idx in indices:
+        idx = int(idx)
+        graph_nodes = int(num_nodes[idx])
+        graph_edges = int(num_edges[idx]) if num_edges is not None else 0
+
+        if len(batch) > 0 and (
+            ((max_nodes is not None) and (batch_nodes + graph_nodes > max_nodes))
+            or ((max_edges is not None) and (batch_edges + graph_edges > max_edges))
+        ):
+            batches.append(batch)
+            batch, batch_nodes, batch_edges = [], 0, 0
+
+        batch.append(idx)
+        batch_nodes += graph_nodes
+        batch_edges += graph_edges
+
+    if len(batch) > 0:
+        batches.append(batch)
+
+    return batches
+
+
+def padding_efficiency(batches: list[list[int]], num_nodes: np.ndarray) -> float:
+    """The fraction of the node slots of padded batches which are real nodes.
+
+    When the graphs of a batch are padded to the largest one (as for ANI), a batch
+    of ``n`` graphs uses ``n * max(num_nodes)`` node slots.
+    """
+
+    num_real = 0
+    num_slots = 0
+    for batch in batches:
+        if len(batch) == 0:
+            continue
+        batch_num_nodes = num_nodes[batch]
+        num_real += int(batch_num_nodes.sum())
+        num_slots += len(batch) * int(batch_num_nodes.max())
+
+    return num_real / num_slots if num_slots > 0 else 1.0
+
+
+class _ShardedBatchSampler(BatchSampler, ABC):
+    """Base class of batch samplers which batch a whole dataset and shard the batches.
+
+    For distributed training, the whole dataset is batched in the same order on all
+    the ranks (the shuffle is seeded by ``seed`` and the epoch) and the batches are
+    then sharded across the ``num_replicas`` ranks, so that every rank gets the same
+    number of batches (the last batches are repeated, or dropped if ``drop_last``).
+    When Lightning injects a ``DistributedSampler`` as the ``sampler``, the number of
+    replicas, rank, seed and epoch are taken from it.
+
+    If ``set_epoch`` is never called, a new shuffle is drawn on every pass.
+    """
+
+    def __init__(
+        self,
+        sampler: Sampler[int] | Iterable[int],
+        num_nodes: Sequence[int] | np.ndarray | torch.Tensor,
+        shuffle: bool,
+        drop_last: bool,
+        seed: int,
+        num_replicas: int,
+        rank: int,
+    ) -> None:
+        if not (0 <= rank < num_replicas):
+            raise ValueError(f"Invalid rank {rank} for {num_replicas} replicas.")
+
+        self.sampler = sampler
+        self.num_nodes = np.asarray(num_nodes, dtype=np.int64)
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed
+        self.num_replicas = num_replicas
+        self.rank = rank
+
+        self.epoch = 0
+        # the epoch is advanced after every pass, unless it is set explicitly
+        self._epoch_is_set = False
+        self._batches: tuple[tuple[int, int, int], list[list[int]]] | None = None
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
+        self._epoch_is_set = True
+
+    @abstractmethod
+    def _make_batches(
+        self,
+        indices: list[int],
+        generator: torch.Generator | None,
+    ) -> list[list[int]]:
+        """Batches the ``indices`` (shuffled with ``generator`` if it is not None)."""
+
+    def _state(self) -> tuple[list[int], int, int, int, int]:
+        # (indices, seed, epoch, num_replicas, rank)
+        if isinstance(self.sampler, DistributedSampler):
+            # injected by lightning, which sets the epoch of the sampler
+            return (
+                list(range(len(self.sampler.dataset))),  # type: ignore
+                self.sampler.seed,
+                self.sampler.epoch,
+                self.sampler.num_replicas,
+                self.sampler.rank,
+            )
+        return (
+            list(self.sampler),
+            self.seed,
+            self.epoch,
+            self.num_replicas,
+            self.rank,
+        )
+
+    def _rank_batches(self) -> list[list[int]]:
+        indices, seed, epoch, num_replicas, rank = self._state()
+
+        cache_key = (epoch, num_replicas, rank)
+        if (self._batches is not None) and (self._batches[0] == cache_key):
+            return self._batches[1]
+
+        if self.shuffle:
+            generator: torch.Generator | None = torch.Generator()
+            generator.manual_seed(seed + epoch)  # type: ignore
+        else:
+            generator = None
+        batches = self._make_batches(indices, generator)
+
+        # every rank must get the same number of batches
+        if len(batches) % num_replicas != 0:
+            if self.drop_last:
+                batches = batches[: len(batches) - len(batches) % num_replicas]
+            else:
+                padding = num_replicas - len(batches) % num_replicas
+                batches = batches + (batches * padding)[:padding]
+
+        rank_batches = batches[rank::num_replicas]
+        self._batches = (cache_key, rank_batches)
+
+        return rank_batches
+
+    def padding_efficiency(self) -> float:
+        """The ``padding_efficiency`` of the batches of the next pass on this rank."""
+        return padding_efficiency(self._rank_batches(), self.num_nodes)
+
+    def __iter__(self) -> Iterator[list[int]]:
+        batches = self._rank_batches()
+        if not self._epoch_is_set:
+            self.epoch += 1
+        yield from batches
+
+    def __len__(self) -> int:
+        return len(self._rank_batches())
+
+
+class DynamicBatchSampler(_ShardedBatchSampler):
+    """Batches graphs up to a budget of nodes and/or edges instead of a fixed size.
+
+    The indices yielded by ``sampler`` are (optionally shuffled and) greedily packed
+    into batches with at most ``max_nodes`` nodes and ``max_edges`` edges (see
+    ``pack_batches``), which keeps the memory footprint of the batches constant for
+    datasets with a broad distribution of graph sizes. The batches are sharded for
+    distributed training as described in ``_ShardedBatchSampler``.
+
+    Args:
+        sampler: The sampler of the indices to batch (usually a ``SequentialSampler``).
+        num_nodes: The number of nodes of each graph in the dataset.
+        max_nodes: The maximum number of nodes in a batch.
+        num_edges: The number of edges of each graph in the dataset.
+        max_edges: The maximum number of edges in a batch.
+        shuffle: Whether to shuffle the indices before packing (on every epoch).
+        drop_last: Whether to drop the last (partially filled) batch.
+        seed: The seed of the shuffle.
+        num_replicas: The number of ranks to shard the batches across.
+        rank: The rank of the current process.
+    """
+
+    def __init__(
+        self,
+        sampler: Sampler[int] | Iterable[int],
+        num_nodes: Sequence[int] | np.ndarray | torch.Tensor,
+        max_nodes: int | None = None,
+        num_edges: Sequence[int] | np.ndarray | torch.Tensor | None = None,
+        max_edges: int | None = None,
+        shuffle: bool = False,
+        drop_last: bool = False,
+        seed: int = 0,
+        num_replicas: int = 1,
+        rank: int = 0,
+    ) -> None:
+        if (max_nodes is None) and (max_edges is None):
+            raise ValueError("At least one of max_nodes or max_edges must be set.")
+        if (max_edges is not None) and (num_edges is None):
+            raise ValueError("num_edges must be provided to batch with max_edges.")
+
+        super().__init__(
+            sampler=sampler,
+            num_nodes=num_nodes,
+            shuffle=shuffle,
+            drop_last=drop_last,
+            seed=seed,
+            num_replicas=num_replicas,
+            rank=rank,
+        )
+        self.max_nodes = max_nodes
+        self.num_edges = (
+            np.asarray(num_edges, dtype=np.int64) if num_edges is not None else None
+        )
+        self.max_edges = max_edges
+
+    def _make_batches(
+        self,
+        indices: list[int],
+        generator: torch.Generator | None,
+    ) -> list[list[int]]:
+        if generator is not None:
+            permutation = torch.randperm(len(indices), generator=generator).tolist()
+            indices = [indices[i] for i in permutation]
+
+        batches = pack_batches(
+            indices,
+            num_nodes=self.num_nodes,
+            max_nodes=self.max_nodes,
+            num_edges=self.num_edges,
+            max_edges=self.max_edges,
+        )
+        if self.drop_last and (len(batches) > 1):
+            batches = batches[:-1]
+
+        return batches
+
+
+class BucketBatchSampler(_ShardedBatchSampler):
+    """Batches graphs of similar sizes together to reduce padding.
+
+    The graphs are grouped into buckets of ``bucket_width`` nodes (i.e. graphs with
+    ``0..bucket_width - 1`` nodes, ``bucket_width..2 * bucket_width - 1`` nodes, ...)
+    and each bucket is split into batches of ``batch_size`` graphs. When shuffling,
+    the graphs are shuffled within each bucket and the batches are shuffled across
+    the buckets, otherwise the batches are ordered by bucket (and by the order of the
+    ``sampler`` within a bucket). The batches are sharded for distributed training as
+    described in ``_ShardedBatchSampler``.
+
+    Args:
+        sampler: The sampler of the indices to batch (usually a ``SequentialSampler``).
+        num_nodes: The number of nodes of each graph in the dataset.
+        batch_size: The number of graphs in a batch.
+        bucket_width: The width of the size buckets (in number of nodes).
+        shuffle: Whether to shuffle the batches (on every epoch).
+        drop_last: Whether to drop the last (partially filled) batch of each bucket.
+        seed: The seed of the shuffle.
+        num_replicas: The number of ranks to shard the batches across.
+        rank: The rank of the current process.
+    """
+
+    def __init__(
+        self,
+        sampler: Sampler[int] | Iterable[int],
+        num_nodes: Sequence[int] | np.ndarray | torch.Tensor,
+        batch_size: int,
+        bucket_width: int,
+        shuffle: bool = False,
+        drop_last: bool = False,
+        seed: int = 0,
+        num_replicas: int = 1,
+        rank: int = 0,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError(f"Invalid batch_size {batch_size}.")
+        if bucket_width < 1:
+            raise ValueError(f"Invalid bucket_width {bucket_width}.")
+
+        super().__init__(
+            sampler=sampler,
+            num_nodes=num_nodes,
+            shuffle=shuffle,
+            drop_last=drop_last,
+            seed=seed,
+            num_replicas=num_replicas,
+            rank=rank,
+        )
+        self.batch_size = batch_size
+        self.bucket_width = bucket_width
+
+    def _make_batches(
+        self,
+        indices: list[int],
+        generator: torch.Generator | None,
+    ) -> list[list[int]]:
+        indices_arr = np.asarray(indices, dtype=np.int64)
+        if generator is not None:
+            indices_arr = indices_arr[
+                torch.randperm(len(indices_arr), generator=generator).numpy()
+            ]
+
+        # a stable sort keeps the (shuffled) order within each bucket
+        buckets = self.num_nodes[indices_arr] // self.bucket_width
+        order = np.argsort(buckets, kind="stable")
+        indices_arr, buckets = indices_arr[order], buckets[order]
+        bucket_starts = np.flatnonzero(np.diff(buckets)) + 1
+
+        batches: list[list[int]] = []
+        for bucket in np.split(indices_arr, bucket_starts):
+            for start in range(0, len(bucket), self.batch_size):
+                batch = bucket[start : start + self.batch_size].tolist()
+                if self.drop_last and (len(batch) < self.batch_size):
+                    continue
+                batches.append(batch)
+
+        if generator is not None:
+            permutation = torch.randperm(len(batches), generator=generator).tolist()
+            batches = [batches[i] for i in permutation]
+
+        return batches
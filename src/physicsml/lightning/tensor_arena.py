@@ -0,0 +1,212 @@
+import math
+import os
+import pickle
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import torch
+from torch_geometric.data import Batch
+
+# the offset of every tensor in the arena is aligned to this many bytes
+_ALIGNMENT = 64
+
+
+def _flatten(obj: Any, tensors: list[torch.Tensor]) -> Any:
+    """Replaces the tensors of a (nested) batch by their index in ``tensors``."""
+
+    if isinstance(obj, torch.Tensor):
+        tensors.append(obj)
+        return ("tensor", len(tensors) - 1)
+    elif isinstance(obj, Batch):
+        base_cls = type(obj).__bases__[-1]
+        return (
+            "batch",
+            {
+                "base_cls": base_cls,
+                "store": {k: _flatten(v, tensors) for k, v in obj._store.items()},
+                "store_num_nodes": getattr(obj._store, "_num_nodes", None),
+                "num_graphs": getattr(obj, "_num_graphs", None),
+                "slice_dict": _flatten(getattr(obj, "_slice_dict", None), tensors),
+                "inc_dict": _flatten(getattr(obj, "_inc_dict", None), tensors),
+            },
+        )
+    elif isinstance(obj, dict):
+        return ("dict", {k: _flatten(v, tensors) for k, v in obj.items()})
+    elif isinstance(obj, (list, tuple)):
+        return (type(obj).__name__, [_flatten(v, tensors) for v in obj])
+    else:
+        return ("value", obj)
+
+
+def _unflatten(structure: Any, tensors: list[torch.Tensor]) -> Any:
+    kind, value = structure
+
+    if kind == "tensor":
+        return tensors[value]
+    elif kind == "batch":
+        batch = Batch(_base_cls=value["base_cls"])
+        for k, v in value["store"].items():
+            batch[k] = _unflatten(v, tensors)
+        if value["store_num_nodes"] is not None:
+            batch._store._num_nodes = value["store_num_nodes"]
+        if value["num_graphs"] is not None:
+            batch._num_graphs = value["num_graphs"]
+        slice_dict = _unflatten(value["slice_dict"], tensors)
+        if slice_dict is not None:
+            batch._slice_dict = slice_dict
+        inc_dict = _unflatten(value["inc_dict"], tensors)
+        if inc_dict is not None:
+            batch._inc_dict = inc_dict
+        return batch
+    elif kind == "dict":
+        return {k: _unflatten(v, tensors) for k, v in value.items()}
+    elif kind == "list":
+        return [_unflatten(v, tensors) for v in value]
+    elif kind == "tuple":
+        return tuple(_unflatten(v, tensors) for v in value)
+    else:
+        return value
+
+
+class TensorArenaWriter:
+    """Streams batches into a tensor arena.
+
+    All the tensors of all the batches are written back to back (aligned to
+    ``_ALIGNMENT`` bytes) into a single binary file at ``path``, and the structure of
+    each batch (the ``Batch`` or dict it is made of, plus the dtype, shape and byte
+    offset of each of its tensors) is pickled to ``{path}.index`` when the writer is
+    closed. Batches can be ``Batch``es, tensors or (nested) dicts, lists and tuples of
+    them.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.file = open(self.path, "wb")
+        self.offset = 0
+        self.index: list[tuple[Any, list[tuple[int, torch.dtype, list[int]]]]] = []
+
+    def append(self, batch: Any) -> None:
+        tensors: list[torch.Tensor] = []
+        structure = _flatten(batch, tensors)
+
+        tensors_index = []
+        for tensor in tensors:
+            padding = -self.offset % _ALIGNMENT
+            self.file.write(b"\0" * padding)
+            self.offset += padding
+
+            tensors_index.append((self.offset, tensor.dtype, list(tensor.shape)))
+
+            data = tensor.detach().cpu().contiguous().reshape(-1).view(torch.uint8)
+            self.file.write(data.numpy().tobytes())
+            self.offset += data.numel()
+
+        self.index.append((structure, tensors_index))
+
+    def close(self) -> int:
+        """Closes the arena and returns its number of batches."""
+
+        self.file.close()
+        with open(f"{self.path}.index", "wb") as f:
+            pickle.dump({"num_bytes": self.offset, "batches": self.index}, f)
+
+        return len(self.index)
+
+
+class TensorArena:
+    """Memory-maps a tensor arena written by ``TensorArenaWriter``.
+
+    The tensors of a batch are zero-copy views into the memory map, so the memory of
+    the arena is shared (through the page cache) by all the processes on a node which
+    map the same file. The map is private, so in-place modifications of the tensors
+    are not written back to the file.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        with open(f"{self.path}.index", "rb") as f:
+            index = pickle.load(f)  # noqa: S301
+
+        self.num_bytes: int = index["num_bytes"]
+        self.index: list[tuple[Any, list[tuple[int, torch.dtype, list[int]]]]] = index[
+            "batches"
+        ]
+
+        if self.num_bytes > 0:
+            self.buffer = torch.from_file(
+                str(self.path),
+                shared=False,
+                size=self.num_bytes,
+                dtype=torch.uint8,
+            )
+        else:
+            self.buffer = torch.empty(0, dtype=torch.uint8)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def _batch_range(self, idx: int) -> tuple[int, int]:
+        # the tensors of a batch are contiguous in the arena
+        _, tensors_index = self.index[idx]
+        if len(tensors_index) == 0:
+            return 0, 0
+
+        offset, dtype, shape = tensors_index[-1]
+        return tensors_index[0][0], offset + math.prod(shape) * dtype.itemsize
+
+    def _views(self, buffer: torch.Tensor, idx: int, start: int) -> Any:
+        structure, tensors_index = self.index[idx]
+
+        tensors = []
+        for offset, dtype, shape in tensors_index:
+            offset = offset - start
+            num_bytes = math.prod(shape) * dtype.itemsize
+            tensors.append(buffer[offset : offset + num_bytes].view(dtype).view(shape))
+
+        return _unflatten(structure, tensors)
+
+    def __getitem__(self, idx: int) -> Any:
+        return self._views(self.buffer, idx, start=0)
+
+    def load(self, idx: int) -> Any:
+        """Reads a batch into memory (with a single copy of its contiguous bytes).
+
+        Unlike ``__getitem__``, which returns views into the memory map which are only
+        read from disk when accessed, this does all the I/O upfront (for example in
+        a prefetch thread).
+        """
+
+        start, end = self._batch_range(idx)
+        return self._views(self.buffer[start:end].clone(), idx, start=start)
+
+
+class ShardedTensorArena:
+    """Concatenates the batches of several ``TensorArena`` shards."""
+
+    def __init__(self, shards: list[TensorArena]) -> None:
+        self.shards = shards
+        self.ptr = np.cumsum([0] + [len(shard) for shard in self.shards])
+        self.length = int(self.ptr[-1])
+
+    def __len__(self) -> int:
+        return self.length
+
+    def _locate(self, idx: int) -> tuple[TensorArena, int]:
+        if not (0 <= idx < self.length):
+            raise IndexError(f"Index {idx} out of range for {self.length} batches.")
+        shard_idx = int(np.searchsorted(self.ptr, idx, side="right")) - 1
+        return self.shards[shard_idx], idx - int(self.ptr[shard_idx])
+
+    def __getitem__(self, idx: int) -> Any:
+        shard, shard_idx = self._locate(idx)
+        return shard[shard_idx]
+
+    def load(self, idx: int) -> Any:
+        shard, shard_idx = self._locate(idx)
+        return shard.load(shard_idx)
+
+
+def remove_arena(path: str | Path) -> None:
+    os.remove(path)
+    os.remove(f"{path}.index")
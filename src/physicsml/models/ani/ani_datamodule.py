@@ -1,18 +1,25 @@
+import logging
+import os
 from typing import Any
 
 import datasets
+import numpy as np
 from molflux.modelzoo.models.lightning.datamodule import LightningDataModule
-from torch.utils.data import DataLoader, Dataset
+from torch.utils.data import DataLoader, Dataset, SequentialSampler
 
+from physicsml.lightning.pre_batch_cache import pre_batch_cache_kwargs
 from physicsml.lightning.pre_batching_in_memory import (
     construct_in_memory_pre_batched_dataloader,
 )
 from physicsml.lightning.pre_batching_on_disk import (
     construct_on_disk_pre_batched_dataloader,
 )
+from physicsml.lightning.samplers import BucketBatchSampler, padding_efficiency
 from physicsml.models.ani.ani_dataset import ANIDataset, ani_collate_fn
 from physicsml.models.ani.supervised.default_configs import ANIModelConfig
 
+logger = logging.getLogger(__name__)
+
 
 class ANIDataModule(LightningDataModule):
     model_config: ANIModelConfig
@@ -56,6 +63,56 @@ class ANIDataModule(LightningDataModule):
             y_graph_scalars=self.model_config.datamodule.y_graph_scalars,
         )
 
+    def _batching_kwargs(
+        self,
+        dataset: ANIDataset,
+        batch_size: int,
+        shuffle: bool,
+        drop_last: bool,
+        bucket: bool = True,
+    ) -> dict[str, Any]:
+        """The batching kwargs of a ``DataLoader``.
+
+        Uses a ``BucketBatchSampler`` (which batches molecules of similar sizes to
+        reduce padding) if a ``bucket_width`` is configured and a fixed ``batch_size``
+        otherwise.
+        """
+
+        bucket_width = self.model_config.datamodule.bucket_width
+        if (bucket_width is None) or (not bucket):
+            return {
+                "batch_size": batch_size,
+                "shuffle": shuffle,
+                "drop_last": drop_last,
+            }
+
+        num_atoms = dataset.num_atoms_per_molecule()
+        batch_sampler = BucketBatchSampler(
+            SequentialSampler(dataset),
+            num_nodes=num_atoms,
+            batch_size=batch_size,
+            bucket_width=bucket_width,
+            shuffle=shuffle,
+            drop_last=drop_last,
+            seed=int(os.getenv("PL_GLOBAL_SEED", 0)),
+        )
+
+        # report the fraction of the atom slots which are not padding
+        unbucketed_batches = [
+            batch.tolist()
+            for batch in np.array_split(
+                np.random.default_rng(0).permutation(len(num_atoms)),
+                max(len(num_atoms) // batch_size, 1),
+            )
+        ]
+        logger.info(
+            f"Padding efficiency of the batches: {batch_sampler.padding_efficiency():.3f} "
+            f"(bucket_width={bucket_width}, "
+            f"{padding_efficiency(unbucketed_batches, num_atoms):.3f} without bucketing)",
+        )
+
+        return {"batch_sampler": batch_sampler}
+
     def _get_one_train_dataloader(
         self,
         dataset: datasets.Dataset,
@@ -64,77 +121,147 @@ class ANIDataModule(LightningDataModule):
         if self.model_config.datamodule.pre_batch == "in_memory":
             dataloader = DataLoader(
                 dataset,
-                batch_size=batch_size,
-                shuffle=True,
                 num_workers=int(self.model_config.datamodule.num_workers or 0),
                 collate_fn=ani_collate_fn,
+                **self._batching_kwargs(
+                    dataset,
+                    batch_size,
+                    shuffle=True,
+                    drop_last=False,
+                ),
             )
             return construct_in_memory_pre_batched_dataloader(
                 dataloader,
                 shuffle=True,
+                **pre_batch_cache_kwargs(
+                    self.model_config,
+                    dataset.dataset,
+                    batch_size=batch_size,
+                    shuffle=True,
+                    with_y_features=dataset.with_y_features,
+                ),
             )
         elif self.model_config.datamodule.pre_batch == "on_disk":
             dataloader = DataLoader(
                 dataset,
-                batch_size=batch_size,
-                shuffle=True,
                 num_workers=int(self.model_config.datamodule.num_workers or 0),
                 collate_fn=ani_collate_fn,
+                **self._batching_kwargs(
+                    dataset,
+                    batch_size,
+                    shuffle=True,
+                    drop_last=False,
+                ),
             )
             return construct_on_disk_pre_batched_dataloader(
                 dataloader,
                 shuffle=True,
                 name="train",
+                **pre_batch_cache_kwargs(
+                    self.model_config,
+                    dataset.dataset,
+                    batch_size=batch_size,
+                    shuffle=True,
+                    with_y_features=dataset.with_y_features,
+                ),
             )
         else:
             return DataLoader(
                 dataset,
-                batch_size=batch_size,
-                shuffle=True,
                 pin_memory=True,
                 num_workers=int(self.model_config.datamodule.num_workers or 0),
                 persistent_workers=bool(self.model_config.datamodule.num_workers),
-                drop_last=True,
                 collate_fn=ani_collate_fn,
+                **self._batching_kwargs(
+                    dataset,
+                    batch_size,
+                    shuffle=True,
+                    drop_last=True,
+                ),
             )
 
     def _get_one_eval_dataloader(
         self,
         dataset: datasets.Dataset,
         batch_size: int,
+        bucket: bool = True,
     ) -> DataLoader:
         if self.model_config.datamodule.pre_batch == "in_memory":
             dataloader = DataLoader(
                 dataset,
-                batch_size=batch_size,
-                shuffle=False,
                 num_workers=int(self.model_config.datamodule.num_workers or 0),
                 collate_fn=ani_collate_fn,
+                **self._batching_kwargs(
+                    dataset,
+                    batch_size,
+                    shuffle=False,
+                    drop_last=False,
+                    bucket=bucket,
+                ),
             )
             return construct_in_memory_pre_batched_dataloader(
                 dataloader,
                 shuffle=False,
+                **pre_batch_cache_kwargs(
+                    self.model_config,
+                    dataset.dataset,
+                    batch_size=batch_size,
+                    shuffle=False,
+                    with_y_features=dataset.with_y_features,
+                    bucket=bucket,
+                ),
             )
         elif self.model_config.datamodule.pre_batch == "on_disk":
             dataloader = DataLoader(
                 dataset,
-                batch_size=batch_size,
-                shuffle=False,
                 num_workers=int(self.model_config.datamodule.num_workers or 0),
                 collate_fn=ani_collate_fn,
+                **self._batching_kwargs(
+                    dataset,
+                    batch_size,
+                    shuffle=False,
+                    drop_last=False,
+                    bucket=bucket,
+                ),
             )
             return construct_on_disk_pre_batched_dataloader(
                 dataloader,
                 shuffle=False,
                 name="validation",
+                **pre_batch_cache_kwargs(
+                    self.model_config,
+                    dataset.dataset,
+                    batch_size=batch_size,
+                    shuffle=False,
+                    with_y_features=dataset.with_y_features,
+                    bucket=bucket,
+                ),
             )
         else:
             return DataLoader(
                 dataset,
-                batch_size=batch_size,
-                shuffle=False,
                 pin_memory=True,
                 num_workers=int(self.model_config.datamodule.num_workers or 0),
                 persistent_workers=bool(self.model_config.datamodule.num_workers),
                 collate_fn=ani_collate_fn,
+                **self._batching_kwargs(
+                    dataset,
+                    batch_size,
+                    shuffle=False,
+                    drop_last=False,
+                    bucket=bucket,
+                ),
             )
+
+    def predict_dataloader(self) -> DataLoader:
+        # predictions are returned in the order of the dataset, so they are not bucketed
+        dataset = self.datasets["predict"]
+
+        if dataset is None:
+            raise ValueError("Specify a prediction dataset.")
+
+        return self._get_one_eval_dataloader(
+            dataset,
+            self._get_batch_size("predict", None),
+            bucket=False,
+        )
@@ -1,9 +1,14 @@
 from typing import Any
 
 import datasets
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 import torch
 from torch.utils.data import Dataset
 
+from physicsml.lightning.columnar import read_column_as_tensor
+
 
 def validate_features(
     sub_feature: list[str] | str | None,
@@ -66,46 +71,66 @@ class ANIDataset(Dataset):
             dataset.set_format(columns=self.x_features)
 
         self.dataset = dataset
+        # arrow formatted view of the dataset for zero-copy reads (created lazily)
+        self._arrow_dataset: datasets.Dataset | None = None
 
     def __len__(self) -> int:
         return len(self.dataset)
 
+    def num_atoms_per_molecule(self) -> np.ndarray:
+        """The number of atoms of each molecule (read from the coordinates column)."""
+        table = self.dataset.with_format("arrow", columns=[self.coordinates_col])[:]
+        num_atoms: np.ndarray = pc.list_value_length(
+            table.column(self.coordinates_col),
+        ).to_numpy()
+        num_atoms = num_atoms.astype(np.int64)
+        return num_atoms
+
     def make_y_feature(
         self,
         features: list[str] | str | None,
-        datapoint: dict,
+        datapoint: pa.Table,
         graph_level: bool,
     ) -> torch.Tensor | None:
         if features is not None:
             if isinstance(features, list):
-                y: torch.Tensor = torch.tensor(
-                    [datapoint[col] for col in features],
+                # scalar columns are read as [1] and list columns as [n_elements]
+                y: torch.Tensor = torch.stack(
+                    [
+                        read_column_as_tensor(datapoint.column(col))[0]
+                        for col in features
+                    ],
+                    dim=-1 if graph_level else 0,
                 )
             elif isinstance(features, str):
-                y = torch.tensor(datapoint[features])
+                y, lengths = read_column_as_tensor(datapoint.column(features))
+                if graph_level and (lengths is not None):
+                    y = y.unsqueeze(0)
             else:
                 raise RuntimeError(f"Unknown feature type {type(features)}.")
 
-            if graph_level:
-                y = y.unsqueeze(0)
-
             return y
         else:
             return None
 
     def __getitem__(self, idx: int) -> Any:
-        datapoint = self.dataset[idx]
-
-        atom_numbers = datapoint[self.atomic_numbers_col]
-        coordinates = datapoint[self.coordinates_col]
-        total_atomic_energy = datapoint.get(self.total_atomic_energy_col, None)
-
-        if atom_numbers is not None:
-            atom_numbers = torch.tensor(atom_numbers).type(torch.int64)
-        if coordinates is not None:
-            coordinates = torch.tensor(coordinates)
-        if total_atomic_energy is not None:
-            total_atomic_energy = torch.tensor(total_atomic_energy)
+        if self._arrow_dataset is None:
+            self._arrow_dataset = self.dataset.with_format(
+                "arrow",
+                columns=self.dataset.format["columns"],
+            )
+        datapoint = self._arrow_dataset[idx]
+
+        atom_numbers, _ = read_column_as_tensor(
+            datapoint.column(self.atomic_numbers_col),
+        )
+        coordinates, _ = read_column_as_tensor(datapoint.column(self.coordinates_col))
+        if self.total_atomic_energy_col in datapoint.column_names:
+            total_atomic_energy: torch.Tensor | None = read_column_as_tensor(
+                datapoint.column(self.total_atomic_energy_col),
+            )[0][0]
+        else:
+            total_atomic_energy = None
 
         if self.with_y_features:
             y_graph_scalars = self.make_y_feature(
@@ -132,6 +157,12 @@ class ANIDataset(Dataset):
             "y_node_vector": y_node_vector,
         }
 
+    def __getstate__(self) -> dict[str, Any]:
+        # the arrow view is re-created lazily in each data loader worker
+        state = self.__dict__.copy()
+        state["_arrow_dataset"] = None
+        return state
+
 
 def ani_collate_fn(batch_list: list) -> dict[str, torch.Tensor]:
     batch_dict: dict[str, Any] = {
@@ -28,7 +28,10 @@ class ANIDataModuleConfig(DataModuleConfig):
     total_atomic_energy_col: str = "physicsml_total_atomic_energy"
     pbc: tuple[bool, bool, bool] | None = None
     cell: list[list[float]] | None = None
+    bucket_width: int | None = None
     pre_batch: Literal["in_memory", "on_disk"] | None = None
+    pre_batch_cache_dir: str | None = None
+    pre_batch_cache_max_gb: float | None = None
     pre_batch_in_memory: bool = False  # TODO: Deprecate
     train_batch_size: int | None = None  # TODO: Deprecate
     validation_batch_size: int | None = None  # TODO: Deprecate
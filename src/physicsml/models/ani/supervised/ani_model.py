@@ -34,6 +34,11 @@ class ANIModel(PhysicsMLModelBase[ANIModelConfig]):
 
         return OpenMMANI(**kwargs)
 
+    def to_openmm_replicas(self, **kwargs: Any) -> Any:
+        from physicsml.plugins.openmm.openmm_replicas import OpenMMANIReplicas
+
+        return OpenMMANIReplicas(**kwargs)
+
     def to_ase(self, **kwargs: Any) -> Any:
         try:
             from physicsml.plugins.ase.ase_ani import ANIASECalculator
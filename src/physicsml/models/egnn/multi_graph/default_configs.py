@@ -11,6 +11,9 @@ class MultiGraphEGNNModelConfig(PhysicsMLModelConfig):
     graph_names: list = field(
         default_factory=lambda: ["protein", "ligand", "ligand_pocket"],
     )
+    cached_graph_names: list | None = None
+    cache_encoded_graphs: bool = False
+    max_cached_encoded_graphs: int = 4096
     num_node_feats: int = 0
     num_edge_feats: int = 0
     num_rbf: int = 0
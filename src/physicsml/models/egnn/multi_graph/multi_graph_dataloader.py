@@ -1,6 +1,7 @@
 from typing import Any
 
 import torch
+from torch_geometric.data import Batch
 from torch_geometric.loader.dataloader import Collater
 
 from physicsml.models.egnn.multi_graph.multi_graph_dataset import (
@@ -9,6 +10,12 @@ from physicsml.models.egnn.multi_graph.multi_graph_dataset import (
 
 
 class MultiGraphCollate:
+    """Collates a list of dicts of ``GraphDatum``.
+
+    Batches which were already collated by ``MultiGraphDataset.__getitems__`` are
+    passed through as they are.
+    """
+
     def __init__(self, dataset: MultiGraphDataset) -> None:
         self.collator_dict = {}
 
@@ -16,6 +23,9 @@ class MultiGraphCollate:
             self.collator_dict[k] = Collater(v, None, None)
 
     def __call__(self, batch: list[Any]) -> dict[str, Any]:
+        if (len(batch) == 1) and all(isinstance(v, Batch) for v in batch[0].values()):
+            return dict(batch[0])
+
         output = {}
         batch_dict = {k: [dic[k] for dic in batch] for k in batch[0]}
 
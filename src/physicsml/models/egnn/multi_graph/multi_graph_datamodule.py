@@ -86,6 +86,9 @@ class MultiGraphDataModule(LightningDataModule):
             pbc=self.model_config.datamodule.pbc,
             cell=self.model_config.datamodule.cell,
             cut_off=self.model_config.datamodule.cut_off,
+            neighbour_list_cache_dir=self.model_config.datamodule.neighbour_list_cache_dir,
+            neighbour_list_backend=self.model_config.datamodule.neighbour_list_backend,
+            cached_graph_names=self.model_config.cached_graph_names,
         )
 
     def _get_one_train_dataloader(
@@ -1,13 +1,64 @@
+import copy
+import hashlib
+import os
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
 import datasets
-from torch_geometric.data import Dataset
+import numpy as np
+import pyarrow as pa
+import torch
+from torch_geometric.data import Batch, Dataset
 
 from physicsml.lightning.graph_datasets.graph_dataset import (
     GraphDataset,
     GraphDatum,
 )
 
+_T = TypeVar("_T")
+
+
+def graph_content_hash(datapoint: dict, graph_dataset: GraphDataset) -> int:
+    """A (63 bit) hash of the columns of a datapoint from which a graph is built."""
+
+    digest = hashlib.blake2b(digest_size=8)
+    for col in [
+        graph_dataset.atomic_numbers_col,
+        graph_dataset.node_attrs_col,
+        graph_dataset.edge_attrs_col,
+        graph_dataset.node_idxs_col,
+        graph_dataset.edge_idxs_col,
+        graph_dataset.coordinates_col,
+    ]:
+        value = datapoint.get(col, None)
+        if value is None:
+            continue
+        array = np.asarray(value)
+        digest.update(col.encode("utf-8"))
+        digest.update(str((array.dtype, array.shape)).encode("utf-8"))
+        digest.update(array.tobytes())
+
+    return int.from_bytes(digest.digest(), "little") >> 1
+
 
 class MultiGraphDataset(Dataset):
+    """A dataset of several graphs (such as a ligand and a pocket) per datapoint.
+
+    Every graph is built by its own ``GraphDataset``, but the row of a datapoint (or
+    the arrow slice of a batch, see ``get_batch``) is read once for all of them, and
+    the graphs (and their neighbour searches) are built concurrently in a pool of
+    ``num_threads`` threads (one per graph by default).
+
+    The graphs of ``cached_graph_names`` (such as a pocket which is shared by many
+    ligands) are cached by the hash of their columns (see ``graph_content_hash``), so
+    that every distinct structure (with its neighbour list and features) is only built
+    once. The cached graphs are shared between the datapoints (only their targets are
+    the ones of each datapoint) and carry their hash in ``graph_hash``. Up to
+    ``max_cached_graphs`` graphs of each name are cached (least recently used first out).
+    """
+
     def __init__(
         self,
         dataset: datasets.Dataset,
@@ -28,10 +79,20 @@ class MultiGraphDataset(Dataset):
         pbc: tuple[bool, bool, bool] | None,
         cell: list | None,
         cut_off: float,
+        neighbour_list_cache_dir: str | None = None,
+        neighbour_list_backend: str = "auto",
+        num_threads: int | None = None,
+        cached_graph_names: list[str] | None = None,
+        max_cached_graphs: int = 4096,
     ) -> None:
         super().__init__()
-        self.dataset = dataset
-        self.graph_datasets = {}
+
+        unknown_graph_names = set(cached_graph_names or []) - set(graph_names)
+        if len(unknown_graph_names) > 0:
+            raise ValueError(
+                f"Unknown cached_graph_names {sorted(unknown_graph_names)}.",
+            )
+        self.graph_datasets: dict[str, GraphDataset] = {}
 
         for graph_name in graph_names:
             self.graph_datasets[graph_name] = GraphDataset(
@@ -58,17 +119,138 @@ class MultiGraphDataset(Dataset):
                 pbc=pbc,
                 cell=cell,
                 cut_off=cut_off,
+                neighbour_list_cache_dir=neighbour_list_cache_dir,
+                neighbour_list_backend=neighbour_list_backend,
             )
 
+        # a single view of the columns of all the graphs
+        columns = list(
+            dict.fromkeys(
+                column
+                for graph_dataset in self.graph_datasets.values()
+                for column in graph_dataset.dataset.format["columns"]
+            ),
+        )
+        self.dataset = dataset.with_format(columns=columns)
+        # arrow formatted view of the dataset for batched reads (created lazily)
+        self._arrow_dataset: datasets.Dataset | None = None
+
+        self.num_threads = num_threads or len(graph_names)
+        self._executor: ThreadPoolExecutor | None = None
+        self._executor_pid: int | None = None
+
+        # one cache per graph, so that the threads never share one
+        self.max_cached_graphs = max_cached_graphs
+        self._graph_caches: dict[str, OrderedDict[int, GraphDatum]] = {
+            graph_name: OrderedDict() for graph_name in (cached_graph_names or [])
+        }
+
     def len(self) -> int:
         return len(self.dataset)
 
+    def _map_graphs(self, fn: Callable[[str, GraphDataset], _T]) -> dict[str, _T]:
+        """Applies ``fn`` to the name and ``GraphDataset`` of every graph in the thread
+        pool."""
+
+        if (self.num_threads <= 1) or (len(self.graph_datasets) <= 1):
+            return {k: fn(k, v) for k, v in self.graph_datasets.items()}
+
+        # the threads of a pool do not survive the fork of the data loader workers
+        if (self._executor is None) or (self._executor_pid != os.getpid()):
+            self._executor = ThreadPoolExecutor(max_workers=self.num_threads)
+            self._executor_pid = os.getpid()
+
+        futures = {
+            k: self._executor.submit(fn, k, v) for k, v in self.graph_datasets.items()
+        }
+        return {k: future.result() for k, future in futures.items()}
+
+    def __getitems__(self, indices: list[int]) -> list[dict[str, Batch]]:
+        # returns a single pre-collated batch, see ``MultiGraphCollate``
+        return [self.get_batch(indices)]
+
+    def get_batch(self, indices: list[int]) -> dict[str, Batch]:
+        """Reads and collates a batch of datapoints.
+
+        The rows of all the graphs are read with a single slice of the arrow table,
+        from which the ``Batch`` of every graph is built (see
+        ``GraphDataset.batch_from_table``).
+        """
+
+        indices = [int(self.indices()[idx]) for idx in indices]
+        if self._arrow_dataset is None:
+            self._arrow_dataset = self.dataset.with_format(
+                "arrow",
+                columns=self.dataset.format["columns"],
+            )
+        table = self._arrow_dataset[indices]
+        rows = table.to_pylist() if len(self._graph_caches) > 0 else None
+
+        return self._map_graphs(
+            lambda k, v: self._batch(k, v, table, rows, indices),
+        )
+
+    def _batch(
+        self,
+        graph_name: str,
+        graph_dataset: GraphDataset,
+        table: pa.Table,
+        rows: list[dict] | None,
+        indices: list[int],
+    ) -> Batch:
+        if graph_name not in self._graph_caches:
+            return graph_dataset.batch_from_table(table, indices)
+
+        assert rows is not None
+        return Batch.from_data_list(
+            [
+                self._datum(graph_name, graph_dataset, row, idx)
+                for row, idx in zip(rows, indices, strict=True)
+            ],
+        )
+
     def get(self, idx: int) -> dict[str, GraphDatum]:
-        output = {}
-        for k, v in self.graph_datasets.items():
-            output[k] = v[idx]
+        datapoint = self.dataset[idx]
+
+        return self._map_graphs(lambda k, v: self._datum(k, v, datapoint, idx))
+
+    def _datum(
+        self,
+        graph_name: str,
+        graph_dataset: GraphDataset,
+        datapoint: dict,
+        idx: int,
+    ) -> GraphDatum:
+        if graph_name not in self._graph_caches:
+            return graph_dataset.datum_from_row(datapoint, idx)
+
+        cache = self._graph_caches[graph_name]
+        graph_hash = graph_content_hash(datapoint, graph_dataset)
+        cached_datum = cache.get(graph_hash, None)
+        if cached_datum is None:
+            cached_datum = graph_dataset.datum_from_row(datapoint, idx)
+            cached_datum.graph_hash = torch.tensor([graph_hash])
+            cache[graph_hash] = cached_datum
+            if len(cache) > self.max_cached_graphs:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(graph_hash)
+
+        # a shallow copy (which shares the tensors) with the targets of the datapoint
+        datum = copy.copy(cached_datum)
+        for key, value in graph_dataset.y_features_from_row(datapoint).items():
+            if value is not None:
+                datum[key] = value
+
+        return datum
 
-        return output
+    def __getstate__(self) -> dict[str, Any]:
+        # the arrow view and the thread pool are re-created lazily in each worker
+        state = self.__dict__.copy()
+        state["_arrow_dataset"] = None
+        state["_executor"] = None
+        state["_executor_pid"] = None
+        return state
 
     def __repr__(self) -> str:
         return f"MultiGraphDataset({[(k, len(v)) for k, v in self.graph_datasets.items()]})"
@@ -1,3 +1,4 @@
+from collections import OrderedDict
 from typing import Any
 
 import torch
@@ -17,6 +18,10 @@ from physicsml.models.egnn.multi_graph.utils import (
     LigandPocketPoolingHead,
 )
 
+# the node and edge level outputs of the ``EGNN`` which are cached per graph
+ENCODED_NODE_KEYS = ("node_feats", "coordinates")
+ENCODED_EDGE_KEYS = ("edge_feats", "attention")
+
 
 class PooledMultiGraphEGNNModule(PhysicsMLModuleBase):
     """
@@ -74,6 +79,12 @@ class PooledMultiGraphEGNNModule(PhysicsMLModuleBase):
             output_activation=model_config.output_activation,
         )
 
+        # the encoded graphs by ``graph_hash`` (only while predicting, see
+        # ``cache_encoded_graphs``), least recently used first
+        self._encoded_graph_cache: OrderedDict[int, dict[str, torch.Tensor]] | None = (
+            None
+        )
+
     def forward(
         self,
         data: dict[str, dict[str, torch.Tensor]],
@@ -87,7 +98,10 @@ class PooledMultiGraphEGNNModule(PhysicsMLModuleBase):
                 )
 
         for k, v in data.items():
-            data[k] = self.egnn(v)
+            if (self._encoded_graph_cache is not None) and ("graph_hash" in v):
+                data[k] = self._cached_egnn(v)
+            else:
+                data[k] = self.egnn(v)
 
         output = {}
         pooled_output: torch.Tensor = (
@@ -97,6 +111,64 @@ class PooledMultiGraphEGNNModule(PhysicsMLModuleBase):
 
         return output
 
+    def _cached_egnn(self, data: dict[str, torch.Tensor]) -> dict[str, torch.Tensor]:
+        """Encodes a batch of graphs, reusing the encodings of the graphs (by
+        ``graph_hash``) which were already encoded.
+
+        Up to ``max_cached_encoded_graphs`` encodings are kept (on the device), the
+        least recently used are evicted first.
+        """
+
+        assert self._encoded_graph_cache is not None
+        cache = self._encoded_graph_cache
+        graph_hashes = data["graph_hash"].tolist()
+
+        if all(graph_hash in cache for graph_hash in graph_hashes):
+            for graph_hash in graph_hashes:
+                cache.move_to_end(graph_hash)
+            for key in cache[graph_hashes[0]]:
+                data[key] = torch.cat(
+                    [cache[graph_hash][key] for graph_hash in graph_hashes],
+                )
+            return data
+
+        data = self.egnn(data)
+
+        num_nodes = data["ptr"].diff().tolist()
+        num_edges = torch.bincount(
+            data["batch"][data["edge_index"][0]],
+            minlength=int(data["num_graphs"]),
+        ).tolist()
+        splits = {}
+        for keys, sizes in [
+            (ENCODED_NODE_KEYS, num_nodes),
+            (ENCODED_EDGE_KEYS, num_edges),
+        ]:
+            for key in keys:
+                if data.get(key, None) is not None:
+                    splits[key] = torch.split(data[key], sizes)
+        for idx, graph_hash in enumerate(graph_hashes):
+            cache[graph_hash] = {
+                key: split[idx].clone() for key, split in splits.items()
+            }
+            cache.move_to_end(graph_hash)
+            if len(cache) > self.model_config.max_cached_encoded_graphs:
+                cache.popitem(last=False)
+
+        return data
+
+    def on_predict_start(self) -> None:
+        super().on_predict_start()
+
+        # the weights are fixed while predicting, so the encodings of the graphs which
+        # are shared between datapoints (such as a pocket) can be reused
+        if self.model_config.cache_encoded_graphs and (self.jitter is None):
+            self._encoded_graph_cache = OrderedDict()
+
+    def on_predict_end(self) -> None:
+        super().on_predict_end()
+        self._encoded_graph_cache = None
+
     def compute_loss(self, input: Any, target: Any) -> dict[str, torch.Tensor]:
         loss_dict: dict[str, torch.Tensor] = {}
         total_loss: torch.Tensor = torch.zeros(1, device=self.device)
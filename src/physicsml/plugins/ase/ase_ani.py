@@ -2,9 +2,11 @@ import logging
 from typing import Any
 
 import torch
+from datasets import Dataset
 
 import ase
 from ase.calculators.calculator import all_changes
+from physicsml.models.ani.ani_dataset import ani_collate_fn
 from physicsml.plugins.ase.calculator import PhysicsMLASECalculatorBase
 
 logger = logging.getLogger(__name__)
@@ -14,6 +16,11 @@ class ANIASECalculator(PhysicsMLASECalculatorBase):
     def __init__(self, **kwargs: Any) -> None:
         super().__init__(**kwargs)
 
+        # the featurised system (as a template batch on the device), reused while the
+        # atoms do not change
+        self._atom_list: list[int] | None = None
+        self._batch_dict: dict[str, torch.Tensor] | None = None
+
     def calculate(
         self,
         atoms: ase.Atoms | None = None,
@@ -25,22 +32,7 @@ class ANIASECalculator(PhysicsMLASECalculatorBase):
         # create system
         atom_list = self.atoms.get_atomic_numbers().tolist()
         positions = self.atoms.get_positions().tolist()
-        dataset_feated = self.system_to_feated_dataset(
-            atom_list=atom_list,
-            positions=positions,
-        )
-
-        batch = next(
-            iter(
-                self._instantiate_datamodule(
-                    predict_data=dataset_feated,
-                ).predict_dataloader(),
-            ),
-        )
-
-        batch_dict = {}
-        for k, v in batch.items():
-            batch_dict[k] = v.to(self.module.device)
+        batch_dict = self._make_batch_dict(atom_list, positions)
 
         # Calculate energy and forces
         batch_dict["coordinates"].requires_grad = True
@@ -64,3 +56,93 @@ class ANIASECalculator(PhysicsMLASECalculatorBase):
 
         # Return the energy and forces
         return self.results["energy"], self.results["forces"]
+
+    def calculate_batch(self, dataset_feated: Dataset) -> list[dict[str, Any]]:
+        dataset = self._instantiate_datamodule(
+            predict_data=dataset_feated,
+        ).prepare_dataset(dataset_feated, split="predict")
+        batch = ani_collate_fn([dataset[idx] for idx in range(len(dataset))])
+
+        batch_dict = {}
+        for k, v in batch.items():
+            batch_dict[k] = v.to(self.module.device)
+
+        # Calculate energies and forces of all the (padded) molecules at once
+        batch_dict["coordinates"].requires_grad = True
+
+        output = self.module(batch_dict)
+        energies = output["y_graph_scalars"] * self.output_scaling
+        grad_outputs: list[torch.Tensor | None] | None = [torch.ones_like(energies)]
+        gradient = torch.autograd.grad(
+            outputs=[energies],  # [n_mols, 1]
+            inputs=[batch_dict["coordinates"]],  # [n_mols, max_n_nodes, 3]
+            grad_outputs=grad_outputs,  # type: ignore
+            allow_unused=True,
+        )[0]  # [n_mols, max_n_nodes, 3]
+
+        if gradient is None:
+            raise RuntimeWarning("Gradient is None")
+        forces = (-1 * gradient).detach().cpu().numpy()
+
+        num_mols = batch_dict["species"].shape[0]
+        energies_list = energies.detach().cpu().reshape(num_mols).tolist()
+        num_atoms = (batch_dict["species"] >= 0).sum(dim=1).tolist()
+
+        results: list[dict[str, Any]] = [
+            {"energy": energy, "forces": forces[idx, :n_atoms]}
+            for idx, (energy, n_atoms) in enumerate(
+                zip(energies_list, num_atoms, strict=True),
+            )
+        ]
+
+        # the uncertainty of the energies (of models with uncertainty)
+        if "y_graph_scalars::std" in output:
+            energy_stds = output["y_graph_scalars::std"] * self.output_scaling
+            for result, energy_std in zip(
+                results,
+                energy_stds.detach().cpu().reshape(num_mols).tolist(),
+                strict=True,
+            ):
+                result["energy_std"] = energy_std
+
+        return results
+
+    def _make_batch_dict(
+        self,
+        atom_list: list[int],
+        positions: list[list[float]],
+    ) -> dict[str, torch.Tensor]:
+        """Makes the batch of the system from the template batch.
+
+        The system is only featurised when the atoms change, after which only the
+        coordinates of the batch are updated.
+        """
+
+        if (self._batch_dict is None) or (atom_list != self._atom_list):
+            dataset_feated = self.system_to_feated_dataset(
+                atom_list=atom_list,
+                positions=positions,
+            )
+
+            batch = next(
+                iter(
+                    self._instantiate_datamodule(
+                        predict_data=dataset_feated,
+                    ).predict_dataloader(),
+                ),
+            )
+
+            self._atom_list = atom_list
+            self._batch_dict = {}
+            for k, v in batch.items():
+                self._batch_dict[k] = v.to(self.module.device)
+
+        batch_dict = dict(self._batch_dict)
+        coordinates = torch.tensor(positions) * self.position_scaling
+        batch_dict["coordinates"] = (
+            coordinates.unsqueeze(0)
+            .to(self.module.device)
+            .type(self._batch_dict["coordinates"].dtype)
+        )
+
+        return batch_dict
@@ -1,12 +1,21 @@
 import logging
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import torch
+from datasets import Dataset
 
 import ase
 from ase.calculators.calculator import all_changes
+from physicsml.lightning.graph_datasets.neighbourhood_list_torch import (
+    BUILTIN_NEIGHBOUR_LIST_BACKENDS,
+    VerletNeighbourList,
+    merge_initial_edges,
+)
 from physicsml.plugins.ase.calculator import PhysicsMLASECalculatorBase
 
+if TYPE_CHECKING:
+    from physicsml.lightning.graph_datasets.graph_dataset import GraphDataset
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,6 +23,33 @@ class GraphASECalculator(PhysicsMLASECalculatorBase):
     def __init__(self, **kwargs: Any) -> None:
         super().__init__(**kwargs)
 
+        if self.neighbour_list_skin is not None:
+            neighbour_list_backend = self.model_config.datamodule.neighbour_list_backend
+            if neighbour_list_backend not in BUILTIN_NEIGHBOUR_LIST_BACKENDS:
+                logger.warning(
+                    f"Neighbour list backend '{neighbour_list_backend}' is not supported with a neighbour list skin. Using 'auto'.",
+                )
+                neighbour_list_backend = "auto"
+
+            self.neighbour_list: VerletNeighbourList | None = VerletNeighbourList(
+                cutoff=self.model_config.datamodule.cut_off,
+                skin=self.neighbour_list_skin,
+                self_interaction=self.model_config.datamodule.self_interaction,
+                backend=neighbour_list_backend,
+            ).to(self.module.device)
+        else:
+            self.neighbour_list = None
+
+        # the featurised system (as a template batch on the device), reused while the
+        # atoms do not change
+        self._atom_list: list[int] | None = None
+        self._batch_dict: dict[str, torch.Tensor] | None = None
+        self._initial_edges: tuple[torch.Tensor | None, torch.Tensor | None] = (
+            None,
+            None,
+        )
+        self._graph_dataset: GraphDataset | None = None
+
     def calculate(
         self,
         atoms: ase.Atoms | None = None,
@@ -25,20 +61,7 @@ class GraphASECalculator(PhysicsMLASECalculatorBase):
         # create system
         atom_list = self.atoms.get_atomic_numbers().tolist()
         positions = self.atoms.get_positions().tolist()
-        dataset_feated = self.system_to_feated_dataset(
-            atom_list=atom_list,
-            positions=positions,
-        )
-
-        batch = next(
-            iter(
-                self._instantiate_datamodule(
-                    predict_data=dataset_feated,
-                ).predict_dataloader(),
-            ),
-        )
-
-        batch_dict = self.module.graph_batch_to_batch_dict(batch.to(self.module.device))
+        batch_dict = self._make_batch_dict(atom_list, positions)
 
         # add total molecular charge as graph attribute
         if self.total_charge is not None:
@@ -62,3 +85,134 @@ class GraphASECalculator(PhysicsMLASECalculatorBase):
 
         # Return the energy and forces
         return self.results["energy"], self.results["forces"]
+
+    def calculate_batch(self, dataset_feated: Dataset) -> list[dict[str, Any]]:
+        graph_dataset = self._instantiate_datamodule(
+            predict_data=dataset_feated,
+        ).prepare_dataset(dataset_feated, split="predict")
+        batch_dict = self.module.graph_batch_to_batch_dict(
+            graph_dataset.get_batch(list(range(len(dataset_feated)))).to(
+                self.module.device,
+            ),
+        )
+        num_graphs = int(batch_dict["num_graphs"])
+
+        # add total molecular charge as graph attribute
+        if self.total_charge is not None:
+            batch_dict["graph_attrs"] = torch.full(
+                (num_graphs, 1),
+                float(self.total_charge),
+            ).to(self.module.device)
+
+        # Calculate energies and forces of all the graphs at once
+        batch_dict["coordinates"].requires_grad = True
+
+        output = self.module(batch_dict)
+        energies = output["y_graph_scalars"] * self.output_scaling
+        forces = self.module.compute_forces_by_gradient(
+            energy=output["y_graph_scalars"],
+            coordinates=batch_dict["coordinates"],
+        )
+
+        energies_list = energies.detach().cpu().reshape(num_graphs).tolist()
+        ptr = batch_dict["ptr"].cpu().tolist()
+        forces_array = forces.detach().cpu().numpy()
+
+        results: list[dict[str, Any]] = [
+            {"energy": energy, "forces": forces_array[start:end]}
+            for energy, start, end in zip(energies_list, ptr[:-1], ptr[1:], strict=True)
+        ]
+
+        # the uncertainty of the energies (of models with uncertainty)
+        if "y_graph_scalars::std" in output:
+            energy_stds = output["y_graph_scalars::std"] * self.output_scaling
+            for result, energy_std in zip(
+                results,
+                energy_stds.detach().cpu().reshape(num_graphs).tolist(),
+                strict=True,
+            ):
+                result["energy_std"] = energy_std
+
+        return results
+
+    def _featurise(self, atom_list: list[int], positions: list[list[float]]) -> None:
+        """Featurises the system into the template batch (on the device)."""
+
+        dataset_feated = self.system_to_feated_dataset(
+            atom_list=atom_list,
+            positions=positions,
+        )
+        graph_dataset = self._instantiate_datamodule(
+            predict_data=dataset_feated,
+        ).prepare_dataset(dataset_feated, split="predict")
+
+        self._atom_list = atom_list
+        self._graph_dataset = graph_dataset
+        self._batch_dict = self.module.graph_batch_to_batch_dict(
+            graph_dataset.get_batch([0]).to(self.module.device),
+        )
+        initial_edge_indices, initial_edge_attrs = graph_dataset.initial_edges(
+            graph_dataset.dataset[0],
+        )
+        if self.neighbour_list is not None:
+            # the verlet neighbour list is on the device
+            if initial_edge_indices is not None:
+                initial_edge_indices = initial_edge_indices.to(self.module.device)
+            if initial_edge_attrs is not None:
+                initial_edge_attrs = initial_edge_attrs.to(self.module.device)
+        self._initial_edges = (initial_edge_indices, initial_edge_attrs)
+
+    def _make_batch_dict(
+        self,
+        atom_list: list[int],
+        positions: list[list[float]],
+    ) -> dict[str, torch.Tensor]:
+        """Makes the batch of the system from the template batch.
+
+        The system is only featurised when the atoms change, after which only the
+        coordinates and edges of the batch are updated. The edges are built by the
+        verlet neighbour list (on the device) if there is a neighbour list skin, and as
+        by the dataset (on the host) otherwise.
+        """
+
+        if (self._batch_dict is None) or (atom_list != self._atom_list):
+            self._featurise(atom_list, positions)
+        assert self._batch_dict is not None
+
+        batch_dict = dict(self._batch_dict)
+        coordinates = torch.tensor(positions) * self.position_scaling
+        batch_dict["coordinates"] = coordinates.to(self.module.device).type(
+            self.module.dtype,
+        )
+
+        if self.neighbour_list is not None:
+            edge_indices, edge_attrs, cell_shift_vector = merge_initial_edges(
+                coordinates.shape[0],
+                *self.neighbour_list(
+                    positions=batch_dict["coordinates"],
+                    pbc=self.model_config.datamodule.pbc,
+                    cell=batch_dict.get("cell", None),
+                ),
+                *self._initial_edges,
+            )
+        else:
+            assert self._graph_dataset is not None
+            (
+                edge_indices,
+                edge_attrs,
+                cell_shift_vector,
+            ) = self._graph_dataset.construct_edges(
+                coordinates.float(),
+                *self._initial_edges,
+            )
+
+        batch_dict["edge_index"] = edge_indices.to(self.module.device, torch.int64)
+        batch_dict["cell_shift_vector"] = cell_shift_vector.to(self.module.device).type(
+            self.module.dtype,
+        )
+        if edge_attrs is not None:
+            batch_dict["edge_attrs"] = edge_attrs.to(self.module.device).type(
+                self.module.dtype,
+            )
+
+        return batch_dict
@@ -1,13 +1,17 @@
 import logging
-from typing import TYPE_CHECKING
+from abc import abstractmethod
+from typing import TYPE_CHECKING, Any
 
 import molflux.core as molflux_core
+import numpy as np
 from datasets import Dataset
 from datasets.utils import disable_progress_bar
 
+import ase
 from ase.calculators.calculator import Calculator
 from physicsml.backends.backend_selector import atoms_or_file_to_bytes
 from physicsml.lightning.model import PhysicsMLModelBase
+from physicsml.lightning.samplers import pack_batches
 
 if TYPE_CHECKING:
     from physicsml.lightning.module import PhysicsMLModuleBase
@@ -16,6 +20,39 @@ disable_progress_bar()
 logger = logging.getLogger(__name__)
 
 
+def featurise_systems(
+    featurisation_metadata: dict,
+    atom_lists: list[list],
+    positions_list: list[list[list]],
+    position_scaling: float = 1.0,
+    **map_kwargs: Any,
+) -> Dataset:
+    """Featurises systems (their atomic numbers and positions) into a dataset with the
+    featurisation of a model (whose input column is ``tmp_mol``)."""
+
+    representation_config = featurisation_metadata["config"][0]["representations"][0][
+        "config"
+    ]
+    representation_config["backend"] = representation_config.get("backend", "openeye")
+    backend = representation_config["backend"]
+
+    systems_bytes = [
+        atoms_or_file_to_bytes(backend)(
+            atom_list=atom_list,
+            coordinates=[[xs * position_scaling for xs in x] for x in positions],
+        )
+        for atom_list, positions in zip(atom_lists, positions_list, strict=True)
+    ]
+    dataset = Dataset.from_dict({"tmp_mol": systems_bytes})
+    dataset_feated = molflux_core.featurise_dataset(
+        dataset,
+        featurisation_metadata,
+        **map_kwargs,
+    )
+
+    return dataset_feated
+
+
 class PhysicsMLASECalculatorBase(Calculator):
     def __init__(
         self,
@@ -27,6 +64,7 @@ class PhysicsMLASECalculatorBase(Calculator):
         output_scaling: float | None = None,
         position_scaling: float | None = None,
         total_charge: int | None = None,
+        neighbour_list_skin: float | None = None,
         precision: str = "32",
         device: str = "cpu",
     ):
@@ -64,6 +102,9 @@ class PhysicsMLASECalculatorBase(Calculator):
         # total molecular charge needed for aimnet2 model
         self.total_charge = total_charge
 
+        # skin of the verlet neighbour list (reuses the neighbour list across steps)
+        self.neighbour_list_skin = neighbour_list_skin
+
         # specify pbcs and cell
         self.pbc = pbc
         self.cell = cell
@@ -81,26 +122,68 @@ class PhysicsMLASECalculatorBase(Calculator):
         atom_list: list,
         positions: list[list],
     ) -> Dataset:
-        scaled_positions = [[xs * self.position_scaling for xs in x] for x in positions]
-        self.featurisation_metadata["config"][0]["representations"][0]["config"][
-            "backend"
-        ] = self.featurisation_metadata["config"][0]["representations"][0][
-            "config"
-        ].get(
-            "backend",
-            "openeye",
-        )
-        backend = self.featurisation_metadata["config"][0]["representations"][0][
-            "config"
-        ]["backend"]
-        system_bytes = atoms_or_file_to_bytes(backend)(
-            atom_list=atom_list,
-            coordinates=scaled_positions,
-        )
-        dataset = Dataset.from_dict({"tmp_mol": [system_bytes]})
-        dataset_feated = molflux_core.featurise_dataset(
-            dataset,
+        return self.systems_to_feated_dataset([atom_list], [positions])
+
+    def systems_to_feated_dataset(
+        self,
+        atom_lists: list[list],
+        positions_list: list[list[list]],
+        **map_kwargs: Any,
+    ) -> Dataset:
+        """Featurises many systems into a dataset (with a row per system).
+
+        The ``map_kwargs`` (such as ``num_proc``) are passed to the featurisation.
+        """
+
+        return featurise_systems(
             self.featurisation_metadata,
+            atom_lists=atom_lists,
+            positions_list=positions_list,
+            position_scaling=self.position_scaling,
+            **map_kwargs,
         )
 
-        return dataset_feated
+    def calculate_many(
+        self,
+        atoms_list: list[ase.Atoms],
+        max_atoms_per_batch: int = 4096,
+        num_proc: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Calculates the energies and forces of many systems (such as the images of a
+        NEB or a set of conformers) in batches.
+
+        The systems are greedily packed into batches of at most ``max_atoms_per_batch``
+        atoms (which bounds the memory of a batch), and every batch is featurised,
+        collated and evaluated with a single forward and backward pass. The
+        featurisation of a batch is split across ``num_proc`` processes if given.
+
+        Returns the results (the ``energy`` and ``forces``) of every system in order.
+        The results of the calculator (and of the atoms) are not updated.
+        """
+
+        num_atoms = np.array([len(atoms) for atoms in atoms_list])
+        results: list[dict[str, Any]] = []
+        for batch in pack_batches(
+            range(len(atoms_list)),
+            num_nodes=num_atoms,
+            max_nodes=max_atoms_per_batch,
+        ):
+            map_kwargs = {}
+            if (num_proc is not None) and (len(batch) > 1):
+                map_kwargs["num_proc"] = min(num_proc, len(batch))
+            dataset_feated = self.systems_to_feated_dataset(
+                atom_lists=[
+                    atoms_list[idx].get_atomic_numbers().tolist() for idx in batch
+                ],
+                positions_list=[
+                    atoms_list[idx].get_positions().tolist() for idx in batch
+                ],
+                **map_kwargs,
+            )
+            results.extend(self.calculate_batch(dataset_feated))
+
+        return results
+
+    @abstractmethod
+    def calculate_batch(self, dataset_feated: Dataset) -> list[dict[str, Any]]:
+        """Calculates the energies and forces of the featurised systems of a batch."""
@@ -16,6 +16,7 @@ def to_ase_calculator(
     output_scaling: float | None = None,
     position_scaling: float | None = None,
     total_charge: int | None = None,
+    neighbour_list_skin: float | None = None,
     device: str = "cpu",
     precision: str = "32",
 ) -> Any:
@@ -54,6 +55,7 @@ def to_ase_calculator(
         output_scaling=output_scaling,
         position_scaling=position_scaling,
         total_charge=total_charge,
+        neighbour_list_skin=neighbour_list_skin,
         device=device,
         precision=precision,
     )
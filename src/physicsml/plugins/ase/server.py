@@ -0,0 +1,369 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import socket
+from collections.abc import Iterable, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+import datasets
+
+from physicsml.plugins.ase.calculator import (
+    PhysicsMLASECalculatorBase,
+    featurise_systems,
+)
+
+logger = logging.getLogger(__name__)
+
+# the maximum size of a request (a line of json)
+MAX_REQUEST_BYTES = 2**26
+
+
+@dataclass
+class _Request:
+    num_atoms: int
+    dataset_feated: datasets.Dataset
+    future: asyncio.Future
+
+
+class InferenceServer:
+    """A long-lived server which evaluates the energies and forces of systems with a
+    model which is loaded once.
+
+    The server listens on a Unix socket (or a local TCP port) for requests, which are
+    lines of json with the ``atomic_numbers`` and ``positions`` of a system (and an
+    optional ``id``). The response to a request is a line of json with its ``id``,
+    ``energy`` and ``forces`` (and ``energy_std`` for models with uncertainty), or an
+    ``error``. The responses of a connection are in the order of its requests, so
+    that clients can send many requests at once.
+
+    Every request is featurised in a pool of ``num_featurisation_workers`` processes
+    (or in a thread if 0) and then queued. The queued systems are coalesced into
+    batches of at most ``max_atoms_per_batch`` atoms, waiting at most
+    ``max_latency`` seconds for a batch to fill, and every batch is evaluated with a
+    single forward and backward pass of the model (see
+    ``PhysicsMLASECalculatorBase.calculate_batch``).
+    """
+
+    def __init__(
+        self,
+        calculator: PhysicsMLASECalculatorBase,
+        max_latency: float = 0.01,
+        max_atoms_per_batch: int = 4096,
+        num_featurisation_workers: int | None = None,
+    ) -> None:
+        self.calculator = calculator
+        self.max_latency = max_latency
+        self.max_atoms_per_batch = max_atoms_per_batch
+
+        if num_featurisation_workers is None:
+            num_featurisation_workers = os.cpu_count() or 1
+        self.featurisation_pool: Executor
+        if num_featurisation_workers > 0:
+            # spawn, since the model may have initialised cuda
+            self.featurisation_pool = ProcessPoolExecutor(
+                max_workers=num_featurisation_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            self.featurisation_pool = ThreadPoolExecutor(max_workers=1)
+
+        # the model is run in a single thread (outside of the event loop)
+        self.model_pool = ThreadPoolExecutor(max_workers=1)
+
+        self._queue: asyncio.Queue[_Request] | None = None
+        self._batcher: asyncio.Task | None = None
+
+    async def predict(
+        self,
+        atomic_numbers: list[int],
+        positions: list[list[float]],
+    ) -> dict[str, Any]:
+        """Featurises a system and returns its results once its batch is evaluated."""
+
+        loop = asyncio.get_running_loop()
+        dataset_feated = await loop.run_in_executor(
+            self.featurisation_pool,
+            featurise_systems,
+            self.calculator.featurisation_metadata,
+            [atomic_numbers],
+            [positions],
+            self.calculator.position_scaling,
+        )
+
+        if self._queue is None:
+            raise RuntimeError("The server is not started.")
+        future = loop.create_future()
+        await self._queue.put(_Request(len(atomic_numbers), dataset_feated, future))
+
+        result: dict[str, Any] = await future
+        return result
+
+    async def _run_batcher(self) -> None:
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+
+        pending: _Request | None = None
+        while True:
+            if pending is None:
+                pending = await self._queue.get()
+            batch, num_atoms = [pending], pending.num_atoms
+            pending = None
+
+            # fill the batch until it is full or the latency is reached
+            deadline = loop.time() + self.max_latency
+            while num_atoms < self.max_atoms_per_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if num_atoms + request.num_atoms > self.max_atoms_per_batch:
+                    pending = request
+                    break
+                batch.append(request)
+                num_atoms += request.num_atoms
+
+            await self._run_batch(batch)
+
+    async def _run_batch(self, batch: list[_Request]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            dataset_feated = datasets.concatenate_datasets(
+                [request.dataset_feated for request in batch],
+            )
+            results = await loop.run_in_executor(
+                self.model_pool,
+                self.calculator.calculate_batch,
+                dataset_feated,
+            )
+        except Exception as exp:
+            logger.exception("Failed to evaluate a batch.")
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(exp)
+            return
+
+        logger.debug(
+            f"Evaluated a batch of {len(batch)} systems "
+            f"({sum(request.num_atoms for request in batch)} atoms).",
+        )
+        for request, result in zip(batch, results, strict=True):
+            if not request.future.done():
+                request.future.set_result(result)
+
+    async def _respond(self, line: bytes) -> dict[str, Any]:
+        response: dict[str, Any] = {}
+        try:
+            request = json.loads(line)
+            if "id" in request:
+                response["id"] = request["id"]
+            result = await self.predict(
+                atomic_numbers=[int(z) for z in request["atomic_numbers"]],
+                positions=[[float(x) for x in xs] for xs in request["positions"]],
+            )
+        except Exception as exp:
+            response["error"] = f"{type(exp).__name__}: {exp}"
+            return response
+
+        response["energy"] = result["energy"]
+        response["forces"] = result["forces"].tolist()
+        if "energy_std" in result:
+            response["energy_std"] = result["energy_std"]
+
+        return response
+
+    async def _handle_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        # the responses are written in the order of the requests
+        responses: asyncio.Queue[asyncio.Task | None] = asyncio.Queue()
+
+        async def write_responses() -> None:
+            while (task := await responses.get()) is not None:
+                writer.write(json.dumps(await task).encode("utf-8") + b"\n")
+                await writer.drain()
+
+        writer_task = asyncio.create_task(write_responses())
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    responses.put_nowait(asyncio.create_task(self._respond(line)))
+        finally:
+            responses.put_nowait(None)
+            with contextlib.suppress(ConnectionError):
+                await writer_task
+            writer.close()
+
+    async def start(
+        self,
+        socket_path: str | None = None,
+        host: str = "127.0.0.1",
+        port: int | None = None,
+    ) -> asyncio.AbstractServer:
+        """Starts listening on the Unix socket ``socket_path`` (or on ``host:port``)."""
+
+        if (socket_path is None) == (port is None):
+            raise ValueError("Must specify exactly one of 'socket_path' or 'port'.")
+
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._run_batcher())
+
+        if socket_path is not None:
+            server = await asyncio.start_unix_server(
+                self._handle_connection,
+                path=socket_path,
+                limit=MAX_REQUEST_BYTES,
+            )
+        else:
+            server = await asyncio.start_server(
+                self._handle_connection,
+                host=host,
+                port=port,
+                limit=MAX_REQUEST_BYTES,
+            )
+        logger.warning(
+            f"Listening on {socket_path if socket_path is not None else f'{host}:{port}'}",
+        )
+
+        return server
+
+    async def serve(
+        self,
+        socket_path: str | None = None,
+        host: str = "127.0.0.1",
+        port: int | None = None,
+    ) -> None:
+        """Serves requests until cancelled."""
+
+        server = await self.start(socket_path=socket_path, host=host, port=port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self) -> None:
+        if self._batcher is not None:
+            self._batcher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._batcher
+            self._batcher = None
+        self.featurisation_pool.shutdown(wait=False, cancel_futures=True)
+        self.model_pool.shutdown(wait=False, cancel_futures=True)
+
+
+class InferenceClient:
+    """A (blocking) client of an ``InferenceServer``."""
+
+    def __init__(
+        self,
+        socket_path: str | None = None,
+        host: str = "127.0.0.1",
+        port: int | None = None,
+    ) -> None:
+        if socket_path is not None:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.connect(socket_path)
+        elif port is not None:
+            self.socket = socket.create_connection((host, port))
+        else:
+            raise ValueError("Must specify one of 'socket_path' or 'port'.")
+        self._file = self.socket.makefile("rwb")
+
+    def predict_many(
+        self,
+        systems: Iterable[tuple[Sequence[int], Sequence[Sequence[float]]]],
+    ) -> list[dict[str, Any]]:
+        """Sends the requests of all the systems (their atomic numbers and positions)
+        at once, so that they can be batched, and returns their responses in order.
+        """
+
+        num_requests = 0
+        for idx, (atomic_numbers, positions) in enumerate(systems):
+            request = {
+                "id": idx,
+                "atomic_numbers": [int(z) for z in atomic_numbers],
+                "positions": [[float(x) for x in xs] for xs in positions],
+            }
+            self._file.write(json.dumps(request).encode("utf-8") + b"\n")
+            num_requests += 1
+        self._file.flush()
+
+        return [json.loads(self._file.readline()) for _ in range(num_requests)]
+
+    def predict(
+        self,
+        atomic_numbers: Sequence[int],
+        positions: Sequence[Sequence[float]],
+    ) -> dict[str, Any]:
+        return self.predict_many([(atomic_numbers, positions)])[0]
+
+    def close(self) -> None:
+        self._file.close()
+        self.socket.close()
+
+    def __enter__(self) -> "InferenceClient":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    from physicsml.plugins.ase.load import to_ase_calculator
+
+    parser = argparse.ArgumentParser(
+        description="Serves the energies and forces of a saved physicsml model.",
+    )
+    parser.add_argument("--model-path", required=True)
+    listen = parser.add_mutually_exclusive_group(required=True)
+    listen.add_argument("--socket-path", help="The Unix socket to listen on.")
+    listen.add_argument("--port", type=int, help="The local TCP port to listen on.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument(
+        "--max-latency",
+        type=float,
+        default=0.01,
+        help="The maximum time (in seconds) to wait for a batch to fill.",
+    )
+    parser.add_argument("--max-atoms-per-batch", type=int, default=4096)
+    parser.add_argument("--num-featurisation-workers", type=int, default=None)
+    parser.add_argument("--output-scaling", type=float, default=None)
+    parser.add_argument("--position-scaling", type=float, default=None)
+    parser.add_argument("--total-charge", type=int, default=None)
+    parser.add_argument("--precision", default="32")
+    parser.add_argument("--device", default="cpu")
+    args = parser.parse_args(argv)
+
+    calculator = to_ase_calculator(
+        model_path=args.model_path,
+        output_scaling=args.output_scaling,
+        position_scaling=args.position_scaling,
+        total_charge=args.total_charge,
+        precision=args.precision,
+        device=args.device,
+    )
+    server = InferenceServer(
+        calculator,
+        max_latency=args.max_latency,
+        max_atoms_per_batch=args.max_atoms_per_batch,
+        num_featurisation_workers=args.num_featurisation_workers,
+    )
+
+    asyncio.run(
+        server.serve(socket_path=args.socket_path, host=args.host, port=args.port),
+    )
+
+
+if __name__ == "__main__":
+    main()
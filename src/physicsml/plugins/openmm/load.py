@@ -5,24 +5,12 @@ import molflux.core as molflux_core
 from physicsml.utils import load_from_dvc
 
 
-def to_openmm_torchscript(
-    model_path: str | None = None,
-    repo_url: str | None = None,
-    rev: str | None = None,
-    model_path_in_repo: str | None = None,
-    atom_list: list[int] | None = None,
-    system_path: str | None = None,
-    atom_idxs: list[int] | None = None,
-    total_charge: int | None = None,
-    y_output: str | None = None,
-    pbc: tuple[bool, bool, bool] | None = None,
-    cell: list[list[float]] | None = None,
-    output_scaling: float | None = None,
-    position_scaling: float | None = None,
-    device: str = "cpu",
-    precision: str = "32",
-    torchscipt_path: str | None = None,
-) -> Any:
+def _load_model(
+    model_path: str | None,
+    repo_url: str | None,
+    rev: str | None,
+    model_path_in_repo: str | None,
+) -> tuple[Any, dict]:
     assert (model_path is not None) ^ (
         (repo_url is not None)
         and (rev is not None)
@@ -49,7 +37,91 @@ def to_openmm_torchscript(
     else:
         raise RuntimeError("Could not load model.")
 
-    openmm_model = model.to_openmm(  # type: ignore
+    return model, featurisation_metadata
+
+
+def to_openmm_torchscript(
+    model_path: str | None = None,
+    repo_url: str | None = None,
+    rev: str | None = None,
+    model_path_in_repo: str | None = None,
+    atom_list: list[int] | None = None,
+    system_path: str | None = None,
+    atom_idxs: list[int] | None = None,
+    total_charge: int | None = None,
+    y_output: str | None = None,
+    pbc: tuple[bool, bool, bool] | None = None,
+    cell: list[list[float]] | None = None,
+    output_scaling: float | None = None,
+    position_scaling: float | None = None,
+    neighbour_list_skin: float | None = None,
+    device: str = "cpu",
+    precision: str = "32",
+    torchscipt_path: str | None = None,
+) -> Any:
+    model, featurisation_metadata = _load_model(
+        model_path=model_path,
+        repo_url=repo_url,
+        rev=rev,
+        model_path_in_repo=model_path_in_repo,
+    )
+
+    openmm_model = model.to_openmm(
+        physicsml_model=model,
+        featurisation_metadata=featurisation_metadata,
+        atom_list=atom_list,
+        system_path=system_path,
+        atom_idxs=atom_idxs,
+        total_charge=total_charge,
+        y_output=y_output,
+        pbc=pbc,
+        cell=cell,
+        output_scaling=output_scaling,
+        position_scaling=position_scaling,
+        neighbour_list_skin=neighbour_list_skin,
+        device=device,
+        precision=precision,
+    )
+
+    return openmm_model.to_torchscript(file_path=torchscipt_path)
+
+
+def to_openmm_replicas_torchscript(
+    n_replicas: int,
+    model_path: str | None = None,
+    repo_url: str | None = None,
+    rev: str | None = None,
+    model_path_in_repo: str | None = None,
+    atom_list: list[int] | None = None,
+    system_path: str | None = None,
+    atom_idxs: list[int] | None = None,
+    total_charge: int | None = None,
+    y_output: str | None = None,
+    pbc: tuple[bool, bool, bool] | None = None,
+    cell: list[list[float]] | None = None,
+    output_scaling: float | None = None,
+    position_scaling: float | None = None,
+    device: str = "cpu",
+    precision: str = "32",
+    torchscipt_path: str | None = None,
+) -> Any:
+    """Exports a module which evaluates ``n_replicas`` configurations of a system at
+    once (see ``OpenMMGraphReplicas``).
+
+    The module takes the positions of the replicas [n_replicas, n_atoms, 3] (and
+    optionally the box vectors [3, 3]) and returns their energies [n_replicas] and
+    forces [n_replicas, n_atoms, 3].
+    """
+
+    model, featurisation_metadata = _load_model(
+        model_path=model_path,
+        repo_url=repo_url,
+        rev=rev,
+        model_path_in_repo=model_path_in_repo,
+    )
+
+    openmm_model = model.to_openmm_replicas(
+        n_replicas=n_replicas,
         physicsml_model=model,
         featurisation_metadata=featurisation_metadata,
         atom_list=atom_list,
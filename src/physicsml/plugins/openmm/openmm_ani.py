@@ -15,7 +15,9 @@ class OpenMMANI(OpenMMModuleBase):
     def __init__(self, **kwargs: Any) -> None:
         super().__init__(**kwargs)
 
-        self.batch_dict = self.make_batch(self.datapoint)
+        self.batch_dict = self.to_static_batch_dict(self.make_batch(self.datapoint))
+        # the pbc of the box vectors
+        self.box_pbc = torch.tensor([True, True, True]).to(self.which_device)
         del self.model_config
 
     def make_batch(self, datapoint: dict[str, torch.Tensor]) -> dict[str, torch.Tensor]:
@@ -48,30 +50,28 @@ class OpenMMANI(OpenMMModuleBase):
         positions: torch.Tensor,
         boxvectors: torch.Tensor | None = None,
     ) -> torch.Tensor:
-        batch_dict_clone = self.clone_batch_dict_to_device()
+        batch_dict_clone = self.copy_batch_dict()
 
         # occasionally torchscript will squeeze tensors with shape (1, *) without warning.
         if batch_dict_clone["species"].dim() < 2:
             batch_dict_clone["species"] = batch_dict_clone["species"].unsqueeze(0)
 
         # scale positions
-        positions = positions.type(self.model_dtype)
+        positions = positions.to(self.which_device).type(self.model_dtype)
         positions = positions * self.position_scaling
 
         # truncate positions tensor if using mixed system
         if self.atom_idxs is not None:
             positions = positions[self.atom_idxs]
 
-        batch_dict_clone["coordinates"] = positions.unsqueeze(0).to(self.which_device)
+        batch_dict_clone["coordinates"] = positions.unsqueeze(0)
 
         # if box vectors are provided, override
         if boxvectors is not None:
             batch_dict_clone["cell"] = (
                 boxvectors.type(positions.dtype) * self.position_scaling
             ).to(self.which_device)
-            batch_dict_clone["pbc"] = torch.tensor([True, True, True]).to(
-                self.which_device,
-            )
+            batch_dict_clone["pbc"] = self.box_pbc
 
         # do inference
         output: dict[str, torch.Tensor] = self.module(batch_dict_clone)
@@ -28,6 +28,7 @@ class OpenMMModuleBase(PhysicsMLModuleBase):
         cell: list[list[float]] | None = None,
         output_scaling: float | None = None,
         position_scaling: float | None = None,
+        neighbour_list_skin: float | None = None,
         precision: str = "32",
         device: str = "cpu",
     ) -> None:
@@ -78,12 +79,15 @@ class OpenMMModuleBase(PhysicsMLModuleBase):
                 for vector in self.cell
             ]
 
+        # skin of the verlet neighbour list (reuses the neighbour list across steps)
+        self.neighbour_list_skin = neighbour_list_skin
+
         # check if using tructated atoms list (for mixed systems) and specify atom idxs tensor
         if atom_idxs is not None:
             self.atom_idxs: torch.Tensor | None = torch.tensor(
                 atom_idxs,
                 dtype=torch.int64,
-            )
+            ).to(self.which_device)
         else:
             self.atom_idxs = None
 
@@ -129,20 +133,29 @@ class OpenMMModuleBase(PhysicsMLModuleBase):
         datapoint: dict[str, torch.Tensor],
     ) -> dict[str, torch.Tensor]: ...
 
-    def clone_batch_dict_to_device(self) -> dict[str, torch.Tensor]:
-        clone = {}
+    def to_static_batch_dict(
+        self,
+        batch_dict: dict[str, torch.Tensor],
+    ) -> dict[str, torch.Tensor]:
+        """Moves the inputs which do not change across steps to the device once."""
 
-        for k, v in self.batch_dict.items():
-            clone[k] = v.clone().to(self.which_device)
+        static_batch_dict = {}
+        for k, v in batch_dict.items():
+            static_batch_dict[k] = v.to(self.which_device)
 
-        # add total_charge to the clone if it exists
+        # add total_charge to the batch if it exists
         if self.total_charge is not None:
-            clone["graph_attrs"] = torch.as_tensor(
+            static_batch_dict["graph_attrs"] = torch.as_tensor(
                 [[self.total_charge]],
                 dtype=torch.float,
             ).to(self.which_device)
 
-        return clone
+        return static_batch_dict
+
+    def copy_batch_dict(self) -> dict[str, torch.Tensor]:
+        # a shallow copy of the static inputs (already on the device), to which the
+        # inputs of the step are added
+        return self.batch_dict.copy()
 
     def compute_loss(self, input: Any, target: Any) -> dict[str, torch.Tensor]:
         return {"loss": torch.empty(0)}
@@ -4,8 +4,12 @@ from typing import Any
 import torch
 
 from physicsml.lightning.config import PhysicsMLModelConfig
+from physicsml.lightning.graph_datasets.graph_dataset import one_hot_atomic_numbers
 from physicsml.lightning.graph_datasets.neighbourhood_list_torch import (
+    BUILTIN_NEIGHBOUR_LIST_BACKENDS,
+    VerletNeighbourList,
     construct_edge_indices_and_attrs,
+    merge_initial_edges,
 )
 from physicsml.plugins.openmm.openmm_base import OpenMMModuleBase
 
@@ -23,8 +27,27 @@ class OpenMMGraph(OpenMMModuleBase):
         self.cut_off = self.model_config.datamodule.cut_off
         self.num_elements = self.model_config.datamodule.num_elements
         self.self_interaction = self.model_config.datamodule.self_interaction
+        self.neighbour_list_backend = (
+            self.model_config.datamodule.neighbour_list_backend
+        )
+        if self.neighbour_list_backend not in BUILTIN_NEIGHBOUR_LIST_BACKENDS:
+            # only the builtin backends can be used in torchscript
+            logger.warning(
+                f"Neighbour list backend '{self.neighbour_list_backend}' is not supported in OpenMM. Using 'auto'.",
+            )
+            self.neighbour_list_backend = "auto"
+
+        if self.neighbour_list_skin is not None:
+            self.neighbour_list: VerletNeighbourList | None = VerletNeighbourList(
+                cutoff=self.cut_off,
+                skin=self.neighbour_list_skin,
+                self_interaction=self.self_interaction,
+                backend=self.neighbour_list_backend,
+            ).to(self.which_device)
+        else:
+            self.neighbour_list = None
 
-        self.batch_dict = self.make_batch(self.datapoint)
+        self.batch_dict = self.to_static_batch_dict(self.make_batch(self.datapoint))
 
         del self.model_config
 
@@ -51,12 +74,9 @@ class OpenMMGraph(OpenMMModuleBase):
         )
 
         if raw_atomic_numbers is not None:
-            atomic_numbers: torch.Tensor | None = (
-                torch.nn.functional.one_hot(
-                    raw_atomic_numbers,
-                    num_classes=self.model_config.datamodule.num_elements,
-                )
-                * 1.0
+            atomic_numbers: torch.Tensor | None = one_hot_atomic_numbers(
+                raw_atomic_numbers,
+                self.model_config.datamodule.num_elements,
             )
         else:
             atomic_numbers = None
@@ -105,12 +125,14 @@ class OpenMMGraph(OpenMMModuleBase):
         if initial_edge_attrs is not None:
             self.initial_edge_attrs: torch.Tensor | None = initial_edge_attrs.type(
                 self.dtype,
-            )
+            ).to(self.which_device)
         else:
             self.initial_edge_attrs = None
 
         if initial_edge_indices is not None:
-            self.initial_edge_indices: torch.Tensor | None = initial_edge_indices
+            self.initial_edge_indices: torch.Tensor | None = initial_edge_indices.to(
+                self.which_device,
+            )
         else:
             self.initial_edge_indices = None
 
@@ -121,17 +143,17 @@ class OpenMMGraph(OpenMMModuleBase):
         positions: torch.Tensor,
         boxvectors: torch.Tensor | None = None,
     ) -> torch.Tensor:
-        batch_dict_clone = self.clone_batch_dict_to_device()
+        batch_dict_clone = self.copy_batch_dict()
 
         # scale positions
-        positions = positions.type(self.model_dtype)
+        positions = positions.to(self.which_device).type(self.model_dtype)
         positions = positions * self.position_scaling
 
         # truncate positions tensor if using mixed system
         if self.atom_idxs is not None:
             positions = positions[self.atom_idxs]
 
-        batch_dict_clone["coordinates"] = positions.to(self.which_device)
+        batch_dict_clone["coordinates"] = positions
 
         # if box vectors are provided, override
         if boxvectors is not None:
@@ -145,15 +167,35 @@ class OpenMMGraph(OpenMMModuleBase):
             cell = None
             pbc = None
 
-        edge_indices, edge_attrs, cell_shift_vector = construct_edge_indices_and_attrs(
-            positions=batch_dict_clone["coordinates"],
-            initial_edge_indices=self.initial_edge_indices,
-            initial_edge_attrs=self.initial_edge_attrs,
-            cell=cell,
-            pbc=pbc,
-            cutoff=self.cut_off,
-            self_interaction=self.self_interaction,
-        )
+        neighbour_list = self.neighbour_list
+        if neighbour_list is not None:
+            nbhd_edge_indices, nbhd_cell_shift_vector = neighbour_list(
+                positions=batch_dict_clone["coordinates"],
+                pbc=pbc,
+                cell=cell,
+            )
+            edge_indices, edge_attrs, cell_shift_vector = merge_initial_edges(
+                num_nodes=batch_dict_clone["coordinates"].shape[0],
+                nbhd_edge_indices=nbhd_edge_indices,
+                nbhd_cell_shift_vector=nbhd_cell_shift_vector,
+                initial_edge_indices=self.initial_edge_indices,
+                initial_edge_attrs=self.initial_edge_attrs,
+            )
+        else:
+            (
+                edge_indices,
+                edge_attrs,
+                cell_shift_vector,
+            ) = construct_edge_indices_and_attrs(
+                positions=batch_dict_clone["coordinates"],
+                initial_edge_indices=self.initial_edge_indices,
+                initial_edge_attrs=self.initial_edge_attrs,
+                cell=cell,
+                pbc=pbc,
+                cutoff=self.cut_off,
+                self_interaction=self.self_interaction,
+                neighbour_list_backend=self.neighbour_list_backend,
+            )
         if edge_attrs is not None:
             edge_attrs = edge_attrs * 1.0
         if edge_indices is not None:
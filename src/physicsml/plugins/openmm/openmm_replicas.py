@@ -0,0 +1,230 @@
+import logging
+from typing import Any
+
+import torch
+
+from physicsml.lightning.graph_datasets.neighbourhood_list_torch import (
+    compute_batch_neighbourhood,
+    merge_initial_edges,
+)
+from physicsml.plugins.openmm.openmm_ani import OpenMMANI
+from physicsml.plugins.openmm.openmm_graph import OpenMMGraph
+
+logger = logging.getLogger(__name__)
+
+
+def tile_batch_dict(
+    batch_dict: dict[str, torch.Tensor],
+    n_replicas: int,
+    num_nodes: int,
+) -> dict[str, torch.Tensor]:
+    """Tiles the batch dict of a single graph into a batch of ``n_replicas`` copies.
+
+    The cell is shared by all the replicas, every other tensor is repeated along its
+    first (node or graph) dimension.
+    """
+
+    device = batch_dict["ptr"].device
+
+    tiled_batch_dict: dict[str, torch.Tensor] = {}
+    for k, v in batch_dict.items():
+        if k == "num_graphs":
+            tiled_batch_dict[k] = torch.tensor(n_replicas)
+        elif k == "num_nodes":
+            tiled_batch_dict[k] = torch.tensor(n_replicas * num_nodes)
+        elif k == "batch":
+            tiled_batch_dict[k] = torch.arange(
+                n_replicas,
+                device=device,
+            ).repeat_interleave(num_nodes)
+        elif k == "ptr":
+            tiled_batch_dict[k] = (
+                torch.arange(n_replicas + 1, dtype=torch.int64, device=device)
+                * num_nodes
+            )
+        elif k == "cell":
+            tiled_batch_dict[k] = v
+        else:
+            tiled_batch_dict[k] = v.repeat(n_replicas, *([1] * (v.dim() - 1)))
+
+    return tiled_batch_dict
+
+
+class OpenMMGraphReplicas(OpenMMGraph):
+    """Evaluates ``n_replicas`` configurations of the same system at once.
+
+    For replica exchange, multiple walkers or alchemical windows (which run many
+    simulations of the same topology). The inputs which do not change across steps
+    are tiled into a batch of ``n_replicas`` graphs once, and every call builds the
+    edges of all the replicas with a single (batched) neighbour search and runs a
+    single forward and backward pass of the model.
+
+    The ``forward`` takes the positions of the replicas [n_replicas, n_atoms, 3] (and
+    the box vectors [3, 3], which are shared by all the replicas) and returns their
+    energies [n_replicas] and forces [n_replicas, n_atoms, 3].
+    """
+
+    def __init__(self, n_replicas: int, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+
+        if self.neighbour_list is not None:
+            # the verlet neighbour list is of a single system
+            logger.warning(
+                "A neighbour list skin is not supported with replicas. Rebuilding the neighbour list on every step.",
+            )
+            self.neighbour_list = None
+
+        self.n_replicas = n_replicas
+        num_nodes = int(self.batch_dict["num_nodes"])
+        self.batch_dict = tile_batch_dict(self.batch_dict, n_replicas, num_nodes)
+
+        # the initial edges of every replica (into the nodes of the batch)
+        if self.initial_edge_indices is not None:
+            offsets = (
+                torch.arange(n_replicas, device=self.initial_edge_indices.device)
+                * num_nodes
+            )
+            self.initial_edge_indices = (
+                self.initial_edge_indices.unsqueeze(0) + offsets.view(-1, 1, 1)
+            ).reshape(-1, self.initial_edge_indices.shape[-1])
+        if self.initial_edge_attrs is not None:
+            self.initial_edge_attrs = self.initial_edge_attrs.repeat(
+                n_replicas,
+                *([1] * (self.initial_edge_attrs.dim() - 1)),
+            )
+
+    def forward(  # type: ignore[override]
+        self,
+        positions: torch.Tensor,
+        boxvectors: torch.Tensor | None = None,
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        batch_dict_clone = self.copy_batch_dict()
+
+        positions = positions.to(self.which_device).type(self.model_dtype).detach()
+        positions.requires_grad_(True)
+
+        # scale positions
+        coordinates = positions * self.position_scaling
+
+        # truncate positions tensor if using mixed system
+        if self.atom_idxs is not None:
+            coordinates = coordinates[:, self.atom_idxs]
+
+        batch_dict_clone["coordinates"] = coordinates.reshape(-1, 3)
+
+        # if box vectors are provided, override
+        if boxvectors is not None:
+            batch_dict_clone["cell"] = (
+                boxvectors.type(coordinates.dtype) * self.position_scaling
+            ).to(self.which_device)
+        if "cell" in batch_dict_clone:
+            cell = batch_dict_clone["cell"]
+            pbc = (True, True, True)
+        else:
+            cell = None
+            pbc = None
+
+        nbhd_edge_indices, nbhd_cell_shift_vector = compute_batch_neighbourhood(
+            positions=batch_dict_clone["coordinates"],
+            batch=batch_dict_clone["batch"],
+            num_graphs=self.n_replicas,
+            cutoff=self.cut_off,
+            pbc=pbc,
+            cell=cell,
+            self_interaction=self.self_interaction,
+            backend=self.neighbour_list_backend,
+        )
+        edge_indices, edge_attrs, cell_shift_vector = merge_initial_edges(
+            num_nodes=batch_dict_clone["coordinates"].shape[0],
+            nbhd_edge_indices=nbhd_edge_indices,
+            nbhd_cell_shift_vector=nbhd_cell_shift_vector,
+            initial_edge_indices=self.initial_edge_indices,
+            initial_edge_attrs=self.initial_edge_attrs,
+        )
+        if edge_attrs is not None:
+            edge_attrs = edge_attrs * 1.0
+
+        # add tensors to batch
+        batch_dict_clone["edge_index"] = edge_indices.type(torch.int64)
+        if edge_attrs is not None:
+            batch_dict_clone["edge_attrs"] = edge_attrs
+        if "cell" in batch_dict_clone:
+            batch_dict_clone["cell_shift_vector"] = cell_shift_vector
+
+        # do inference
+        output: dict[str, torch.Tensor] = self.module(batch_dict_clone)
+
+        # get outputs and scale
+        energies = output[self.y_output].reshape(self.n_replicas)
+        energies = energies * self.output_scaling
+
+        return energies, replica_forces(energies, positions)
+
+
+class OpenMMANIReplicas(OpenMMANI):
+    """Evaluates ``n_replicas`` configurations of the same system at once.
+
+    The ANI counterpart of ``OpenMMGraphReplicas`` (the replicas are the molecules of
+    the batch).
+    """
+
+    def __init__(self, n_replicas: int, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+
+        self.n_replicas = n_replicas
+        for k in ["species", "total_atomic_energy"]:
+            if k in self.batch_dict:
+                v = self.batch_dict[k]
+                self.batch_dict[k] = v.repeat(n_replicas, *([1] * (v.dim() - 1)))
+
+    def forward(  # type: ignore[override]
+        self,
+        positions: torch.Tensor,
+        boxvectors: torch.Tensor | None = None,
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        batch_dict_clone = self.copy_batch_dict()
+
+        positions = positions.to(self.which_device).type(self.model_dtype).detach()
+        positions.requires_grad_(True)
+
+        # scale positions
+        coordinates = positions * self.position_scaling
+
+        # truncate positions tensor if using mixed system
+        if self.atom_idxs is not None:
+            coordinates = coordinates[:, self.atom_idxs]
+
+        batch_dict_clone["coordinates"] = coordinates
+
+        # if box vectors are provided, override
+        if boxvectors is not None:
+            batch_dict_clone["cell"] = (
+                boxvectors.type(coordinates.dtype) * self.position_scaling
+            ).to(self.which_device)
+            batch_dict_clone["pbc"] = self.box_pbc
+
+        # do inference
+        output: dict[str, torch.Tensor] = self.module(batch_dict_clone)
+
+        # get output and scaling
+        energies = output[self.y_output].reshape(self.n_replicas)
+        energies = energies * self.output_scaling
+
+        return energies, replica_forces(energies, positions)
+
+
+def replica_forces(energies: torch.Tensor, positions: torch.Tensor) -> torch.Tensor:
+    """The forces [n_replicas, n_atoms, 3] of the energies of the replicas (which do
+    not depend on each other's positions)."""
+
+    grad_outputs: list[torch.Tensor | None] | None = [torch.ones_like(energies)]
+    gradient = torch.autograd.grad(
+        outputs=[energies],  # [n_replicas, ]
+        inputs=[positions],  # [n_replicas, n_atoms, 3]
+        grad_outputs=grad_outputs,  # type: ignore
+        allow_unused=True,
+    )[0]
+
+    if gradient is None:
+        raise RuntimeWarning("Gradient is None")
+    return -1 * gradient
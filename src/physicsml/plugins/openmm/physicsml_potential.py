@@ -47,6 +47,7 @@ class PhysicsMLPotentialImpl(MLPotentialImpl):
         output_scaling: float | None = None,
         position_scaling: float | None = None,
         total_charge: int | None = None,
+        neighbour_list_skin: float | None = None,
         device: str = "cpu",
         precision: str = "32",
     ) -> None:
@@ -60,6 +61,7 @@ class PhysicsMLPotentialImpl(MLPotentialImpl):
             y_output (Optional[str], optional): The output of the model (from its y_features). Defaults to 'y_graph_scalars'. Defaults to None.
             output_scaling (Optional[float], optional): The scaling of the output of the model (for changing units). Defaults to None.
             position_scaling (Optional[float], optional): The scaling of the positions input to the model (for changing units). Defaults to None.
+            neighbour_list_skin (Optional[float], optional): The skin of a verlet neighbour list (in the units of the model cut off) which is reused across steps. Defaults to None (rebuild every step).
             device (str, optional): The device to run inference on (either cpu or cuda). Defaults to "cpu".
             precision (str, optional): The precision to use (32 or 64). Defaults to "32".
         """
@@ -85,6 +87,9 @@ class PhysicsMLPotentialImpl(MLPotentialImpl):
         if total_charge is not None:
             self.model_config["total_charge"] = total_charge
 
+        if neighbour_list_skin is not None:
+            self.model_config["neighbour_list_skin"] = neighbour_list_skin
+
         if model_path is not None:
             self.model_config["model_path"] = model_path
         else:
@@ -0,0 +1,147 @@
+from collections.abc import Callable, Sequence
+
+import torch
+
+# the Boltzmann constant in kJ/mol/K (the units of OpenMM)
+BOLTZMANN_CONSTANT = 0.008314462618
+
+ReplicasModuleT = Callable[
+    [torch.Tensor, torch.Tensor | None],
+    tuple[torch.Tensor, torch.Tensor],
+]
+
+
+def run_replica_exchange(
+    module: ReplicasModuleT,
+    positions: torch.Tensor,
+    masses: torch.Tensor | Sequence[float],
+    temperatures: Sequence[float],
+    n_steps: int,
+    exchange_interval: int = 100,
+    timestep: float = 0.001,
+    friction: float = 1.0,
+    boxvectors: torch.Tensor | None = None,
+    seed: int | None = None,
+) -> dict[str, torch.Tensor]:
+    """A reference implementation of temperature replica exchange with a replicas
+    module (see ``to_openmm_replicas_torchscript``).
+
+    All the replicas are propagated together with Langevin dynamics (the BAOAB
+    integrator), with a single call of the module per step. Every
+    ``exchange_interval`` steps, swaps of the replicas at neighbouring temperatures
+    are attempted (alternating between the even and odd pairs) and accepted with the
+    Metropolis criterion, in which case the velocities are rescaled to the new
+    temperatures.
+
+    The units are those of OpenMM (nm, ps, amu, K and kJ/mol), so the module must
+    take positions in nm and return energies in kJ/mol (see its ``position_scaling``
+    and ``output_scaling``).
+
+    Args:
+        module: The replicas module, which returns the energies [n_replicas] and forces
+            [n_replicas, n_atoms, 3] of the positions [n_replicas, n_atoms, 3].
+        positions: The initial positions of the replicas [n_replicas, n_atoms, 3].
+        masses: The masses of the atoms [n_atoms].
+        temperatures: The temperatures of the replicas (in increasing order).
+        n_steps: The number of steps.
+        exchange_interval: The number of steps between exchange attempts.
+        timestep: The timestep.
+        friction: The friction coefficient of the Langevin thermostat.
+        boxvectors: The box vectors [3, 3] (shared by all the replicas), if periodic.
+        seed: The seed of the random numbers (a random seed if not specified).
+
+    Returns:
+        The final ``positions`` and ``velocities`` of the replicas, the ``energies``
+        of the replicas at every step [n_steps, n_replicas], the index of the
+        temperature of every replica at every step ``temperature_indices`` [n_steps,
+        n_replicas] and the ``acceptance_rate`` of the exchanges between every pair of
+        neighbouring temperatures [n_replicas - 1].
+    """
+
+    n_replicas = positions.shape[0]
+    if len(temperatures) != n_replicas:
+        raise ValueError(
+            f"Expected {n_replicas} temperatures (one per replica), got {len(temperatures)}.",
+        )
+
+    generator = torch.Generator(device=positions.device)
+    if seed is not None:
+        generator.manual_seed(seed)
+    else:
+        generator.seed()
+
+    def randn_like(tensor: torch.Tensor) -> torch.Tensor:
+        return torch.randn(
+            tensor.shape,
+            generator=generator,
+            dtype=tensor.dtype,
+            device=tensor.device,
+        )
+
+    positions = positions.detach().clone()
+    masses_ten = torch.as_tensor(masses, dtype=positions.dtype).to(positions.device)
+    masses_ten = masses_ten.view(1, -1, 1)
+    temperatures_ten = torch.as_tensor(temperatures, dtype=positions.dtype).to(
+        positions.device,
+    )
+    betas = 1.0 / (BOLTZMANN_CONSTANT * temperatures_ten)
+
+    # the index of the temperature of every replica
+    temperature_indices = torch.arange(n_replicas, device=positions.device)
+
+    def kt() -> torch.Tensor:
+        # [n_replicas, 1, 1]
+        return BOLTZMANN_CONSTANT * temperatures_ten[temperature_indices].view(-1, 1, 1)
+
+    velocities = torch.sqrt(kt() / masses_ten) * randn_like(positions)
+    energies, forces = module(positions, boxvectors)
+
+    damping = torch.exp(torch.tensor(-friction * timestep))
+    noise_scale = torch.sqrt(1 - damping**2)
+
+    all_energies = []
+    all_temperature_indices = []
+    num_attempts = torch.zeros(max(n_replicas - 1, 0))
+    num_accepted = torch.zeros(max(n_replicas - 1, 0))
+    for step in range(n_steps):
+        # BAOAB
+        velocities = velocities + 0.5 * timestep * forces.detach() / masses_ten
+        positions = positions + 0.5 * timestep * velocities
+        velocities = damping * velocities + noise_scale * torch.sqrt(
+            kt() / masses_ten,
+        ) * randn_like(velocities)
+        positions = positions + 0.5 * timestep * velocities
+        energies, forces = module(positions, boxvectors)
+        energies = energies.detach()
+        velocities = velocities + 0.5 * timestep * forces.detach() / masses_ten
+
+        if (step + 1) % exchange_interval == 0:
+            exchange_idx = (step + 1) // exchange_interval
+            for i in range(exchange_idx % 2, n_replicas - 1, 2):
+                # the replicas at the temperatures i and i + 1
+                replica_i = int(torch.nonzero(temperature_indices == i)[0])
+                replica_j = int(torch.nonzero(temperature_indices == i + 1)[0])
+
+                log_acceptance = (betas[i] - betas[i + 1]) * (
+                    energies[replica_i] - energies[replica_j]
+                )
+                num_attempts[i] += 1
+                uniform = torch.rand(1, generator=generator, device=positions.device)
+                if bool(torch.log(uniform) < log_acceptance):
+                    num_accepted[i] += 1
+                    temperature_indices[replica_i] = i + 1
+                    temperature_indices[replica_j] = i
+                    scaling = torch.sqrt(temperatures_ten[i + 1] / temperatures_ten[i])
+                    velocities[replica_i] = velocities[replica_i] * scaling
+                    velocities[replica_j] = velocities[replica_j] / scaling
+
+        all_energies.append(energies)
+        all_temperature_indices.append(temperature_indices.clone())
+
+    return {
+        "positions": positions.detach(),
+        "velocities": velocities.detach(),
+        "energies": torch.stack(all_energies),
+        "temperature_indices": torch.stack(all_temperature_indices),
+        "acceptance_rate": num_accepted / num_attempts.clamp(min=1),
+    }
@@ -75,3 +75,25 @@ def test_ase_ani(featurised_ani1x_atomic_nums):
     out = atoms.get_potential_energy()
 
     assert round(out, 3) == round(preds["ani_model::wb97x_dz.energy"][0], 3)
+
+    # the same as a batch of conformers
+    atoms_list = [
+        Atoms(numbers=atom_list, positions=np.array(pos) + 0.01 * i) for i in range(3)
+    ]
+    atoms_list.append(Atoms(numbers=atom_list[:-2], positions=np.array(pos)[:-2]))
+    results = ase_calculator.calculate_many(atoms_list)
+    assert len(results) == len(atoms_list)
+    for atoms, result in zip(atoms_list, results, strict=True):
+        atoms.calc = ase_calculator
+        assert result["forces"].shape == (len(atoms), 3)
+        np.testing.assert_allclose(
+            result["energy"],
+            atoms.get_potential_energy(),
+            rtol=1e-5,
+        )
+        np.testing.assert_allclose(
+            result["forces"],
+            atoms.get_forces(),
+            rtol=1e-4,
+            atol=1e-5,
+        )
@@ -91,3 +91,292 @@ def test_ase_graph(featurised_ani1x_atomic_nums):
     out = atoms.get_potential_energy()
 
     assert round(out, 3) == round(preds["mace_model::wb97x_dz.energy"][0], 3)
+
+
+def test_ase_graph_neighbour_list_skin(featurised_ani1x_atomic_nums):
+    dataset_feated, x_features, featurisation_metadata = featurised_ani1x_atomic_nums
+
+    # specify the model config
+    model_config = {
+        "name": "egnn_model",  # the model name
+        "config": {
+            "x_features": x_features,
+            "y_features": [
+                "wb97x_dz.energy",
+                "wb97x_dz.forces",
+            ],
+            "datamodule": {
+                "y_graph_scalars": ["wb97x_dz.energy"],
+                "y_node_vector": "wb97x_dz.forces",
+                "num_elements": 4,
+                "cut_off": 5.0,
+            },
+            "num_node_feats": 4,
+            "num_edge_feats": 0,
+            "num_layers": 4,
+            "num_layers_phi": 2,
+            "c_hidden": 12,
+            "dropout": 0.1,
+            "compute_forces": True,
+            "mlp_activation": "SiLU",
+            "y_graph_scalars_loss_config": {
+                "name": "MSELoss",
+                "weight": 1.0,
+            },
+            "y_node_vector_loss_config": {
+                "name": "MSELoss",
+                "weight": 1.0,
+            },
+        },
+    }
+
+    model = mz.load_from_dict(model_config)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        model.train(
+            train_data=dataset_feated,
+            validation_data=dataset_feated,
+            trainer_config={
+                "accelerator": "gpu" if torch.cuda.is_available() else "cpu",
+                "max_epochs": 2,
+                "default_root_dir": tmpdir,
+            },
+            datamodule_config={
+                "train": {"batch_size": 4},
+                "num_workers": 0,
+            },
+        )
+
+        molflux_core.save_model(model, tmpdir, featurisation_metadata)
+
+        ase_calculator = to_ase_calculator(
+            model_path=tmpdir,
+            precision="32",
+            device="cuda" if torch.cuda.is_available() else "cpu",
+        )
+        ase_calculator_skin = to_ase_calculator(
+            model_path=tmpdir,
+            precision="32",
+            neighbour_list_skin=1.0,
+            device="cuda" if torch.cuda.is_available() else "cpu",
+        )
+
+    atom_list = [6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
+    pos = np.array(dataset_feated[0]["physicsml_coordinates"])
+
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        pos = pos + rng.normal(scale=0.05, size=pos.shape)
+
+        atoms = Atoms(numbers=atom_list, positions=pos)
+        atoms.calc = ase_calculator
+        atoms_skin = Atoms(numbers=atom_list, positions=pos)
+        atoms_skin.calc = ase_calculator_skin
+
+        np.testing.assert_allclose(
+            atoms_skin.get_potential_energy(),
+            atoms.get_potential_energy(),
+            rtol=1e-5,
+        )
+        np.testing.assert_allclose(
+            atoms_skin.get_forces(),
+            atoms.get_forces(),
+            rtol=1e-4,
+            atol=1e-5,
+        )
+
+    # the neighbour list is only rebuilt every few steps
+    assert 1 <= ase_calculator_skin.neighbour_list.num_builds < 10
+
+
+def test_ase_graph_featurises_once(featurised_ani1x_atomic_nums):
+    dataset_feated, x_features, featurisation_metadata = featurised_ani1x_atomic_nums
+
+    # specify the model config
+    model_config = {
+        "name": "egnn_model",  # the model name
+        "config": {
+            "x_features": x_features,
+            "y_features": [
+                "wb97x_dz.energy",
+            ],
+            "datamodule": {
+                "y_graph_scalars": ["wb97x_dz.energy"],
+                "num_elements": 4,
+                "cut_off": 5.0,
+            },
+            "num_node_feats": 4,
+            "num_edge_feats": 0,
+            "num_layers": 4,
+            "num_layers_phi": 2,
+            "c_hidden": 12,
+            "mlp_activation": "SiLU",
+            "y_graph_scalars_loss_config": {
+                "name": "MSELoss",
+                "weight": 1.0,
+            },
+        },
+    }
+
+    model = mz.load_from_dict(model_config)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        model.train(
+            train_data=dataset_feated,
+            validation_data=dataset_feated,
+            trainer_config={
+                "accelerator": "gpu" if torch.cuda.is_available() else "cpu",
+                "max_epochs": 2,
+                "default_root_dir": tmpdir,
+            },
+            datamodule_config={
+                "train": {"batch_size": 4},
+                "num_workers": 0,
+            },
+        )
+
+        molflux_core.save_model(model, tmpdir, featurisation_metadata)
+
+        ase_calculator = to_ase_calculator(
+            model_path=tmpdir,
+            precision="32",
+            device="cuda" if torch.cuda.is_available() else "cpu",
+        )
+
+    num_featurisations = 0
+    system_to_feated_dataset = ase_calculator.system_to_feated_dataset
+
+    def counting_system_to_feated_dataset(**kwargs):
+        nonlocal num_featurisations
+        num_featurisations += 1
+        return system_to_feated_dataset(**kwargs)
+
+    ase_calculator.system_to_feated_dataset = counting_system_to_feated_dataset
+
+    preds = model.predict(
+        dataset_feated,
+        trainer_config={"accelerator": "gpu" if torch.cuda.is_available() else "cpu"},
+    )
+
+    atom_list = [6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
+    pos = np.array(dataset_feated[0]["physicsml_coordinates"])
+
+    atoms = Atoms(numbers=atom_list, positions=pos)
+    atoms.calc = ase_calculator
+    np.testing.assert_allclose(
+        atoms.get_potential_energy(),
+        preds["egnn_model::wb97x_dz.energy"][0],
+        rtol=1e-4,
+    )
+
+    rng = np.random.default_rng(0)
+    for _ in range(5):
+        pos = pos + rng.normal(scale=0.05, size=pos.shape)
+
+        atoms = Atoms(numbers=atom_list, positions=pos)
+        atoms.calc = ase_calculator
+        energy = atoms.get_potential_energy()
+        forces = atoms.get_forces()
+
+        # the same as featurising the system from scratch
+        ase_calculator._batch_dict = None
+        atoms.calc.reset()
+        np.testing.assert_allclose(atoms.get_potential_energy(), energy, rtol=1e-5)
+        np.testing.assert_allclose(atoms.get_forces(), forces, rtol=1e-4, atol=1e-5)
+
+    # the system is featurised once, plus once per reset template
+    assert num_featurisations == 1 + 5
+
+    # and again when the atoms change
+    atoms = Atoms(numbers=atom_list[:-1], positions=pos[:-1])
+    atoms.calc = ase_calculator
+    atoms.get_potential_energy()
+    assert num_featurisations == 1 + 5 + 1
+
+
+def test_ase_graph_calculate_many(featurised_ani1x_atomic_nums):
+    dataset_feated, x_features, featurisation_metadata = featurised_ani1x_atomic_nums
+
+    # specify the model config
+    model_config = {
+        "name": "egnn_model",  # the model name
+        "config": {
+            "x_features": x_features,
+            "y_features": [
+                "wb97x_dz.energy",
+            ],
+            "datamodule": {
+                "y_graph_scalars": ["wb97x_dz.energy"],
+                "num_elements": 4,
+                "cut_off": 5.0,
+            },
+            "num_node_feats": 4,
+            "num_edge_feats": 0,
+            "num_layers": 4,
+            "num_layers_phi": 2,
+            "c_hidden": 12,
+            "mlp_activation": "SiLU",
+            "y_graph_scalars_loss_config": {
+                "name": "MSELoss",
+                "weight": 1.0,
+            },
+        },
+    }
+
+    model = mz.load_from_dict(model_config)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        model.train(
+            train_data=dataset_feated,
+            validation_data=dataset_feated,
+            trainer_config={
+                "accelerator": "gpu" if torch.cuda.is_available() else "cpu",
+                "max_epochs": 2,
+                "default_root_dir": tmpdir,
+            },
+            datamodule_config={
+                "train": {"batch_size": 4},
+                "num_workers": 0,
+            },
+        )
+
+        molflux_core.save_model(model, tmpdir, featurisation_metadata)
+
+        ase_calculator = to_ase_calculator(
+            model_path=tmpdir,
+            precision="32",
+            device="cuda" if torch.cuda.is_available() else "cpu",
+        )
+
+    atom_list = [6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
+    pos = np.array(dataset_feated[0]["physicsml_coordinates"])
+
+    # conformers of the molecule (and a fragment of it)
+    rng = np.random.default_rng(0)
+    atoms_list = [
+        Atoms(
+            numbers=atom_list,
+            positions=pos + rng.normal(scale=0.05, size=pos.shape),
+        )
+        for _ in range(5)
+    ]
+    atoms_list.insert(2, Atoms(numbers=atom_list[:-3], positions=pos[:-3]))
+
+    # in batches of at most two conformers
+    results = ase_calculator.calculate_many(atoms_list, max_atoms_per_batch=40)
+    assert len(results) == len(atoms_list)
+
+    for atoms, result in zip(atoms_list, results, strict=True):
+        atoms.calc = ase_calculator
+        assert result["forces"].shape == (len(atoms), 3)
+        np.testing.assert_allclose(
+            result["energy"],
+            atoms.get_potential_energy(),
+            rtol=1e-5,
+        )
+        np.testing.assert_allclose(
+            result["forces"],
+            atoms.get_forces(),
+            rtol=1e-4,
+            atol=1e-5,
+        )
@@ -0,0 +1,149 @@
+import asyncio
+import os
+import tempfile
+import threading
+
+import molflux.core as molflux_core
+import molflux.modelzoo as mz
+import numpy as np
+import torch
+
+from ase import Atoms
+from physicsml.plugins.ase.load import to_ase_calculator
+from physicsml.plugins.ase.server import InferenceClient, InferenceServer
+
+
+def test_ase_server(featurised_ani1x_atomic_nums):
+    dataset_feated, x_features, featurisation_metadata = featurised_ani1x_atomic_nums
+
+    # specify the model config
+    model_config = {
+        "name": "egnn_model",  # the model name
+        "config": {
+            "x_features": x_features,
+            "y_features": [
+                "wb97x_dz.energy",
+            ],
+            "datamodule": {
+                "y_graph_scalars": ["wb97x_dz.energy"],
+                "num_elements": 4,
+                "cut_off": 5.0,
+            },
+            "num_node_feats": 4,
+            "num_edge_feats": 0,
+            "num_layers": 4,
+            "num_layers_phi": 2,
+            "c_hidden": 12,
+            "mlp_activation": "SiLU",
+            "y_graph_scalars_loss_config": {
+                "name": "MSELoss",
+                "weight": 1.0,
+            },
+        },
+    }
+
+    model = mz.load_from_dict(model_config)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        model.train(
+            train_data=dataset_feated,
+            validation_data=dataset_feated,
+            trainer_config={
+                "accelerator": "gpu" if torch.cuda.is_available() else "cpu",
+                "max_epochs": 2,
+                "default_root_dir": tmpdir,
+            },
+            datamodule_config={
+                "train": {"batch_size": 4},
+                "num_workers": 0,
+            },
+        )
+
+        molflux_core.save_model(model, tmpdir, featurisation_metadata)
+
+        ase_calculator = to_ase_calculator(
+            model_path=tmpdir,
+            precision="32",
+            device="cuda" if torch.cuda.is_available() else "cpu",
+        )
+
+    atom_list = [6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
+    pos = np.array(dataset_feated[0]["physicsml_coordinates"])
+
+    # conformers of the molecule (and a fragment of it)
+    rng = np.random.default_rng(0)
+    atoms_list = [
+        Atoms(
+            numbers=atom_list,
+            positions=pos + rng.normal(scale=0.05, size=pos.shape),
+        )
+        for _ in range(5)
+    ]
+    atoms_list.insert(2, Atoms(numbers=atom_list[:-3], positions=pos[:-3]))
+    expected_results = ase_calculator.calculate_many(atoms_list)
+
+    server = InferenceServer(
+        ase_calculator,
+        max_latency=0.5,
+        max_atoms_per_batch=40,
+        num_featurisation_workers=0,
+    )
+    batch_sizes = []
+    run_batch = server._run_batch
+
+    async def recording_run_batch(batch):
+        batch_sizes.append(len(batch))
+        await run_batch(batch)
+
+    server._run_batch = recording_run_batch  # type: ignore
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        socket_path = os.path.join(tmpdir, "physicsml.sock")
+
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        async def serve():
+            async with await server.start(socket_path=socket_path):
+                started.set()
+                await asyncio.Event().wait()
+
+        thread = threading.Thread(
+            target=loop.run_until_complete,
+            args=(serve(),),
+            daemon=True,
+        )
+        thread.start()
+        assert started.wait(timeout=60)
+
+        try:
+            with InferenceClient(socket_path=socket_path) as client:
+                responses = client.predict_many(
+                    (atoms.get_atomic_numbers(), atoms.get_positions())
+                    for atoms in atoms_list
+                )
+                error_response = client.predict([6, 1], [[0.0, 0.0, 0.0]])
+        finally:
+            asyncio.run_coroutine_threadsafe(server.stop(), loop).result(timeout=60)
+
+    # the responses are in order
+    assert [response["id"] for response in responses] == list(range(len(atoms_list)))
+    for response, expected_result in zip(responses, expected_results, strict=True):
+        np.testing.assert_allclose(
+            response["energy"],
+            expected_result["energy"],
+            rtol=1e-5,
+        )
+        np.testing.assert_allclose(
+            np.array(response["forces"]),
+            expected_result["forces"],
+            rtol=1e-4,
+            atol=1e-5,
+        )
+
+    # the requests are coalesced into batches of at most 40 atoms
+    assert sum(batch_sizes) == len(atoms_list)
+    assert max(batch_sizes) == 2
+
+    # bad requests get errors (and are not batched)
+    assert "error" in error_response
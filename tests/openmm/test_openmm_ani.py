@@ -5,7 +5,10 @@ import molflux.core as core
 import molflux.modelzoo as mz
 import torch
 
-from physicsml.plugins.openmm.load import to_openmm_torchscript
+from physicsml.plugins.openmm.load import (
+    to_openmm_replicas_torchscript,
+    to_openmm_torchscript,
+)
 
 
 def test_openmm_ani(featurised_ani1x_atomic_nums):
@@ -301,3 +304,77 @@ def test_openmm_ani_boxvectors(featurised_ani1x_atomic_nums):
             torchscript_module_64(pos.double(), cell.double()) * 627,
             rtol=1e-7,
         )
+
+
+def test_openmm_ani_replicas(featurised_ani1x_atomic_nums):
+    dataset_feated, x_features, featurisation_metadata = featurised_ani1x_atomic_nums
+
+    # specify the model config
+    model_config = {
+        "name": "ani_model",  # the model name
+        "config": {
+            "x_features": x_features,
+            "y_features": [
+                "wb97x_dz.energy",
+            ],
+            "datamodule": {
+                "y_graph_scalars": ["wb97x_dz.energy"],
+            },
+            "which_ani": "ani1",
+            "y_graph_scalars_loss_config": {
+                "name": "MSELoss",
+                "weight": 1.0,
+            },
+        },
+    }
+
+    model = mz.load_from_dict(model_config)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        model.train(
+            train_data=dataset_feated,
+            validation_data=dataset_feated,
+            trainer_config={
+                "accelerator": "gpu" if torch.cuda.is_available() else "cpu",
+                "max_epochs": 2,
+                "default_root_dir": tmpdir,
+            },
+            datamodule_config={
+                "train": {"batch_size": 4},
+                "num_workers": 0,
+            },
+        )
+
+        core.save_model(model, tmpdir, featurisation_metadata)
+
+        torchscript_module = to_openmm_torchscript(
+            model_path=tmpdir,
+            atom_list=[6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
+            device="cuda" if torch.cuda.is_available() else "cpu",
+        )
+        torchscript_replicas_module = to_openmm_replicas_torchscript(
+            n_replicas=3,
+            model_path=tmpdir,
+            atom_list=[6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
+            device="cuda" if torch.cuda.is_available() else "cpu",
+        )
+
+    torch.manual_seed(0)
+    pos = torch.tensor(dataset_feated[0]["physicsml_coordinates"])
+    replicas_pos = pos + 0.05 * torch.randn(3, 20, 3)
+
+    # the same energies and forces as the replicas one at a time
+    energies, forces = torchscript_replicas_module(replicas_pos)
+    assert energies.shape == (3,)
+    assert forces.shape == (3, 20, 3)
+    for replica_pos, energy, replica_forces in zip(
+        replicas_pos,
+        energies,
+        forces,
+        strict=True,
+    ):
+        replica_pos = replica_pos.clone().requires_grad_(True)
+        expected_energy = torchscript_module(replica_pos)
+        (gradient,) = torch.autograd.grad(expected_energy, replica_pos)
+        assert torch.allclose(energy, expected_energy, rtol=1e-5)
+        assert torch.allclose(replica_forces, -gradient, rtol=1e-4, atol=1e-5)
@@ -5,7 +5,11 @@ import molflux.core as core
 import molflux.modelzoo as mz
 import torch
 
-from physicsml.plugins.openmm.load import to_openmm_torchscript
+from physicsml.plugins.openmm.load import (
+    to_openmm_replicas_torchscript,
+    to_openmm_torchscript,
+)
+from physicsml.plugins.openmm.replica_exchange import run_replica_exchange
 
 
 def test_openmm_egnn(featurised_ani1x_atomic_nums):
@@ -121,6 +125,14 @@ def test_openmm_egnn(featurised_ani1x_atomic_nums):
             rtol=1e-7,
         )
 
+    # the static inputs are moved to the device once and only the inputs of the step
+    # are added to (a copy of) them
+    node_attrs = openmm_module.batch_dict["node_attrs"]
+    assert node_attrs.device == torch.device(openmm_module.which_device)
+    openmm_module(pos)
+    assert openmm_module.batch_dict["node_attrs"] is node_attrs
+    assert "coordinates" not in openmm_module.batch_dict
+
 
 def test_openmm_egnn_64(featurised_ani1x_atomic_nums):
     dataset_feated, x_features, featurisation_metadata = featurised_ani1x_atomic_nums
@@ -456,3 +468,185 @@ def test_openmm_egnn_boxvectors(featurised_ani1x_atomic_nums):
             torchscript_module_64(pos.double(), cell.double()) * 627,
             rtol=1e-7,
         )
+
+
+def test_openmm_egnn_neighbour_list_skin(featurised_ani1x_atomic_nums):
+    dataset_feated, x_features, featurisation_metadata = featurised_ani1x_atomic_nums
+
+    # specify the model config
+    model_config = {
+        "name": "egnn_model",  # the model name
+        "config": {
+            "x_features": x_features,
+            "y_features": [
+                "wb97x_dz.energy",
+                "wb97x_dz.forces",
+            ],
+            "datamodule": {
+                "y_graph_scalars": ["wb97x_dz.energy"],
+                "y_node_vector": "wb97x_dz.forces",
+                "num_elements": 4,
+                "cut_off": 5.0,
+            },
+            "num_node_feats": 4,
+            "num_edge_feats": 0,
+            "num_layers": 4,
+            "num_layers_phi": 2,
+            "c_hidden": 12,
+            "dropout": 0.1,
+            "compute_forces": True,
+            "mlp_activation": "SiLU",
+            "y_graph_scalars_loss_config": {
+                "name": "MSELoss",
+                "weight": 1.0,
+            },
+            "y_node_vector_loss_config": {
+                "name": "MSELoss",
+                "weight": 1.0,
+            },
+        },
+    }
+
+    model = mz.load_from_dict(model_config)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        model.train(
+            train_data=dataset_feated,
+            validation_data=dataset_feated,
+            trainer_config={
+                "accelerator": "gpu" if torch.cuda.is_available() else "cpu",
+                "max_epochs": 2,
+                "default_root_dir": tmpdir,
+            },
+            datamodule_config={
+                "train": {"batch_size": 4},
+                "num_workers": 0,
+            },
+        )
+
+        core.save_model(model, tmpdir, featurisation_metadata)
+
+        torchscript_module = to_openmm_torchscript(
+            model_path=tmpdir,
+            atom_list=[6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
+            device="cuda" if torch.cuda.is_available() else "cpu",
+        )
+        torchscript_module_skin = to_openmm_torchscript(
+            model_path=tmpdir,
+            atom_list=[6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
+            neighbour_list_skin=1.0,
+            device="cuda" if torch.cuda.is_available() else "cpu",
+        )
+
+    torch.manual_seed(0)
+    pos = torch.randn(20, 3) * 3.0
+    for _ in range(20):
+        pos = pos + torch.randn(20, 3) * 0.05
+        assert torch.allclose(
+            torchscript_module(pos) * 627,
+            torchscript_module_skin(pos) * 627,
+            rtol=1e-5,
+        )
+
+    # the neighbour list is only rebuilt every few steps
+    assert 1 < torchscript_module_skin.neighbour_list.num_builds < 20
+
+
+def test_openmm_egnn_replicas(featurised_ani1x_atomic_nums):
+    dataset_feated, x_features, featurisation_metadata = featurised_ani1x_atomic_nums
+
+    # specify the model config
+    model_config = {
+        "name": "egnn_model",  # the model name
+        "config": {
+            "x_features": x_features,
+            "y_features": [
+                "wb97x_dz.energy",
+            ],
+            "datamodule": {
+                "y_graph_scalars": ["wb97x_dz.energy"],
+                "num_elements": 4,
+                "cut_off": 5.0,
+            },
+            "num_node_feats": 4,
+            "num_edge_feats": 0,
+            "num_layers": 4,
+            "num_layers_phi": 2,
+            "c_hidden": 12,
+            "mlp_activation": "SiLU",
+            "y_graph_scalars_loss_config": {
+                "name": "MSELoss",
+                "weight": 1.0,
+            },
+        },
+    }
+
+    model = mz.load_from_dict(model_config)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        model.train(
+            train_data=dataset_feated,
+            validation_data=dataset_feated,
+            trainer_config={
+                "accelerator": "gpu" if torch.cuda.is_available() else "cpu",
+                "max_epochs": 2,
+                "default_root_dir": tmpdir,
+            },
+            datamodule_config={
+                "train": {"batch_size": 4},
+                "num_workers": 0,
+            },
+        )
+
+        core.save_model(model, tmpdir, featurisation_metadata)
+
+        torchscript_module = to_openmm_torchscript(
+            model_path=tmpdir,
+            atom_list=[6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
+            device="cuda" if torch.cuda.is_available() else "cpu",
+        )
+        torchscript_replicas_module = to_openmm_replicas_torchscript(
+            n_replicas=3,
+            model_path=tmpdir,
+            atom_list=[6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
+            device="cuda" if torch.cuda.is_available() else "cpu",
+        )
+
+    torch.manual_seed(0)
+    pos = torch.tensor(dataset_feated[0]["physicsml_coordinates"])
+    replicas_pos = pos + 0.05 * torch.randn(3, 20, 3)
+
+    # the same energies and forces as the replicas one at a time
+    energies, forces = torchscript_replicas_module(replicas_pos)
+    assert energies.shape == (3,)
+    assert forces.shape == (3, 20, 3)
+    for replica_pos, energy, replica_forces in zip(
+        replicas_pos,
+        energies,
+        forces,
+        strict=True,
+    ):
+        replica_pos = replica_pos.clone().requires_grad_(True)
+        expected_energy = torchscript_module(replica_pos)
+        (gradient,) = torch.autograd.grad(expected_energy, replica_pos)
+        assert torch.allclose(energy, expected_energy, rtol=1e-5)
+        assert torch.allclose(replica_forces, -gradient, rtol=1e-4, atol=1e-5)
+
+    # which drive the reference replica exchange loop
+    masses = [12.0] * 10 + [1.0] * 10
+    result = run_replica_exchange(
+        torchscript_replicas_module,
+        replicas_pos,
+        masses=masses,
+        temperatures=[300.0, 350.0, 400.0],
+        n_steps=10,
+        exchange_interval=2,
+        timestep=0.0001,
+        seed=0,
+    )
+    assert result["positions"].shape == (3, 20, 3)
+    assert result["energies"].shape == (10, 3)
+    assert torch.isfinite(result["energies"]).all()
+    assert result["acceptance_rate"].shape == (2,)
+    # every replica is at a different temperature at every step
+    assert (result["temperature_indices"].sort(dim=1).values == torch.arange(3)).all()
@@ -0,0 +1,136 @@
+#  type: ignore
+import numpy as np
+import pyarrow as pa
+import torch
+from torch_geometric.data import Batch
+
+from physicsml.lightning.columnar import read_column, to_columnar_dataset
+from physicsml.lightning.graph_datasets.graph_dataset import GraphDataset
+from physicsml.models.ani.ani_dataset import ANIDataset
+
+from .test_graph_dataset import assert_batches_equal
+
+
+def test_to_columnar_dataset(featurised_ani1x_atomic_nums):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_ani1x_atomic_nums
+
+    columnar_dataset = to_columnar_dataset(dataset_feated)
+    schema = columnar_dataset.data.schema
+
+    assert schema.field("physicsml_coordinates").type == pa.list_(
+        pa.list_(pa.float32(), 3),
+    )
+    assert schema.field("wb97x_dz.forces").type == pa.list_(pa.list_(pa.float32(), 3))
+    assert schema.field("physicsml_atom_numbers").type == pa.list_(pa.int64())
+    assert schema.field("wb97x_dz.energy").type == pa.float32()
+
+    # a second conversion is a no-op
+    assert to_columnar_dataset(columnar_dataset) is columnar_dataset
+
+    table = columnar_dataset.with_format("arrow")[:10]
+    values, offsets = read_column(table.column("physicsml_coordinates"))
+
+    assert values.dtype == np.float32
+    assert values.shape == (offsets[-1], 3)
+    assert not values.flags.writeable
+
+    for idx in range(10):
+        np.testing.assert_array_equal(
+            values[offsets[idx] : offsets[idx + 1]],
+            np.array(dataset_feated[idx]["physicsml_coordinates"], dtype=np.float32),
+        )
+
+
+def test_graph_dataset_columnar(featurised_gdb9_atomic_nums_and_feats_and_bond_feats):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums_and_feats_and_bond_feats
+
+    kwargs = {
+        "x_features": x_features,
+        "y_features": None,
+        "with_y_features": False,
+        "atomic_numbers_col": "physicsml_atom_numbers",
+        "node_attrs_col": "physicsml_atom_features",
+        "edge_attrs_col": "physicsml_bond_features",
+        "node_idxs_col": "physicsml_atom_idxs",
+        "edge_idxs_col": "physicsml_bond_idxs",
+        "graph_attrs_cols": None,
+        "coordinates_col": "physicsml_coordinates",
+        "total_atomic_energy_col": "physicsml_total_atomic_energy_col",
+        "num_elements": 4,
+        "cut_off": 5.0,
+        "y_node_scalars": None,
+        "y_node_vector": None,
+        "y_edge_scalars": None,
+        "y_edge_vector": None,
+        "y_graph_scalars": None,
+        "y_graph_vector": None,
+        "self_interaction": False,
+        "pbc": None,
+        "cell": None,
+    }
+
+    graph_dataset = GraphDataset(dataset=dataset_feated, **kwargs)
+    columnar_graph_dataset = GraphDataset(
+        dataset=to_columnar_dataset(dataset_feated),
+        **kwargs,
+    )
+
+    indices = [5, 2, 77, 31]
+    assert_batches_equal(
+        columnar_graph_dataset.get_batch(indices),
+        Batch.from_data_list([graph_dataset[idx] for idx in indices]),
+    )
+
+
+def test_ani_dataset_columnar(featurised_ani1x_atomic_nums):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_ani1x_atomic_nums
+
+    kwargs = {
+        "x_features": x_features,
+        "y_features": ["wb97x_dz.energy", "wb97x_dz.forces"],
+        "with_y_features": True,
+        "y_graph_scalars": ["wb97x_dz.energy"],
+        "y_node_vector": "wb97x_dz.forces",
+        "atomic_numbers_col": "physicsml_atom_numbers",
+        "coordinates_col": "physicsml_coordinates",
+        "total_atomic_energy_col": "physicsml_total_atomic_energy",
+        "pbc": None,
+        "cell": None,
+    }
+
+    ani_dataset = ANIDataset(dataset=dataset_feated, **kwargs)
+    columnar_ani_dataset = ANIDataset(
+        dataset=to_columnar_dataset(dataset_feated),
+        **kwargs,
+    )
+
+    for idx in range(len(ani_dataset)):
+        datapoint = dataset_feated[idx]
+        datum = ani_dataset[idx]
+        columnar_datum = columnar_ani_dataset[idx]
+
+        expected = {
+            "species": torch.tensor(datapoint["physicsml_atom_numbers"]),
+            "coordinates": torch.tensor(datapoint["physicsml_coordinates"]),
+            "total_atomic_energy": torch.tensor(
+                datapoint["physicsml_total_atomic_energy"],
+            ),
+            "y_graph_scalars": torch.tensor([[datapoint["wb97x_dz.energy"]]]),
+            "y_node_vector": torch.tensor(datapoint["wb97x_dz.forces"]),
+        }
+
+        for key, value in expected.items():
+            torch.testing.assert_close(datum[key], value, rtol=0, atol=0)
+            torch.testing.assert_close(columnar_datum[key], value, rtol=0, atol=0)
@@ -0,0 +1,95 @@
+# type: ignore
+import pytest
+import torch
+
+from physicsml.lightning.graph_datasets.compact_dtypes import (
+    COMPACT_DTYPES,
+    compact_graph_batch,
+    compact_tensor,
+    widen_tensor,
+)
+from physicsml.lightning.graph_datasets.graph_dataset import GraphDataset
+
+from .test_graph_dataset import assert_batches_equal
+
+
+def make_graph_dataset(dataset_feated, x_features, **kwargs):
+    return GraphDataset(
+        dataset=dataset_feated,
+        x_features=x_features,
+        y_features=None,
+        with_y_features=False,
+        atomic_numbers_col="physicsml_atom_numbers",
+        node_attrs_col="physicsml_atom_features",
+        edge_attrs_col="physicsml_bond_features",
+        node_idxs_col="physicsml_atom_idxs",
+        edge_idxs_col="physicsml_bond_idxs",
+        graph_attrs_cols=None,
+        coordinates_col="physicsml_coordinates",
+        total_atomic_energy_col="physicsml_total_atomic_energy_col",
+        num_elements=4,
+        cut_off=5.0,
+        y_node_scalars=None,
+        y_node_vector=None,
+        y_edge_scalars=None,
+        y_edge_vector=None,
+        y_graph_scalars=None,
+        y_graph_vector=None,
+        self_interaction=False,
+        pbc=(True, True, True),
+        cell=[[6.0, 0.0, 0.0], [0.0, 6.0, 0.0], [0.0, 0.0, 6.0]],
+        **kwargs,
+    )
+
+
+def test_compact_graph_dataset(featurised_gdb9_atomic_nums):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums
+
+    graph_dataset = make_graph_dataset(dataset_feated, x_features)
+    compact_graph_dataset = make_graph_dataset(
+        dataset_feated,
+        x_features,
+        compact_dtypes=True,
+    )
+
+    indices = [7, 0, 42, 3, 99, 1]
+    batch = graph_dataset.get_batch(indices)
+    compact_batch = compact_graph_dataset.get_batch(indices)
+
+    for key, dtype in COMPACT_DTYPES.items():
+        assert compact_batch[key].dtype == dtype, key
+    assert_batches_equal(compact_batch, compact_graph_batch(batch))
+    datum = compact_graph_dataset[7]
+    expected_datum = compact_graph_batch(graph_dataset[7])
+    for key in expected_datum.keys():
+        torch.testing.assert_close(datum[key], expected_datum[key], rtol=0, atol=0)
+
+    # the values are unchanged when widened
+    for key in COMPACT_DTYPES:
+        widened = widen_tensor(key, compact_batch[key], torch.float32)
+        assert widened.dtype in [torch.int64, torch.float32]
+        assert torch.equal(widened, batch[key].type(widened.dtype)), key
+
+
+def test_compact_tensor():
+    # integers which do not fit are left as they are
+    edge_index = torch.tensor([[0, 2**31], [1, 0]])
+    assert compact_tensor("edge_index", edge_index).dtype == torch.int64
+
+    cell_shift_vector = torch.tensor([[0.0, 1.0, -1.0]])
+    assert compact_tensor("cell_shift_vector", cell_shift_vector).dtype == torch.int8
+    assert compact_tensor("cell_shift_vector", 200 * cell_shift_vector).dtype == (
+        torch.float32
+    )
+
+    # unless strict
+    with pytest.raises(ValueError, match="do not fit"):
+        compact_tensor("edge_index", edge_index, strict=True)
+
+    # other keys are never compacted
+    node_attrs = torch.ones(3, 2, dtype=torch.float64)
+    assert compact_tensor("node_attrs", node_attrs) is node_attrs
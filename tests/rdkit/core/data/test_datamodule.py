@@ -1,6 +1,14 @@
 # type: ignore
+import pytest
+import torch
+
 from physicsml.lightning.config import PhysicsMLModelConfig
 from physicsml.lightning.datamodule import PhysicsMLDataModule
+from physicsml.lightning.graph_datasets.batch_dict import GraphBatchDict
+from physicsml.models.ani.ani_datamodule import ANIDataModule
+from physicsml.models.ani.supervised.default_configs import ANIModelConfig
+from physicsml.models.egnn.supervised.default_configs import EGNNModelConfig
+from physicsml.models.egnn.supervised.egnn_module import PooledEGNNModule
 
 
 def test_graph_datamodule_atom_num_only(featurised_gdb9_atomic_nums):
@@ -98,3 +106,186 @@ def test_graph_datamodule_no_bonds(featurised_gdb9_atomic_nums_and_feats):
     assert batch["node_attrs"].shape[0] == 16 and batch["node_attrs"].shape[1] == 27
     assert batch.batch.shape[0] == 16
     assert batch.ptr.shape[0] == 5
+
+
+@pytest.mark.parametrize("pre_batch", [None, "in_memory"])
+def test_graph_datamodule_dynamic_batching(
+    featurised_gdb9_atomic_nums,
+    pre_batch,
+):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums
+
+    datamodule = PhysicsMLDataModule(
+        model_config=PhysicsMLModelConfig(
+            x_features=x_features,
+            datamodule={
+                "train": {"batch_size": 4},
+                "num_elements": 4,
+                "cut_off": 5.0,
+                "max_nodes_per_batch": 64,
+                "max_edges_per_batch": 512,
+                "pre_batch": pre_batch,
+            },
+        ),
+        train_data={None: dataset_feated},
+    )
+
+    loader = datamodule.train_dataloader()
+    num_graphs = 0
+    for batches, _, _ in loader:
+        batch = batches[None]
+        assert (batch.num_graphs == 1) or (
+            batch.num_nodes <= 64 and batch.edge_index.shape[1] <= 512
+        )
+        num_graphs += batch.num_graphs
+
+    # only the last partially filled batch is dropped
+    assert len(dataset_feated) - 30 < num_graphs <= len(dataset_feated)
+
+
+def test_ani_datamodule_bucketing(featurised_ani1x_atomic_nums):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_ani1x_atomic_nums
+
+    model_config = ANIModelConfig(
+        x_features=x_features,
+        y_features=["wb97x_dz.energy"],
+        datamodule={
+            "train": {"batch_size": 4},
+            "validation": {"batch_size": 4},
+            "predict": {"batch_size": 4},
+            "y_graph_scalars": ["wb97x_dz.energy"],
+            "bucket_width": 2,
+        },
+    )
+    datamodule = ANIDataModule(
+        model_config=model_config,
+        train_data={None: dataset_feated},
+        validation_data={None: dataset_feated},
+    )
+    num_atoms = [len(x) for x in dataset_feated["physicsml_coordinates"]]
+
+    for loader in [datamodule.train_dataloader(), datamodule.val_dataloader()]:
+        for batches, _, _ in loader:
+            batch = batches[None]
+            real_num_atoms = (batch["species"] >= 0).sum(-1)
+            assert real_num_atoms.max() // 2 == real_num_atoms.min() // 2
+
+    # predictions are in the order of the dataset
+    datamodule = ANIDataModule(model_config=model_config, predict_data=dataset_feated)
+    predict_num_atoms = [
+        num
+        for batch in datamodule.predict_dataloader()
+        for num in (batch["species"] >= 0).sum(-1).tolist()
+    ]
+    assert predict_num_atoms == num_atoms
+
+
+def test_graph_datamodule_one_hot_on_device(
+    featurised_gdb9_atomic_nums_and_feats_and_bond_feats,
+):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums_and_feats_and_bond_feats
+
+    batches = {}
+    for one_hot_on_device in [False, True]:
+        model_config = EGNNModelConfig(
+            x_features=x_features,
+            y_features=["u0"],
+            datamodule={
+                "predict": {"batch_size": 4},
+                "y_graph_scalars": ["u0"],
+                "num_elements": 4,
+                "cut_off": 5.0,
+                "one_hot_on_device": one_hot_on_device,
+            },
+            num_node_feats=27,
+            num_edge_feats=12,
+            y_graph_scalars_loss_config={"name": "MSELoss"},
+        )
+        datamodule = PhysicsMLDataModule(
+            model_config=model_config,
+            predict_data=dataset_feated,
+        )
+        batch = next(iter(datamodule.predict_dataloader()))
+        batches[one_hot_on_device] = (batch, PooledEGNNModule(model_config))
+
+    # only the raw atomic numbers are in the batch
+    batch, module = batches[True]
+    assert "atomic_numbers" not in batch
+    assert batch["node_attrs"].shape == (16, 23)
+
+    # and the module builds the same inputs from them
+    batch_dict = module.graph_batch_to_batch_dict(batch)
+    expected_batch, expected_module = batches[False]
+    expected_batch_dict = expected_module.graph_batch_to_batch_dict(expected_batch)
+    assert batch_dict.keys() == expected_batch_dict.keys()
+    for key, value in expected_batch_dict.items():
+        torch.testing.assert_close(batch_dict[key], value, rtol=0, atol=0)
+
+
+@pytest.mark.parametrize("pre_batch", [None, "in_memory"])
+def test_graph_datamodule_collate_batch_dict(
+    featurised_gdb9_atomic_nums_and_feats_and_bond_feats,
+    pre_batch,
+):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums_and_feats_and_bond_feats
+
+    batches = {}
+    for collate_batch_dict in [False, True]:
+        model_config = EGNNModelConfig(
+            x_features=x_features,
+            y_features=["u0"],
+            datamodule={
+                "predict": {"batch_size": 4},
+                "y_graph_scalars": ["u0"],
+                "num_elements": 4,
+                "cut_off": 5.0,
+                "pre_batch": pre_batch,
+                "collate_batch_dict": collate_batch_dict,
+            },
+            trainer={"precision": 64},
+            num_node_feats=27,
+            num_edge_feats=12,
+            y_graph_scalars_loss_config={"name": "MSELoss"},
+        )
+        datamodule = PhysicsMLDataModule(
+            model_config=model_config,
+            predict_data=dataset_feated,
+        )
+        batch = next(iter(datamodule.predict_dataloader()))
+        batches[collate_batch_dict] = (
+            batch,
+            PooledEGNNModule(model_config).type(torch.float64),
+        )
+
+    # the batch is collated in the dtype of the model, with the scalars as ints
+    batch, module = batches[True]
+    assert isinstance(batch, GraphBatchDict)
+    assert batch["num_graphs"] == 4
+    assert batch["num_nodes"] == batch["ptr"][-1]
+    assert isinstance(batch["num_nodes"], int)
+    assert batch["coordinates"].dtype == torch.float64
+
+    # and the module builds the same inputs from it
+    batch = module.transfer_batch_to_device(batch, torch.device("cpu"), 0)
+    batch_dict = module.graph_batch_to_batch_dict(batch)
+    expected_batch, expected_module = batches[False]
+    expected_batch_dict = expected_module.graph_batch_to_batch_dict(expected_batch)
+    assert batch_dict.keys() == expected_batch_dict.keys()
+    for key, value in expected_batch_dict.items():
+        torch.testing.assert_close(batch_dict[key], value, rtol=0, atol=0)
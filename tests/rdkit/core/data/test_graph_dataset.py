@@ -1,4 +1,9 @@
 #  type: ignore
+import torch
+from torch_geometric.data import Batch
+from torch_geometric.loader import DataLoader
+
+from physicsml.lightning.graph_datasets.graph_dataloader import GraphDataLoader
 from physicsml.lightning.graph_datasets.graph_dataset import GraphDataset
 
 
@@ -158,3 +163,231 @@ def test_graph_dataset_no_bonds(featurised_gdb9_atomic_nums_and_feats):
     assert batch.raw_atomic_numbers.shape[0] == 4
     assert batch.atomic_numbers.shape[0] == 4 and batch.atomic_numbers.shape[1] == 4
     assert batch["node_attrs"].shape[0] == 4 and batch["node_attrs"].shape[1] == 27
+
+
+def test_graph_dataset_neighbour_list_cache(
+    featurised_gdb9_atomic_nums_and_feats_and_bond_feats,
+    tmp_path,
+):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums_and_feats_and_bond_feats
+
+    kwargs = {
+        "x_features": x_features,
+        "y_features": None,
+        "with_y_features": False,
+        "atomic_numbers_col": "physicsml_atom_numbers",
+        "node_attrs_col": "physicsml_atom_features",
+        "edge_attrs_col": "physicsml_bond_features",
+        "node_idxs_col": "physicsml_atom_idxs",
+        "edge_idxs_col": "physicsml_bond_idxs",
+        "graph_attrs_cols": None,
+        "coordinates_col": "physicsml_coordinates",
+        "total_atomic_energy_col": "physicsml_total_atomic_energy_col",
+        "num_elements": 4,
+        "cut_off": 5.0,
+        "y_node_scalars": None,
+        "y_node_vector": None,
+        "y_edge_scalars": None,
+        "y_edge_vector": None,
+        "y_graph_scalars": None,
+        "y_graph_vector": None,
+        "self_interaction": False,
+        "pbc": None,
+        "cell": None,
+    }
+
+    graph_dataset = GraphDataset(dataset=dataset_feated, **kwargs)
+    cached_graph_dataset = GraphDataset(
+        dataset=dataset_feated,
+        neighbour_list_cache_dir=str(tmp_path),
+        **kwargs,
+    )
+    assert len(list(tmp_path.glob("*/meta.json"))) == 1
+
+    for idx in range(len(graph_dataset)):
+        datum = graph_dataset[idx]
+        cached_datum = cached_graph_dataset[idx]
+        assert torch.equal(datum.edge_index, cached_datum.edge_index)
+        assert torch.equal(datum["edge_attrs"], cached_datum["edge_attrs"])
+        assert torch.equal(datum.cell_shift_vector, cached_datum.cell_shift_vector)
+
+    indices = list(range(len(graph_dataset)))
+    assert_batches_equal(
+        cached_graph_dataset.get_batch(indices),
+        graph_dataset.get_batch(indices),
+    )
+
+    # the cache is reused for the same dataset and neighbourhood parameters
+    GraphDataset(
+        dataset=dataset_feated,
+        neighbour_list_cache_dir=str(tmp_path),
+        **kwargs,
+    )
+    assert len(list(tmp_path.glob("*/meta.json"))) == 1
+
+    # and rebuilt if any of them change
+    GraphDataset(
+        dataset=dataset_feated,
+        neighbour_list_cache_dir=str(tmp_path),
+        **{**kwargs, "cut_off": 3.0},
+    )
+    assert len(list(tmp_path.glob("*/meta.json"))) == 2
+
+
+def assert_batches_equal(batch, expected_batch):
+    assert set(batch.keys()) == set(expected_batch.keys())
+    for key in expected_batch.keys():
+        if isinstance(expected_batch[key], torch.Tensor):
+            torch.testing.assert_close(
+                batch[key],
+                expected_batch[key],
+                rtol=0,
+                atol=0,
+                equal_nan=True,
+            )
+        else:
+            assert batch[key] == expected_batch[key], key
+
+    assert batch.num_graphs == expected_batch.num_graphs
+    assert batch._slice_dict.keys() == expected_batch._slice_dict.keys()
+    for key, value in expected_batch._slice_dict.items():
+        assert torch.equal(batch._slice_dict[key], value), key
+        assert torch.equal(batch._inc_dict[key], expected_batch._inc_dict[key]), key
+
+
+def test_graph_dataset_get_batch(featurised_gdb9_atomic_nums_and_feats_and_bond_feats):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums_and_feats_and_bond_feats
+
+    graph_dataset = GraphDataset(
+        dataset=dataset_feated,
+        x_features=x_features,
+        y_features=None,
+        with_y_features=False,
+        atomic_numbers_col="physicsml_atom_numbers",
+        node_attrs_col="physicsml_atom_features",
+        edge_attrs_col="physicsml_bond_features",
+        node_idxs_col="physicsml_atom_idxs",
+        edge_idxs_col="physicsml_bond_idxs",
+        graph_attrs_cols=None,
+        coordinates_col="physicsml_coordinates",
+        total_atomic_energy_col="physicsml_total_atomic_energy_col",
+        num_elements=4,
+        cut_off=5.0,
+        y_node_scalars=None,
+        y_node_vector=None,
+        y_edge_scalars=None,
+        y_edge_vector=None,
+        y_graph_scalars=None,
+        y_graph_vector=None,
+        self_interaction=False,
+        pbc=None,
+        cell=None,
+    )
+
+    indices = [7, 0, 42, 3, 99, 1]
+    batch = graph_dataset.get_batch(indices)
+    expected_batch = Batch.from_data_list([graph_dataset[idx] for idx in indices])
+
+    assert_batches_equal(batch, expected_batch)
+
+
+def test_graph_dataset_get_batch_with_y_features(featurised_ani1x_atomic_nums):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_ani1x_atomic_nums
+
+    y_features = ["wb97x_dz.energy", "wb97x_dz.forces", "wb97x_dz.cm5_charges"]
+    graph_attrs_cols = ["wb97x_dz.dipole", "hf_dz.energy"]
+    graph_dataset = GraphDataset(
+        dataset=dataset_feated,
+        x_features=x_features + graph_attrs_cols,
+        y_features=y_features,
+        with_y_features=True,
+        atomic_numbers_col="physicsml_atom_numbers",
+        node_attrs_col="physicsml_atom_features",
+        edge_attrs_col="physicsml_bond_features",
+        node_idxs_col="physicsml_atom_idxs",
+        edge_idxs_col="physicsml_bond_idxs",
+        graph_attrs_cols=graph_attrs_cols,
+        coordinates_col="physicsml_coordinates",
+        total_atomic_energy_col="physicsml_total_atomic_energy",
+        num_elements=4,
+        cut_off=5.0,
+        y_node_scalars=["wb97x_dz.cm5_charges"],
+        y_node_vector="wb97x_dz.forces",
+        y_edge_scalars=None,
+        y_edge_vector=None,
+        y_graph_scalars=["wb97x_dz.energy"],
+        y_graph_vector=None,
+        self_interaction=False,
+        pbc=(True, True, True),
+        cell=[[10.0, 0.0, 0.0], [0.0, 10.0, 0.0], [0.0, 0.0, 10.0]],
+    )
+
+    indices = list(range(0, len(graph_dataset), 7))
+    batch = graph_dataset.get_batch(indices)
+    expected_batch = Batch.from_data_list([graph_dataset[idx] for idx in indices])
+
+    assert_batches_equal(batch, expected_batch)
+    assert batch.num_graphs == len(indices)
+    assert batch.cell.shape == (3 * len(indices), 3)
+
+
+def test_graph_dataset_dataloaders(
+    featurised_gdb9_atomic_nums_and_feats_and_bond_feats,
+):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums_and_feats_and_bond_feats
+
+    graph_dataset = GraphDataset(
+        dataset=dataset_feated,
+        x_features=x_features,
+        y_features=None,
+        with_y_features=False,
+        atomic_numbers_col="physicsml_atom_numbers",
+        node_attrs_col="physicsml_atom_features",
+        edge_attrs_col="physicsml_bond_features",
+        node_idxs_col="physicsml_atom_idxs",
+        edge_idxs_col="physicsml_bond_idxs",
+        graph_attrs_cols=None,
+        coordinates_col="physicsml_coordinates",
+        total_atomic_energy_col="physicsml_total_atomic_energy_col",
+        num_elements=4,
+        cut_off=5.0,
+        y_node_scalars=None,
+        y_node_vector=None,
+        y_edge_scalars=None,
+        y_edge_vector=None,
+        y_graph_scalars=None,
+        y_graph_vector=None,
+        self_interaction=False,
+        pbc=None,
+        cell=None,
+    )
+
+    # a plain pyg dataloader collates the graphs itself
+    batch = next(iter(DataLoader(graph_dataset, batch_size=4)))
+    expected_batch = Batch.from_data_list([graph_dataset[idx] for idx in range(4)])
+
+    assert batch.num_graphs == 4
+    assert_batches_equal(batch, expected_batch)
+
+    # the graph dataloader reads the batches with a single slice
+    batch = next(iter(GraphDataLoader(graph_dataset, batch_size=4)))
+
+    assert graph_dataset.batched_reads
+    assert batch.num_graphs == 4
+    assert_batches_equal(batch, expected_batch)
@@ -0,0 +1,205 @@
+# type: ignore
+import pytest
+import torch
+from torch_geometric.data import Batch
+
+from physicsml.models.egnn.multi_graph.default_configs import (
+    MultiGraphEGNNModelConfig,
+)
+from physicsml.models.egnn.multi_graph.multi_graph_dataloader import (
+    MultiGraphDataLoader,
+)
+from physicsml.models.egnn.multi_graph.multi_graph_dataset import MultiGraphDataset
+from physicsml.models.egnn.multi_graph.multi_graph_egnn_module import (
+    PooledMultiGraphEGNNModule,
+)
+
+from .test_graph_dataset import assert_batches_equal
+
+GRAPH_NAMES = ["ligand", "pocket"]
+COLUMNS = [
+    "physicsml_atom_numbers",
+    "physicsml_atom_features",
+    "physicsml_bond_features",
+    "physicsml_atom_idxs",
+    "physicsml_bond_idxs",
+    "physicsml_coordinates",
+]
+
+
+def make_multi_graph_dataset(dataset, graph_names=GRAPH_NAMES, **kwargs):
+    return MultiGraphDataset(
+        dataset=dataset,
+        x_features=[
+            f"{graph_name}::{col}" for graph_name in graph_names for col in COLUMNS
+        ],
+        y_features=["u0"],
+        train_features=None,
+        with_y_features=True,
+        graph_names=graph_names,
+        **{
+            f"dict_{key}_col": {
+                graph_name: f"{graph_name}::physicsml_{col}"
+                for graph_name in graph_names
+            }
+            for key, col in [
+                ("atomic_numbers", "atom_numbers"),
+                ("node_attrs", "atom_features"),
+                ("edge_attrs", "bond_features"),
+                ("node_idxs", "atom_idxs"),
+                ("edge_idxs", "bond_idxs"),
+                ("coordinates", "coordinates"),
+            ]
+        },
+        y_graph_scalars=["u0"],
+        num_elements=4,
+        self_interaction=False,
+        pbc=None,
+        cell=None,
+        cut_off=5.0,
+        **kwargs,
+    )
+
+
+def test_multi_graph_dataset(featurised_gdb9_atomic_nums_and_feats_and_bond_feats):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums_and_feats_and_bond_feats
+
+    # the pocket of a datapoint is the ligand of another one
+    pocket_dataset = dataset_feated.select(reversed(range(len(dataset_feated))))
+    dataset = dataset_feated.select_columns(["u0"])
+    for col in COLUMNS:
+        dataset = dataset.add_column(f"ligand::{col}", dataset_feated[col])
+        dataset = dataset.add_column(f"pocket::{col}", pocket_dataset[col])
+
+    multi_graph_dataset = make_multi_graph_dataset(dataset)
+    single_threaded_dataset = make_multi_graph_dataset(dataset, num_threads=1)
+
+    # the same graphs as the per graph datasets
+    indices = [7, 0, 42, 3]
+    batch = multi_graph_dataset.get_batch(indices)
+    assert batch.keys() == set(GRAPH_NAMES)
+    expected_batch = single_threaded_dataset.get_batch(indices)
+    assert_batches_equal(batch["pocket"], expected_batch["pocket"])
+    for graph_name in GRAPH_NAMES:
+        graph_dataset = multi_graph_dataset.graph_datasets[graph_name]
+        assert_batches_equal(batch[graph_name], graph_dataset.get_batch(indices))
+
+        datum = multi_graph_dataset[7][graph_name]
+        expected_datum = graph_dataset[7]
+        assert datum.keys() == expected_datum.keys()
+        for key in expected_datum.keys():
+            torch.testing.assert_close(datum[key], expected_datum[key])
+
+    # which the dataloader passes through
+    batches = list(MultiGraphDataLoader(multi_graph_dataset, batch_size=4))
+    assert len(batches) == 25
+    assert all(isinstance(batch["ligand"], Batch) for batch in batches)
+    assert torch.equal(
+        batches[0]["ligand"].coordinates,
+        multi_graph_dataset.get_batch([0, 1, 2, 3])["ligand"].coordinates,
+    )
+
+
+def test_multi_graph_dataset_cached_graphs(
+    featurised_gdb9_atomic_nums_and_feats_and_bond_feats,
+):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums_and_feats_and_bond_feats
+
+    # every datapoint has one of two pockets
+    pocket_dataset = dataset_feated.select([0, 1] * (len(dataset_feated) // 2))
+    dataset = dataset_feated.select_columns(["u0"])
+    for col in COLUMNS:
+        dataset = dataset.add_column(f"ligand::{col}", dataset_feated[col])
+        dataset = dataset.add_column(f"pocket::{col}", pocket_dataset[col])
+
+    multi_graph_dataset = make_multi_graph_dataset(dataset)
+    cached_dataset = make_multi_graph_dataset(dataset, cached_graph_names=["pocket"])
+
+    indices = [7, 0, 42, 3]
+    batch = cached_dataset.get_batch(indices)
+    expected_batch = multi_graph_dataset.get_batch(indices)
+    assert_batches_equal(batch["ligand"], expected_batch["ligand"])
+    for key in expected_batch["pocket"].keys():
+        torch.testing.assert_close(batch["pocket"][key], expected_batch["pocket"][key])
+
+    # the pockets are built once, but have the targets of their datapoint
+    assert len(cached_dataset._graph_caches["pocket"]) == 2
+    assert batch["pocket"].graph_hash[0] == batch["pocket"].graph_hash[3]
+    assert batch["pocket"].graph_hash[0] != batch["pocket"].graph_hash[1]
+    for idx in [7, 9]:
+        datum = cached_dataset[idx]["pocket"]
+        expected_datum = multi_graph_dataset[idx]["pocket"]
+        torch.testing.assert_close(
+            datum.y_graph_scalars,
+            expected_datum.y_graph_scalars,
+        )
+        cached_datum = cached_dataset._graph_caches["pocket"][int(datum.graph_hash)]
+        assert datum.coordinates is cached_datum.coordinates
+
+    with pytest.raises(ValueError, match="Unknown cached_graph_names"):
+        make_multi_graph_dataset(dataset, cached_graph_names=["protein"])
+
+
+@pytest.mark.parametrize("max_cached_encoded_graphs", [4096, 1])
+def test_multi_graph_egnn_cache_encoded_graphs(
+    featurised_gdb9_atomic_nums_and_feats_and_bond_feats,
+    max_cached_encoded_graphs,
+):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums_and_feats_and_bond_feats
+
+    graph_names = ["ligand", "pocket", "ligand_pocket"]
+    pocket_dataset = dataset_feated.select([0, 1] * (len(dataset_feated) // 2))
+    dataset = dataset_feated.select_columns(["u0"])
+    for col in COLUMNS:
+        dataset = dataset.add_column(f"ligand::{col}", dataset_feated[col])
+        dataset = dataset.add_column(f"pocket::{col}", pocket_dataset[col])
+        dataset = dataset.add_column(f"ligand_pocket::{col}", dataset_feated[col])
+    cached_dataset = make_multi_graph_dataset(
+        dataset,
+        graph_names=graph_names,
+        cached_graph_names=["pocket"],
+    )
+
+    model_config = MultiGraphEGNNModelConfig(
+        x_features=x_features,
+        y_features=["u0"],
+        graph_names=graph_names,
+        cached_graph_names=["pocket"],
+        cache_encoded_graphs=True,
+        max_cached_encoded_graphs=max_cached_encoded_graphs,
+        datamodule={"y_graph_scalars": ["u0"], "num_elements": 4, "cut_off": 5.0},
+        num_node_feats=27,
+        num_edge_feats=12,
+        c_hidden=12,
+        pooling_head="LigandPocketDiffPoolingHead",
+        y_graph_scalars_loss_config={"name": "MSELoss"},
+    )
+    module = PooledMultiGraphEGNNModule(model_config).eval()
+
+    def predict(indices):
+        batch = cached_dataset.get_batch(indices)
+        batch_dict = {k: module.graph_batch_to_batch_dict(v) for k, v in batch.items()}
+        with torch.no_grad():
+            return module(batch_dict)["y_graph_scalars"]
+
+    expected_outputs = [predict(indices) for indices in [[7, 0, 42], [3, 8], [0, 2]]]
+
+    # the pockets are encoded by the first batch and reused by the second (or encoded
+    # again if they were evicted from the cache)
+    module.on_predict_start()
+    outputs = [predict(indices) for indices in [[7, 0, 42], [3, 8], [0, 2]]]
+    assert len(module._encoded_graph_cache) == min(2, max_cached_encoded_graphs)
+    for output, expected_output in zip(outputs, expected_outputs, strict=True):
+        torch.testing.assert_close(output, expected_output)
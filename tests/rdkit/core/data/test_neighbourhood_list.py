@@ -0,0 +1,275 @@
+#  type: ignore
+import pytest
+import torch
+
+from physicsml.lightning.graph_datasets.graph_dataset import GraphDataset
+from physicsml.lightning.graph_datasets.neighbourhood_list_torch import (
+    NEIGHBOUR_LIST_BACKENDS,
+    VerletNeighbourList,
+    compute_batch_neighbourhood,
+    compute_neighbourhood,
+    register_neighbour_list_backend,
+    select_neighbour_list_backend,
+)
+
+from .test_graph_dataset import assert_batches_equal
+
+
+def sorted_edges(edge_index):
+    return sorted(map(tuple, edge_index.transpose(0, 1).tolist()))
+
+
+@pytest.mark.parametrize("num_atoms", [0, 1, 7, 600])
+@pytest.mark.parametrize("self_interaction", [True, False])
+def test_non_periodic_backends(num_atoms, self_interaction):
+    torch.manual_seed(0)
+    positions = torch.rand(num_atoms, 3) * 2.0 * num_atoms ** (1 / 3)
+
+    edges = {
+        backend: compute_neighbourhood(
+            positions=positions,
+            cutoff=2.5,
+            pbc=None,
+            cell=None,
+            self_interaction=self_interaction,
+            backend=backend,
+        )
+        for backend in ["dense", "binned", "linked_cell", "auto"]
+    }
+
+    # the binned cell list returns exactly the same edges as the dense algorithm
+    assert torch.equal(edges["dense"][0], edges["binned"][0])
+    assert torch.equal(edges["dense"][1], edges["binned"][1])
+    assert sorted_edges(edges["dense"][0]) == sorted_edges(edges["linked_cell"][0])
+    assert torch.equal(edges["dense"][0], edges["auto"][0])
+
+
+def test_select_neighbour_list_backend():
+    assert select_neighbour_list_backend(100, False, "cpu") == "dense"
+    assert select_neighbour_list_backend(5000, False, "cpu") == "binned"
+    assert select_neighbour_list_backend(2000, False, "cuda") == "dense"
+    assert select_neighbour_list_backend(100, True, "cpu") == "linked_cell"
+
+
+def test_periodic_backends():
+    positions = torch.rand(20, 3) * 5.0
+    cell = torch.eye(3) * 5.0
+
+    with pytest.raises(torch.jit.Error, match="does not support periodic"):
+        compute_neighbourhood(
+            positions=positions,
+            cutoff=2.0,
+            pbc=(True, True, True),
+            cell=cell,
+            self_interaction=False,
+            backend="binned",
+        )
+
+    edge_index, cell_shift_vector = compute_neighbourhood(
+        positions=positions,
+        cutoff=2.0,
+        pbc=(True, True, True),
+        cell=cell,
+        self_interaction=False,
+    )
+    assert edge_index.shape[1] == cell_shift_vector.shape[0]
+
+
+def test_graph_dataset_custom_backend(featurised_gdb9_atomic_nums):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums
+
+    calls = []
+
+    @register_neighbour_list_backend("test_backend")
+    def test_backend(positions, cutoff, pbc, cell, self_interaction):
+        calls.append(positions.shape[0])
+        return NEIGHBOUR_LIST_BACKENDS["binned"](
+            positions,
+            cutoff,
+            pbc,
+            cell,
+            self_interaction,
+        )
+
+    try:
+        kwargs = {
+            "dataset": dataset_feated,
+            "x_features": x_features,
+            "y_features": None,
+            "with_y_features": False,
+            "atomic_numbers_col": "physicsml_atom_numbers",
+            "node_attrs_col": "physicsml_atom_features",
+            "edge_attrs_col": "physicsml_bond_features",
+            "node_idxs_col": "physicsml_atom_idxs",
+            "edge_idxs_col": "physicsml_bond_idxs",
+            "graph_attrs_cols": None,
+            "coordinates_col": "physicsml_coordinates",
+            "total_atomic_energy_col": "physicsml_total_atomic_energy_col",
+            "num_elements": 4,
+            "cut_off": 5.0,
+            "y_node_scalars": None,
+            "y_node_vector": None,
+            "y_edge_scalars": None,
+            "y_edge_vector": None,
+            "y_graph_scalars": None,
+            "y_graph_vector": None,
+            "self_interaction": False,
+            "pbc": None,
+            "cell": None,
+        }
+        graph_dataset = GraphDataset(**kwargs)
+        custom_graph_dataset = GraphDataset(
+            neighbour_list_backend="test_backend",
+            **kwargs,
+        )
+
+        for idx in range(10):
+            assert torch.equal(
+                graph_dataset[idx].edge_index,
+                custom_graph_dataset[idx].edge_index,
+            )
+        assert len(calls) == 10
+
+        with pytest.raises(KeyError, match="Unknown neighbour list backend"):
+            GraphDataset(neighbour_list_backend="unknown", **kwargs)
+    finally:
+        del NEIGHBOUR_LIST_BACKENDS["test_backend"]
+
+
+@pytest.mark.parametrize(
+    "pbc, cell, backend",
+    [
+        (None, None, "auto"),
+        (None, None, "dense"),
+        (None, None, "binned"),
+        ((True, True, True), torch.eye(3) * 4.0, "auto"),
+    ],
+)
+def test_batch_neighbourhood(pbc, cell, backend):
+    torch.manual_seed(0)
+    num_nodes = [5, 17, 1, 30, 12]
+    positions = [torch.rand(n, 3) * 3.0 for n in num_nodes]
+
+    expected_edge_index = []
+    expected_cell_shift_vector = []
+    offset = 0
+    for graph_positions in positions:
+        edge_index, cell_shift_vector = compute_neighbourhood(
+            positions=graph_positions,
+            cutoff=2.0,
+            pbc=pbc,
+            cell=cell,
+            self_interaction=False,
+            backend="dense" if pbc is None else "auto",
+        )
+        expected_edge_index.append(edge_index + offset)
+        expected_cell_shift_vector.append(cell_shift_vector)
+        offset += graph_positions.shape[0]
+
+    edge_index, cell_shift_vector = compute_batch_neighbourhood(
+        positions=torch.cat(positions),
+        batch=torch.repeat_interleave(
+            torch.arange(len(num_nodes)),
+            torch.tensor(num_nodes),
+        ),
+        num_graphs=len(num_nodes),
+        cutoff=2.0,
+        pbc=pbc,
+        cell=cell,
+        self_interaction=False,
+        backend=backend,
+    )
+
+    assert torch.equal(edge_index, torch.cat(expected_edge_index, dim=1))
+    assert torch.equal(cell_shift_vector, torch.cat(expected_cell_shift_vector))
+
+
+@pytest.mark.parametrize(
+    "pbc, cell",
+    [(None, None), ((True, True, True), [[20.0, 0, 0], [0, 20.0, 0], [0, 0, 20.0]])],
+)
+def test_graph_dataset_collate_neighbour_list(
+    featurised_gdb9_atomic_nums_and_feats_and_bond_feats,
+    pbc,
+    cell,
+):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums_and_feats_and_bond_feats
+
+    kwargs = {
+        "dataset": dataset_feated,
+        "x_features": x_features,
+        "y_features": None,
+        "with_y_features": False,
+        "atomic_numbers_col": "physicsml_atom_numbers",
+        "node_attrs_col": "physicsml_atom_features",
+        "edge_attrs_col": "physicsml_bond_features",
+        "node_idxs_col": "physicsml_atom_idxs",
+        "edge_idxs_col": "physicsml_bond_idxs",
+        "graph_attrs_cols": None,
+        "coordinates_col": "physicsml_coordinates",
+        "total_atomic_energy_col": "physicsml_total_atomic_energy_col",
+        "num_elements": 4,
+        "cut_off": 5.0,
+        "y_node_scalars": None,
+        "y_node_vector": None,
+        "y_edge_scalars": None,
+        "y_edge_vector": None,
+        "y_graph_scalars": None,
+        "y_graph_vector": None,
+        "self_interaction": False,
+        "pbc": pbc,
+        "cell": cell,
+    }
+    graph_dataset = GraphDataset(**kwargs)
+    collate_graph_dataset = GraphDataset(collate_neighbour_list=True, **kwargs)
+
+    indices = [7, 0, 42, 3, 99, 1]
+    expected_batch = graph_dataset.get_batch(indices)
+    assert_batches_equal(collate_graph_dataset.get_batch(indices), expected_batch)
+
+
+@pytest.mark.parametrize(
+    "pbc, cell",
+    [(None, None), ((True, True, True), torch.eye(3) * 6.0)],
+)
+def test_verlet_neighbour_list(tmp_path, pbc, cell):
+    torch.manual_seed(0)
+    neighbour_list = torch.jit.script(
+        VerletNeighbourList(cutoff=3.0, skin=1.0, self_interaction=False),
+    )
+
+    positions = torch.rand(50, 3) * 6.0
+    for _ in range(50):
+        positions = positions + torch.randn(50, 3) * 0.05
+
+        edge_index, cell_shift_vector = neighbour_list(positions, pbc, cell)
+        expected_edge_index, expected_cell_shift_vector = compute_neighbourhood(
+            positions=positions,
+            cutoff=3.0,
+            pbc=pbc,
+            cell=cell,
+            self_interaction=False,
+        )
+
+        assert sorted_edges(
+            torch.cat([edge_index, cell_shift_vector.T.long()]),
+        ) == sorted_edges(
+            torch.cat([expected_edge_index, expected_cell_shift_vector.T.long()]),
+        )
+
+    # the neighbour list is only rebuilt every few steps
+    assert 1 < neighbour_list.num_builds < 50
+
+    # and the state is kept by saved modules
+    neighbour_list.save(tmp_path / "neighbour_list.pt")
+    loaded_neighbour_list = torch.jit.load(tmp_path / "neighbour_list.pt")
+    loaded_neighbour_list(positions, pbc, cell)
+    assert loaded_neighbour_list.num_builds == neighbour_list.num_builds
@@ -0,0 +1,126 @@
+# type: ignore
+import logging
+
+import pytest
+
+from physicsml.lightning.config import PhysicsMLModelConfig
+from physicsml.lightning.datamodule import PhysicsMLDataModule
+from physicsml.lightning.pre_batch_cache import PreBatchCache, pre_batch_cache_key
+
+from .test_graph_dataset import assert_batches_equal
+
+
+def make_model_config(x_features, **datamodule_config):
+    return PhysicsMLModelConfig(
+        x_features=x_features,
+        datamodule={
+            "predict": {"batch_size": 4},
+            "num_elements": 4,
+            "cut_off": 5.0,
+            **datamodule_config,
+        },
+    )
+
+
+def test_pre_batch_cache_key(featurised_gdb9_atomic_nums):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums
+
+    model_config = make_model_config(x_features)
+    key = pre_batch_cache_key(dataset_feated, model_config, batch_size=4)
+
+    assert key == pre_batch_cache_key(dataset_feated, model_config, batch_size=4)
+    assert key != pre_batch_cache_key(dataset_feated, model_config, batch_size=8)
+
+    # fields which affect the graphs change the key
+    assert key != pre_batch_cache_key(
+        dataset_feated,
+        make_model_config(x_features, cut_off=4.0),
+        batch_size=4,
+    )
+    assert key != pre_batch_cache_key(
+        dataset_feated.select(range(10)),
+        model_config,
+        batch_size=4,
+    )
+
+    # and the others do not
+    assert key == pre_batch_cache_key(
+        dataset_feated,
+        make_model_config(x_features, num_workers=2, pre_batch_cache_max_gb=1.0),
+        batch_size=4,
+    )
+
+
+def test_pre_batch_cache(tmp_path):
+    cache = PreBatchCache(str(tmp_path))
+    num_builds = []
+
+    def build(path, size):
+        num_builds.append(path)
+        with open(f"{path}/data", "wb") as f:
+            f.write(b"\0" * size)
+
+    path = cache.get_or_build("a", lambda path: build(path, 1000))
+    assert path == str(tmp_path / "a")
+    assert cache.get_or_build("a", lambda path: build(path, 1000)) == path
+    assert len(num_builds) == 1
+
+    cache.get_or_build("b", lambda path: build(path, 1000))
+    cache.get_or_build("a", lambda path: build(path, 1000))
+
+    # "b" is the least recently used
+    cache = PreBatchCache(str(tmp_path), max_gb=2500 / 2**30)
+    cache.get_or_build("c", lambda path: build(path, 1000))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a", "c"]
+    assert len(num_builds) == 3
+
+    # the dataset in use is never evicted
+    cache = PreBatchCache(str(tmp_path), max_gb=0.0)
+    cache.get_or_build("d", lambda path: build(path, 1000))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["d"]
+
+
+@pytest.mark.parametrize("pre_batch", ["in_memory", "on_disk", "sample_store"])
+def test_graph_datamodule_pre_batch_cache(
+    tmp_path,
+    caplog,
+    featurised_gdb9_atomic_nums,
+    pre_batch,
+):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums
+
+    model_config = make_model_config(
+        x_features,
+        pre_batch=pre_batch,
+        pre_batch_cache_dir=str(tmp_path / "cache"),
+    )
+    expected_batches = list(
+        PhysicsMLDataModule(
+            model_config=make_model_config(x_features),
+            predict_data=dataset_feated,
+        ).predict_dataloader(),
+    )
+
+    caplog.set_level(logging.INFO, logger="physicsml.lightning.pre_batch_cache")
+    for is_cached in [False, True]:
+        caplog.clear()
+        datamodule = PhysicsMLDataModule(
+            model_config=model_config,
+            predict_data=dataset_feated,
+        )
+        batches = list(datamodule.predict_dataloader())
+
+        # the pre-batched dataset is built once and reused
+        assert len(list((tmp_path / "cache").iterdir())) == 1
+        assert ("Using the cached pre-batched dataset" in caplog.text) == is_cached
+        assert len(batches) == len(expected_batches)
+        for batch, expected_batch in zip(batches, expected_batches, strict=True):
+            assert_batches_equal(batch, expected_batch)
@@ -0,0 +1,110 @@
+#  type: ignore
+import pytest
+
+from physicsml.lightning.config import PhysicsMLModelConfig
+from physicsml.lightning.datamodule import PhysicsMLDataModule
+from physicsml.lightning.graph_datasets.graph_dataloader import GraphDataLoader
+from physicsml.lightning.graph_datasets.graph_dataset import GraphDataset
+from physicsml.lightning.pre_batching_sample_store import (
+    SampleStore,
+    build_sample_store,
+    construct_sample_store,
+)
+
+from .test_graph_dataset import assert_batches_equal
+
+
+@pytest.mark.parametrize(
+    "pbc, cell",
+    [(None, None), ((True, True, True), [[20.0, 0, 0], [0, 20.0, 0], [0, 0, 20.0]])],
+)
+def test_sample_store(featurised_gdb9_atomic_nums_and_feats_and_bond_feats, pbc, cell):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums_and_feats_and_bond_feats
+
+    graph_dataset = GraphDataset(
+        dataset=dataset_feated,
+        x_features=x_features,
+        y_features=None,
+        with_y_features=False,
+        atomic_numbers_col="physicsml_atom_numbers",
+        node_attrs_col="physicsml_atom_features",
+        edge_attrs_col="physicsml_bond_features",
+        node_idxs_col="physicsml_atom_idxs",
+        edge_idxs_col="physicsml_bond_idxs",
+        graph_attrs_cols=None,
+        coordinates_col="physicsml_coordinates",
+        total_atomic_energy_col="physicsml_total_atomic_energy_col",
+        num_elements=4,
+        cut_off=5.0,
+        y_node_scalars=None,
+        y_node_vector=None,
+        y_edge_scalars=None,
+        y_edge_vector=None,
+        y_graph_scalars=None,
+        y_graph_vector=None,
+        self_interaction=False,
+        pbc=pbc,
+        cell=cell,
+    )
+    dataloader = GraphDataLoader(graph_dataset, batch_size=16, shuffle=False)
+
+    sample_store = SampleStore(build_sample_store(dataloader))
+    assert len(sample_store) == len(graph_dataset)
+
+    for indices in [[0], [7, 0, 42, 3, 99, 1], list(range(len(graph_dataset)))[::-3]]:
+        assert_batches_equal(
+            sample_store.collate(indices),
+            graph_dataset.get_batch(indices),
+        )
+
+    # the store is shared through memory-mapped shards (one per worker)
+    for num_workers in [0, 2]:
+        shared_sample_store = construct_sample_store(
+            GraphDataLoader(
+                graph_dataset,
+                batch_size=16,
+                shuffle=False,
+                num_workers=num_workers,
+            ),
+        )
+        assert len(shared_sample_store.stores) == max(num_workers, 1)
+        assert len(shared_sample_store) == len(graph_dataset)
+        for indices in [[5, 2, 77], list(range(len(graph_dataset)))[::-3]]:
+            assert_batches_equal(
+                shared_sample_store.collate(indices),
+                graph_dataset.get_batch(indices),
+            )
+
+
+def test_graph_datamodule_sample_store(featurised_gdb9_atomic_nums):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums
+
+    datamodule = PhysicsMLDataModule(
+        model_config=PhysicsMLModelConfig(
+            x_features=x_features,
+            datamodule={
+                "train": {"batch_size": 8},
+                "num_elements": 4,
+                "cut_off": 5.0,
+                "pre_batch": "sample_store",
+            },
+        ),
+        train_data={None: dataset_feated},
+    )
+
+    loader = datamodule.train_dataloader()
+
+    # the batches are re-shuffled on every epoch
+    epochs = []
+    for _ in range(2):
+        epochs.append([batches[None].coordinates.sum() for batches, _, _ in loader])
+    assert len(epochs[0]) == len(dataset_feated) // 8
+    assert epochs[0] != epochs[1]
@@ -0,0 +1,174 @@
+#  type: ignore
+import numpy as np
+import pytest
+from torch.utils.data import DistributedSampler, SequentialSampler
+
+from physicsml.lightning.samplers import (
+    BucketBatchSampler,
+    DynamicBatchSampler,
+    pack_batches,
+    padding_efficiency,
+)
+
+
+@pytest.fixture
+def graph_sizes():
+    rng = np.random.default_rng(0)
+    num_nodes = rng.integers(1, 30, size=200)
+    num_edges = num_nodes * rng.integers(1, 10, size=200)
+    return num_nodes, num_edges
+
+
+def test_pack_batches():
+    num_nodes = np.array([3, 4, 2, 10, 1, 1])
+    assert pack_batches(range(6), num_nodes, max_nodes=7) == [[0, 1], [2], [3], [4, 5]]
+
+    num_edges = np.array([6, 2, 8, 1, 1, 1])
+    assert pack_batches(
+        range(6),
+        num_nodes,
+        max_nodes=7,
+        num_edges=num_edges,
+        max_edges=8,
+    ) == [[0, 1], [2], [3], [4, 5]]
+
+
+@pytest.mark.parametrize("max_nodes, max_edges", [(64, None), (None, 300), (64, 300)])
+def test_dynamic_batch_sampler(graph_sizes, max_nodes, max_edges):
+    num_nodes, num_edges = graph_sizes
+
+    batch_sampler = DynamicBatchSampler(
+        SequentialSampler(range(200)),
+        num_nodes=num_nodes,
+        max_nodes=max_nodes,
+        num_edges=num_edges,
+        max_edges=max_edges,
+        shuffle=True,
+    )
+
+    # the length is that of the next pass over the batch sampler
+    num_batches = len(batch_sampler)
+    batches = list(batch_sampler)
+    assert len(batches) == num_batches
+    assert sorted(idx for batch in batches for idx in batch) == list(range(200))
+    for batch in batches:
+        if max_nodes is not None:
+            assert (len(batch) == 1) or (num_nodes[batch].sum() <= max_nodes)
+        if max_edges is not None:
+            assert (len(batch) == 1) or (num_edges[batch].sum() <= max_edges)
+
+    # a new order is drawn on every epoch
+    assert list(batch_sampler) != batches
+
+    batch_sampler.set_epoch(3)
+    assert list(batch_sampler) == list(batch_sampler)
+
+
+@pytest.mark.parametrize("drop_last", [True, False])
+def test_dynamic_batch_sampler_distributed(graph_sizes, drop_last):
+    num_nodes, _ = graph_sizes
+
+    rank_batches = []
+    for rank in range(3):
+        batch_sampler = DynamicBatchSampler(
+            SequentialSampler(range(200)),
+            num_nodes=num_nodes,
+            max_nodes=50,
+            shuffle=True,
+            drop_last=drop_last,
+            num_replicas=3,
+            rank=rank,
+        )
+        batch_sampler.set_epoch(1)
+        rank_batches.append(list(batch_sampler))
+
+    # all the ranks have the same number of batches
+    assert len({len(batches) for batches in rank_batches}) == 1
+
+    indices = [idx for batches in rank_batches for batch in batches for idx in batch]
+    if drop_last:
+        assert len(indices) == len(set(indices))
+    else:
+        assert set(indices) == set(range(200))
+
+
+def test_dynamic_batch_sampler_injected_distributed_sampler(graph_sizes):
+    num_nodes, _ = graph_sizes
+
+    batch_sampler = DynamicBatchSampler(
+        SequentialSampler(range(200)),
+        num_nodes=num_nodes,
+        max_nodes=50,
+        shuffle=True,
+        num_replicas=2,
+        rank=1,
+    )
+    batch_sampler.set_epoch(2)
+
+    # the batch sampler lightning constructs for distributed training
+    sampler = DistributedSampler(range(200), num_replicas=2, rank=1, shuffle=False)
+    sampler.set_epoch(2)
+    injected_batch_sampler = DynamicBatchSampler(
+        sampler,
+        num_nodes=num_nodes,
+        max_nodes=50,
+        shuffle=True,
+    )
+
+    assert list(injected_batch_sampler) == list(batch_sampler)
+
+
+@pytest.mark.parametrize("shuffle", [True, False])
+def test_bucket_batch_sampler(graph_sizes, shuffle):
+    num_nodes, _ = graph_sizes
+
+    batch_sampler = BucketBatchSampler(
+        SequentialSampler(range(200)),
+        num_nodes=num_nodes,
+        batch_size=8,
+        bucket_width=4,
+        shuffle=shuffle,
+    )
+    batches = list(batch_sampler)
+
+    assert sorted(idx for batch in batches for idx in batch) == list(range(200))
+    for batch in batches:
+        assert len(batch) <= 8
+        assert len(set(num_nodes[batch] // 4)) == 1
+
+    if shuffle:
+        # the batches are shuffled across the buckets
+        bucket_order = [num_nodes[batch[0]] // 4 for batch in batches]
+        assert bucket_order != sorted(bucket_order)
+        assert list(batch_sampler) != batches
+    else:
+        assert list(batch_sampler) == batches
+
+    random_batches = [list(range(start, start + 8)) for start in range(0, 200, 8)]
+    assert padding_efficiency(batches, num_nodes) > padding_efficiency(
+        random_batches,
+        num_nodes,
+    )
+
+
+def test_bucket_batch_sampler_drop_last(graph_sizes):
+    num_nodes, _ = graph_sizes
+
+    batch_sampler = BucketBatchSampler(
+        SequentialSampler(range(200)),
+        num_nodes=num_nodes,
+        batch_size=8,
+        bucket_width=4,
+        shuffle=True,
+        drop_last=True,
+        num_replicas=2,
+    )
+    batches = list(batch_sampler)
+
+    assert all(len(batch) == 8 for batch in batches)
+
+
+def test_padding_efficiency():
+    num_nodes = np.array([2, 4, 4, 1])
+    assert padding_efficiency([[0, 1], [2, 3]], num_nodes) == 11 / 16
+    assert padding_efficiency([[1, 2], [0, 3]], num_nodes) == 1 - 1 / 12
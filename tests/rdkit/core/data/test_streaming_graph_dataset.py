@@ -0,0 +1,156 @@
+# type: ignore
+import datasets
+import pytest
+
+from physicsml.lightning.config import PhysicsMLModelConfig
+from physicsml.lightning.datamodule import PhysicsMLDataModule
+from physicsml.lightning.graph_datasets.streaming_graph_dataset import (
+    StreamingGraphDataLoader,
+    StreamingGraphDataset,
+)
+
+from .test_graph_dataset import assert_batches_equal
+from .test_pre_batch_cache import make_model_config
+
+
+def stream_parquet(dataset, path, num_shards):
+    files = []
+    for shard in range(num_shards):
+        file = str(path / f"shard_{shard}.parquet")
+        dataset.shard(num_shards, shard, contiguous=True).to_parquet(file)
+        files.append(file)
+
+    return datasets.load_dataset(
+        "parquet",
+        data_files=files,
+        split="train",
+        streaming=True,
+    )
+
+
+def test_streaming_graph_datamodule(tmp_path, featurised_gdb9_atomic_nums):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums
+
+    model_config = make_model_config(x_features)
+    expected_batches = list(
+        PhysicsMLDataModule(
+            model_config=model_config,
+            predict_data=dataset_feated,
+        ).predict_dataloader(),
+    )
+
+    datamodule = PhysicsMLDataModule(
+        model_config=model_config,
+        predict_data=stream_parquet(dataset_feated, tmp_path, num_shards=4),
+    )
+    dataloader = datamodule.predict_dataloader()
+    assert isinstance(dataloader, StreamingGraphDataLoader)
+
+    # the same graphs as a map-style dataset
+    batches = list(dataloader)
+    assert len(batches) == len(expected_batches)
+    for batch, expected_batch in zip(batches, expected_batches, strict=True):
+        assert_batches_equal(batch, expected_batch)
+
+
+def test_streaming_graph_datamodule_pre_batch(tmp_path, featurised_gdb9_atomic_nums):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums
+
+    with pytest.raises(ValueError, match="not supported for streaming"):
+        PhysicsMLDataModule(
+            model_config=make_model_config(x_features, pre_batch="in_memory"),
+            predict_data=stream_parquet(dataset_feated, tmp_path, num_shards=1),
+        )
+
+
+def test_streaming_graph_dataset_shuffle_and_split(
+    tmp_path,
+    featurised_gdb9_atomic_nums,
+):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums
+
+    datamodule = PhysicsMLDataModule(model_config=make_model_config(x_features))
+    graph_dataset_kwargs = datamodule._graph_dataset_kwargs("predict")
+    dataset = stream_parquet(
+        dataset_feated.add_column("idx", list(range(len(dataset_feated)))),
+        tmp_path,
+        num_shards=4,
+    )
+
+    def streamed_idxs(rank, world_size, num_workers, epoch):
+        streaming_dataset = StreamingGraphDataset(
+            dataset=dataset,
+            graph_dataset_kwargs={
+                **graph_dataset_kwargs,
+                "x_features": [*x_features, "idx"],
+                "graph_attrs_cols": ["idx"],
+            },
+            batch_size=8,
+            shuffle=True,
+            shuffle_buffer_size=16,
+            seed=0,
+        )
+        dataloader = StreamingGraphDataLoader(
+            streaming_dataset,
+            num_workers=num_workers,
+        )
+        dataloader._epoch = epoch
+        streaming_dataset.set_rank(rank, world_size)
+
+        # the rank is set by the dataloader from the process group
+        streaming_dataset.set_rank = lambda *args: None
+        return [int(idx) for batch in dataloader for idx in batch.graph_attrs.flatten()]
+
+    # every datapoint once per epoch, in a new order every epoch
+    epoch_0 = streamed_idxs(0, 1, 0, epoch=0)
+    epoch_1 = streamed_idxs(0, 1, 0, epoch=1)
+    assert sorted(epoch_0) == sorted(epoch_1) == list(range(len(dataset_feated)))
+    assert epoch_0 != epoch_1
+    assert epoch_0 == streamed_idxs(0, 1, 0, epoch=0)
+
+    # the shards are split between the ranks and their workers
+    rank_idxs = [streamed_idxs(rank, 2, 2, epoch=0) for rank in range(2)]
+    assert set(rank_idxs[0]).isdisjoint(rank_idxs[1])
+    assert sorted(rank_idxs[0] + rank_idxs[1]) == list(range(len(dataset_feated)))
+
+
+def test_streaming_graph_datamodule_train(tmp_path, featurised_gdb9_atomic_nums):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums
+
+    model_config = PhysicsMLModelConfig(
+        x_features=[*x_features],
+        y_features=["u0"],
+        datamodule={
+            "train": {"batch_size": 8},
+            "y_graph_scalars": ["u0"],
+            "num_elements": 4,
+            "cut_off": 5.0,
+        },
+    )
+    datamodule = PhysicsMLDataModule(
+        model_config=model_config,
+        train_data={None: stream_parquet(dataset_feated, tmp_path, num_shards=2)},
+    )
+
+    # the features are not extended with the targets by every streamed batch
+    for _ in range(2):
+        batches = [batch[None] for batch, _, _ in datamodule.train_dataloader()]
+        assert len(batches) == len(dataset_feated) // 8
+        assert all(batch.y_graph_scalars.shape == (8, 1) for batch in batches)
+        assert model_config.x_features == x_features
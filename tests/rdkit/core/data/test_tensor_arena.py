@@ -0,0 +1,278 @@
+#  type: ignore
+import json
+import os
+
+import torch
+import torch.multiprocessing as mp
+
+from physicsml.lightning.graph_datasets.graph_dataloader import GraphDataLoader
+from physicsml.lightning.graph_datasets.graph_dataset import GraphDataset
+from physicsml.lightning.pre_batching_in_memory import (
+    construct_in_memory_pre_batched_dataloader,
+)
+from physicsml.lightning.pre_batching_on_disk import (
+    OnDiskBatchedDataset,
+    PrefetchDataLoader,
+    collate_fn,
+    pre_batch_on_disk,
+)
+from physicsml.lightning.pre_batching_shards import write_rank_shards
+from physicsml.lightning.tensor_arena import (
+    ShardedTensorArena,
+    TensorArena,
+    TensorArenaWriter,
+)
+
+from .test_graph_dataset import assert_batches_equal
+
+
+def make_graph_dataset(dataset_feated, x_features):
+    return GraphDataset(
+        dataset=dataset_feated,
+        x_features=x_features,
+        y_features=None,
+        with_y_features=False,
+        atomic_numbers_col="physicsml_atom_numbers",
+        node_attrs_col="physicsml_atom_features",
+        edge_attrs_col="physicsml_bond_features",
+        node_idxs_col="physicsml_atom_idxs",
+        edge_idxs_col="physicsml_bond_idxs",
+        graph_attrs_cols=None,
+        coordinates_col="physicsml_coordinates",
+        total_atomic_energy_col="physicsml_total_atomic_energy_col",
+        num_elements=4,
+        cut_off=5.0,
+        y_node_scalars=None,
+        y_node_vector=None,
+        y_edge_scalars=None,
+        y_edge_vector=None,
+        y_graph_scalars=None,
+        y_graph_vector=None,
+        self_interaction=False,
+        pbc=None,
+        cell=None,
+    )
+
+
+def test_tensor_arena(tmp_path, featurised_gdb9_atomic_nums_and_feats_and_bond_feats):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums_and_feats_and_bond_feats
+
+    graph_dataset = make_graph_dataset(dataset_feated, x_features)
+    batches = [
+        graph_dataset.get_batch(list(range(start, start + 7)))
+        for start in range(0, 70, 7)
+    ]
+    dict_batch = {
+        "species": torch.tensor([[1, 6, -1]]),
+        "coordinates": torch.rand(1, 3, 3, dtype=torch.float64),
+        "pbc": torch.tensor([True, False, True]),
+        "empty": torch.empty(0, 3),
+        "nested": [torch.tensor(1.0), (torch.arange(5), "name")],
+    }
+
+    writer = TensorArenaWriter(tmp_path / "test.arena")
+    for batch in batches:
+        writer.append(batch)
+    writer.append(dict_batch)
+    assert writer.close() == 11
+
+    arena = TensorArena(tmp_path / "test.arena")
+    assert len(arena) == 11
+
+    for idx, batch in enumerate(batches):
+        assert_batches_equal(arena[idx], batch)
+
+    arena_dict_batch = arena[10]
+    assert arena_dict_batch.keys() == dict_batch.keys()
+    for key in ["species", "coordinates", "pbc", "empty"]:
+        assert arena_dict_batch[key].dtype == dict_batch[key].dtype
+        assert torch.equal(arena_dict_batch[key], dict_batch[key])
+    assert torch.equal(arena_dict_batch["nested"][0], dict_batch["nested"][0])
+    assert torch.equal(arena_dict_batch["nested"][1][0], dict_batch["nested"][1][0])
+    assert arena_dict_batch["nested"][1][1] == "name"
+
+    # the tensors are views into the memory map
+    assert (
+        arena[0].coordinates.untyped_storage().data_ptr()
+        == arena.buffer.untyped_storage().data_ptr()
+    )
+
+
+def test_in_memory_pre_batched_dataloader(
+    tmp_path,
+    monkeypatch,
+    featurised_gdb9_atomic_nums_and_feats_and_bond_feats,
+):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums_and_feats_and_bond_feats
+
+    monkeypatch.chdir(tmp_path)
+
+    graph_dataset = make_graph_dataset(dataset_feated, x_features)
+    dataloader = GraphDataLoader(
+        graph_dataset,
+        batch_size=8,
+        shuffle=False,
+    )
+    pre_batched_dataloader = construct_in_memory_pre_batched_dataloader(
+        dataloader,
+        shuffle=False,
+    )
+
+    # the arena is removed from the working directory once it is mapped
+    assert list(tmp_path.iterdir()) == []
+
+    assert len(pre_batched_dataloader) == len(dataloader)
+    for batch, expected_batch in zip(pre_batched_dataloader, dataloader, strict=True):
+        assert_batches_equal(batch, expected_batch)
+
+
+def test_on_disk_pre_batched_dataset(
+    tmp_path,
+    featurised_gdb9_atomic_nums_and_feats_and_bond_feats,
+):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums_and_feats_and_bond_feats
+
+    graph_dataset = make_graph_dataset(dataset_feated, x_features)
+    dataloader = GraphDataLoader(
+        graph_dataset,
+        batch_size=8,
+        shuffle=False,
+    )
+
+    # a small shard size to write several shards
+    num_batches = pre_batch_on_disk(dataloader, tmp_path / "pre_batched", 100_000)
+    assert num_batches == len(dataloader)
+
+    batched_dataset = OnDiskBatchedDataset(tmp_path / "pre_batched")
+    assert len(batched_dataset.shards) > 1
+    assert len(batched_dataset) == num_batches
+
+    expected_batches = list(dataloader)
+    for idx, expected_batch in enumerate(expected_batches):
+        assert_batches_equal(batched_dataset[idx], expected_batch)
+        assert_batches_equal(batched_dataset.load(idx), expected_batch)
+
+    prefetch_dataloader = PrefetchDataLoader(
+        batched_dataset,
+        batch_size=1,
+        shuffle=False,
+        num_prefetch_threads=2,
+        max_prefetch=3,
+        collate_fn=collate_fn,
+    )
+    assert len(prefetch_dataloader) == num_batches
+    for batch, expected_batch in zip(
+        prefetch_dataloader,
+        expected_batches,
+        strict=True,
+    ):
+        assert_batches_equal(batch, expected_batch)
+
+    prefetch_dataloader = PrefetchDataLoader(
+        batched_dataset,
+        batch_size=1,
+        shuffle=True,
+        collate_fn=collate_fn,
+    )
+    num_graphs = [batch.num_graphs for batch in prefetch_dataloader]
+    assert sum(num_graphs) == len(graph_dataset)
+
+
+def test_pre_batching_with_worker_processes(
+    tmp_path,
+    featurised_gdb9_atomic_nums_and_feats_and_bond_feats,
+):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums_and_feats_and_bond_feats
+
+    graph_dataset = make_graph_dataset(dataset_feated, x_features)
+    dataloader = GraphDataLoader(
+        graph_dataset,
+        batch_size=8,
+        shuffle=False,
+        num_workers=2,
+    )
+
+    # every worker writes its own shards
+    shards = write_rank_shards(dataloader, str(tmp_path / "shard"), shard_size=None)
+    assert [os.path.basename(file) for file, _ in shards] == [
+        "shard_0_0.arena",
+        "shard_1_0.arena",
+    ]
+    assert sum(num_batches for _, num_batches in shards) == len(dataloader)
+
+    arena = ShardedTensorArena([TensorArena(file) for file, _ in shards])
+    expected_batches = list(dataloader)
+    assert len(arena) == len(expected_batches)
+    for idx, expected_batch in enumerate(expected_batches):
+        assert_batches_equal(arena[idx], expected_batch)
+
+
+def _pre_batch_on_disk_rank(rank, world_size, init_file, dataloader, path):
+    torch.distributed.init_process_group(
+        "gloo",
+        init_method=f"file://{init_file}",
+        rank=rank,
+        world_size=world_size,
+    )
+    pre_batch_on_disk(dataloader, path)
+
+
+def test_distributed_pre_batch_on_disk(
+    tmp_path,
+    featurised_gdb9_atomic_nums_and_feats_and_bond_feats,
+):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_gdb9_atomic_nums_and_feats_and_bond_feats
+
+    graph_dataset = make_graph_dataset(dataset_feated, x_features)
+    dataloader = GraphDataLoader(
+        graph_dataset,
+        batch_size=7,
+        shuffle=False,
+    )
+    expected_batches = list(dataloader)
+    assert len(expected_batches) % 2 == 1
+
+    mp.start_processes(
+        _pre_batch_on_disk_rank,
+        args=(2, tmp_path / "init", dataloader, tmp_path / "pre_batched"),
+        nprocs=2,
+        start_method="spawn",
+    )
+
+    with open(tmp_path / "pre_batched" / "manifest.json") as f:
+        manifest = json.load(f)
+    assert manifest["num_ranks"] == 2
+    assert {shard["rank"] for shard in manifest["shards"]} == {0, 1}
+
+    # the ranks get the same number of batches (the first batch is repeated)
+    expected_batches = expected_batches + expected_batches[:1]
+    for rank in range(2):
+        batched_dataset = OnDiskBatchedDataset(tmp_path / "pre_batched", rank=rank)
+        rank_expected_batches = expected_batches[rank::2]
+        assert len(batched_dataset) == len(rank_expected_batches)
+        for idx, expected_batch in enumerate(rank_expected_batches):
+            assert_batches_equal(batched_dataset.load(idx), expected_batch)
+
+    assert (
+        len(OnDiskBatchedDataset(tmp_path / "pre_batched")) == manifest["num_batches"]
+    )
@@ -1,6 +1,9 @@
+import os
 import tempfile
 
 import molflux.modelzoo as mz
+import numpy as np
+import pyarrow.parquet as pq
 import torch
 
 
@@ -79,3 +82,112 @@ def test_training_egnn_energy_forces(featurised_ani1x_atomic_nums):
         )
         ** 2
     ).mean().sqrt() < 1.0
+
+
+def test_egnn_forces_columnar_predictions(featurised_ani1x_atomic_nums):
+    (
+        dataset_feated,
+        x_features,
+        featurisation_metadata,
+    ) = featurised_ani1x_atomic_nums
+
+    # specify the model config
+    model_config = {
+        "name": "egnn_model",  # the model name
+        "config": {
+            "x_features": x_features,
+            "y_features": [
+                "wb97x_dz.energy",
+                "wb97x_dz.forces",
+            ],
+            "datamodule": {
+                "y_graph_scalars": ["wb97x_dz.energy"],
+                "y_node_vector": "wb97x_dz.forces",
+                "num_elements": 4,
+                "cut_off": 5.0,
+            },
+            "num_node_feats": 4,
+            "num_edge_feats": 0,
+            "num_layers": 4,
+            "num_layers_phi": 2,
+            "c_hidden": 12,
+            "compute_forces": True,
+            "mlp_activation": "SiLU",
+            "y_graph_scalars_loss_config": {
+                "name": "MSELoss",
+                "weight": 1.0,
+            },
+            "y_node_vector_loss_config": {
+                "name": "MSELoss",
+                "weight": 1.0,
+            },
+        },
+    }
+
+    model = mz.load_from_dict(model_config)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        model.train(
+            train_data=dataset_feated,
+            validation_data=dataset_feated,
+            trainer_config={
+                "accelerator": "gpu" if torch.cuda.is_available() else "cpu",
+                "max_epochs": 1,
+                "default_root_dir": tmpdir,
+            },
+            datamodule_config={
+                "train": {"batch_size": 4},
+                "num_workers": 0,
+            },
+        )
+
+    trainer_config = {"accelerator": "gpu" if torch.cuda.is_available() else "cpu"}
+    datamodule_config = {"predict": {"batch_size": 12}}
+
+    preds = model.predict(
+        dataset_feated,
+        trainer_config=trainer_config,
+        datamodule_config=datamodule_config,
+    )
+    columns = model.predict_columnar(  # type: ignore
+        dataset_feated,
+        trainer_config=trainer_config,
+        datamodule_config=datamodule_config,
+    )
+
+    assert list(columns.keys()) == list(preds.keys())
+
+    # a value per datapoint
+    energies, energy_offsets = columns["egnn_model::wb97x_dz.energy"]
+    assert energy_offsets is None
+    np.testing.assert_allclose(energies, preds["egnn_model::wb97x_dz.energy"])
+
+    # the values of all the atoms and the offsets of each datapoint
+    forces, force_offsets = columns["egnn_model::wb97x_dz.forces"]
+    num_atoms = [len(x) for x in dataset_feated["wb97x_dz.forces"]]
+    np.testing.assert_array_equal(np.diff(force_offsets), num_atoms)
+    assert forces.shape == (sum(num_atoms), 3)
+    np.testing.assert_allclose(forces, preds["egnn_model::wb97x_dz.forces"])
+
+    # streamed to parquet with a row per datapoint
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "predictions.parquet")
+        model.predict_to_parquet(  # type: ignore
+            dataset_feated,
+            path,
+            trainer_config=trainer_config,
+            datamodule_config=datamodule_config,
+        )
+        table = pq.read_table(path)
+
+    assert table.num_rows == 88
+    assert table.column_names == list(preds.keys())
+    np.testing.assert_allclose(
+        table.column("egnn_model::wb97x_dz.energy").to_numpy(),
+        energies,
+    )
+    for idx in [0, 50, 87]:
+        np.testing.assert_allclose(
+            table.column("egnn_model::wb97x_dz.forces")[idx].as_py(),
+            forces[force_offsets[idx] : force_offsets[idx + 1]],
+        )
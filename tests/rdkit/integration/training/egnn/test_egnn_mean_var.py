@@ -1,6 +1,9 @@
+import os
 import tempfile
 
 import molflux.modelzoo as mz
+import numpy as np
+import pyarrow.parquet as pq
 import torch
 
 
@@ -96,3 +99,24 @@ def test_training_egnn_mean_var(featurised_ani1x_atomic_nums):
         )
         == 2
     )
+
+    # the standard deviations are streamed with the predictions
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "predictions.parquet")
+        model.predict_to_parquet(  # type: ignore
+            dataset_feated,
+            path,
+            trainer_config={
+                "accelerator": "gpu" if torch.cuda.is_available() else "cpu",
+            },
+        )
+        table = pq.read_table(path)
+
+    assert table.column_names == [
+        "mean_var_egnn_model::wb97x_dz.energy",
+        "mean_var_egnn_model::wb97x_dz.energy::std",
+    ]
+    np.testing.assert_allclose(
+        table.column("mean_var_egnn_model::wb97x_dz.energy::std").to_numpy(),
+        stds["mean_var_egnn_model::wb97x_dz.energy::std"],
+    )